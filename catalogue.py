@@ -0,0 +1,88 @@
+from bisect import bisect_right
+
+# Emplacement d'équipement dans un profil -> liste correspondante dans CLASSES
+EMPLACEMENTS = {'arme': 'armes', 'armure': 'armures'}
+
+
+class CatalogueEquipements:
+    """Catalogue compilé une fois depuis CLASSES: accès O(1) par identifiant ou par nom"""
+    def __init__(self, classes):
+        self.classes = classes
+        self.par_id = {}  # (classe, emplacement, item_id) -> équipement
+        self.par_nom = {}  # (classe, emplacement, nom) -> équipement
+        self.noms_toutes_classes = {}  # (emplacement, nom) -> équipement (profils sans classe)
+        self.ids_toutes_classes = {}  # (emplacement, item_id) -> équipement (identifiants uniques toutes classes confondues)
+        self.listes = {}  # (classe, emplacement) -> équipements dans l'ordre de la boutique
+        self.positions = {}  # (classe, emplacement, item_id) -> position dans la boutique (0 = premier)
+        self.couts = {}  # (classe, emplacement) -> coûts triés
+        self.niveaux = {}  # (classe, emplacement) -> niveaux requis triés
+        self._compiler()
+
+    def _compiler(self):
+        identifiants = set()
+        for classe, classe_data in self.classes.items():
+            for emplacement, liste in EMPLACEMENTS.items():
+                equipements = classe_data.get(liste, [])
+                for position, equipement in enumerate(equipements):
+                    item_id = equipement.get('id')
+                    if not isinstance(item_id, int):
+                        raise ValueError(f"Équipement sans identifiant entier: {equipement.get('nom')}")
+                    if item_id in identifiants:
+                        raise ValueError(f"Identifiant d'équipement en double: {item_id}")
+                    identifiants.add(item_id)
+                    self.par_id[(classe, emplacement, item_id)] = equipement
+                    self.positions[(classe, emplacement, item_id)] = position
+                    self.par_nom[(classe, emplacement, equipement['nom'])] = equipement
+                    self.noms_toutes_classes.setdefault((emplacement, equipement['nom']), equipement)
+                    self.ids_toutes_classes[(emplacement, item_id)] = equipement
+                self.listes[(classe, emplacement)] = list(equipements)
+                self.couts[(classe, emplacement)] = sorted(e['cout'] for e in equipements)
+                self.niveaux[(classe, emplacement)] = sorted(e.get('niveau_min', 1) for e in equipements)
+
+    def obtenir(self, classe, emplacement, item_id, meme_classe=False):
+        """Équipement par identifiant, ou None s'il est absent
+
+        Un équipement d'une autre classe (ex: profil dont la classe a été retirée) est retrouvé
+        par son identifiant, sauf avec `meme_classe`.
+        """
+        if item_id is None:
+            return None
+        equipement = self.par_id.get((classe, emplacement, item_id))
+        if equipement is None and not meme_classe:
+            equipement = self.ids_toutes_classes.get((emplacement, item_id))
+        return equipement
+
+    def nom(self, classe, emplacement, item_id):
+        """Nom affichable d'un équipement porté"""
+        equipement = self.obtenir(classe, emplacement, item_id)
+        return equipement['nom'] if equipement else str(item_id)
+
+    def liste(self, classe, emplacement):
+        return self.listes.get((classe, emplacement), [])
+
+    def numero(self, classe, emplacement, numero):
+        """Équipement par numéro de boutique (1 = premier), None si hors limites"""
+        equipements = self.liste(classe, emplacement)
+        if 1 <= numero <= len(equipements):
+            return equipements[numero - 1]
+        return None
+
+    def position(self, classe, emplacement, item_id):
+        """Position d'un équipement dans la boutique (None si absent)"""
+        return self.positions.get((classe, emplacement, item_id))
+
+    def nb_abordables(self, classe, emplacement, sable):
+        """Nombre d'équipements dont le coût est <= sable"""
+        return bisect_right(self.couts.get((classe, emplacement), []), sable)
+
+    def nb_debloques(self, classe, emplacement, niveau):
+        """Nombre d'équipements accessibles à ce niveau"""
+        return bisect_right(self.niveaux.get((classe, emplacement), []), niveau)
+
+    def migrer_reference(self, classe, emplacement, valeur):
+        """Convertit un ancien nom d'équipement en identifiant (les identifiants sont gardés tels quels)"""
+        if isinstance(valeur, str):
+            equipement = (self.par_nom.get((classe, emplacement, valeur))
+                          or self.noms_toutes_classes.get((emplacement, valeur)))
+            return equipement['id'] if equipement else None
+        return valeur
@@ -0,0 +1,180 @@
+from sortedcontainers import SortedList
+
+
+class IndexClassement:
+    """Classement trié sur un champ des profils, mis à jour à chaque mutation"""
+    def __init__(self, champ):
+        self.champ = champ
+        self.valeurs = {}  # user_id -> valeur actuellement indexée
+        self.ordre = SortedList()  # (-valeur, user_id): le premier est le meilleur
+
+    def _valeur(self, profil):
+        return profil.get(self.champ) or 0
+
+    def mettre_a_jour(self, user_id, profil):
+        """Repositionne un joueur si sa valeur a changé (O(log n))"""
+        user_id = str(user_id)
+        valeur = self._valeur(profil)
+        ancienne = self.valeurs.get(user_id)
+        if ancienne == valeur:
+            return
+        if ancienne is not None:
+            self.ordre.remove((-ancienne, user_id))
+        self.ordre.add((-valeur, user_id))
+        self.valeurs[user_id] = valeur
+
+    def retirer(self, user_id):
+        user_id = str(user_id)
+        ancienne = self.valeurs.pop(user_id, None)
+        if ancienne is not None:
+            self.ordre.remove((-ancienne, user_id))
+
+    def reconstruire(self, profils):
+        """Reconstruit l'index depuis tous les profils (démarrage, reset)"""
+        self.valeurs = {str(user_id): self._valeur(profil) for user_id, profil in profils.items()}
+        self.ordre = SortedList((-valeur, user_id) for user_id, valeur in self.valeurs.items())
+
+    def top(self, limite):
+        """Retourne les `limite` meilleurs (user_id, valeur) en O(limite)"""
+        return [(user_id, -valeur) for valeur, user_id in self.ordre.islice(0, limite)]
+
+    def __len__(self):
+        return len(self.ordre)
+
+    def rang(self, user_id):
+        """Rang (1 = premier) d'un joueur en O(log n), None s'il n'est pas classé"""
+        user_id = str(user_id)
+        valeur = self.valeurs.get(user_id)
+        if valeur is None:
+            return None
+        return self.ordre.index((-valeur, user_id)) + 1
+
+    def autour(self, user_id, rayon=5):
+        """Retourne les (rang, user_id, valeur) autour d'un joueur (± rayon)"""
+        rang = self.rang(user_id)
+        if rang is None:
+            return []
+        debut = max(0, rang - 1 - rayon)
+        return [
+            (debut + i + 1, uid, -valeur)
+            for i, (valeur, uid) in enumerate(self.ordre.islice(debut, rang + rayon))
+        ]
+
+
+class Classements:
+    """Ensemble d'index de classement, un par métrique"""
+    def __init__(self, champs):
+        self.index = {champ: IndexClassement(champ) for champ in champs}
+
+    def __getitem__(self, champ):
+        return self.index[champ]
+
+    def __contains__(self, champ):
+        return champ in self.index
+
+    def mettre_a_jour(self, user_id, profil):
+        for index in self.index.values():
+            index.mettre_a_jour(user_id, profil)
+
+    def reconstruire(self, profils):
+        for index in self.index.values():
+            index.reconstruire(profils)
+
+
+class StatistiquesServeur:
+    """Agrégats du serveur tenus à jour à chaque mutation (!stats en O(1))"""
+    CHAMPS = ('sable', 'puissance', 'messages_envoyes', 'temps_vocal_minutes', 'niveau')
+
+    def __init__(self, index_sable, index_puissance):
+        self.index_sable = index_sable  # Sert au plus riche et aux percentiles de sable
+        self.index_puissance = index_puissance
+        self._vider()
+
+    def _vider(self):
+        self.contributions = {}  # user_id -> (valeurs des CHAMPS..., classe)
+        self.totaux = dict.fromkeys(self.CHAMPS, 0)
+        self.classes = {}
+        self.niveaux = {}  # Histogramme niveau -> nombre de joueurs
+
+    def _contribution(self, profil):
+        return tuple(profil.get(champ) or 0 for champ in self.CHAMPS) + (profil.get('classe'),)
+
+    def _appliquer(self, contribution, signe):
+        for champ, valeur in zip(self.CHAMPS, contribution):
+            self.totaux[champ] += signe * valeur
+        classe = contribution[-1]
+        if classe:
+            self.classes[classe] = self.classes.get(classe, 0) + signe
+            if not self.classes[classe]:
+                del self.classes[classe]
+        niveau = contribution[self.CHAMPS.index('niveau')]
+        self.niveaux[niveau] = self.niveaux.get(niveau, 0) + signe
+        if not self.niveaux[niveau]:
+            del self.niveaux[niveau]
+
+    def mettre_a_jour(self, user_id, profil):
+        user_id = str(user_id)
+        nouvelle = self._contribution(profil)
+        ancienne = self.contributions.get(user_id)
+        if ancienne == nouvelle:
+            return
+        if ancienne is not None:
+            self._appliquer(ancienne, -1)
+        self._appliquer(nouvelle, 1)
+        self.contributions[user_id] = nouvelle
+
+    def reconstruire(self, profils):
+        self._vider()
+        for user_id, profil in profils.items():
+            self.mettre_a_jour(user_id, profil)
+
+    def reconcilier(self, profils):
+        """Recalcule tout depuis les profils et retourne les écarts constatés"""
+        avant = dict(self.totaux), dict(self.classes)
+        self.reconstruire(profils)
+        ecarts = {champ: avant[0][champ] - self.totaux[champ] for champ in self.CHAMPS if avant[0][champ] != self.totaux[champ]}
+        if avant[1] != self.classes:
+            ecarts['classes'] = avant[1]
+        return ecarts
+
+    def percentile_niveau(self, p):
+        """Niveau au percentile p (0-100), via l'histogramme des niveaux"""
+        total = len(self.contributions)
+        if not total:
+            return 0
+        rang = min(total - 1, int(total * p / 100))
+        cumul = 0
+        for niveau in sorted(self.niveaux):
+            cumul += self.niveaux[niveau]
+            if cumul > rang:
+                return niveau
+        return 0
+
+    def percentile_sable(self, p):
+        """Sable au percentile p (0-100), via l'index trié du sable"""
+        total = len(self.index_sable)
+        if not total:
+            return 0
+        # L'index est trié par ordre décroissant
+        rang = min(total - 1, int(total * p / 100))
+        valeur, _ = self.index_sable.ordre[total - 1 - rang]
+        return -valeur
+
+    def resume(self):
+        total = len(self.contributions)
+        plus_riche = self.index_sable.top(1)
+        plus_puissant = self.index_puissance.top(1)
+        return {
+            'total_joueurs': total,
+            'total_sable': self.totaux['sable'],
+            'total_puissance': self.totaux['puissance'],
+            'total_messages': self.totaux['messages_envoyes'],
+            'total_vocal': self.totaux['temps_vocal_minutes'],
+            'niveau_moyen': self.totaux['niveau'] / total if total else 0,
+            'niveau_median': self.percentile_niveau(50),
+            'sable_median': self.percentile_sable(50),
+            'sable_p90': self.percentile_sable(90),
+            'classes': dict(self.classes),
+            'plus_riche': plus_riche[0] if plus_riche else (None, 0),
+            'plus_puissant': plus_puissant[0] if plus_puissant else (None, 0),
+        }
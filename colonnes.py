@@ -0,0 +1,203 @@
+import heapq
+from array import array
+from collections import Counter
+from itertools import compress, repeat
+from operator import floordiv
+
+# Champs numériques gardés en colonnes
+COLONNES = ('sable', 'puissance', 'niveau', 'prestige', 'messages_envoyes', 'streak_daily')
+
+# Classes codées sur un octet (0 = pas de classe)
+MAX_CLASSES = 255
+
+TOUTES = object()  # Filtre par défaut: toutes les classes
+
+
+class VueColonnes:
+    """Profils de la saison rangés en colonnes typées (array), tenues à jour comme un index
+
+    Une ligne par joueur; les requêtes sur toute la population (sommes, regroupements
+    par classe, top, histogrammes) parcourent les colonnes en C plutôt que les dicts.
+    """
+    def __init__(self, colonnes=COLONNES):
+        self.noms = tuple(colonnes)
+        self.codes_classes = {None: 0}  # classe -> code
+        self.classes_par_code = [None]  # code -> classe
+        self._vider()
+
+    def _vider(self):
+        self.user_ids = []  # ligne -> user_id
+        self.lignes = {}  # user_id -> ligne
+        self.colonnes = {nom: array('q') for nom in self.noms}
+        self.classes = bytearray()  # ligne -> code de classe
+        self.effectifs = [0] * (MAX_CLASSES + 1)  # code de classe -> nombre de lignes
+        self.totaux = {nom: [0] * (MAX_CLASSES + 1) for nom in self.noms}  # colonne -> somme par code de classe
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def _code(self, classe):
+        code = self.codes_classes.get(classe)
+        if code is None:
+            if len(self.classes_par_code) > MAX_CLASSES:
+                raise ValueError(f"Trop de classes pour la vue en colonnes: {classe}")
+            code = self.codes_classes[classe] = len(self.classes_par_code)
+            self.classes_par_code.append(classe)
+        return code
+
+    def mettre_a_jour(self, user_id, profil):
+        user_id = str(user_id)
+        code = self._code(profil.get('classe'))
+        ligne = self.lignes.get(user_id)
+        if ligne is None:
+            self.lignes[user_id] = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.classes.append(code)
+            self.effectifs[code] += 1
+            for nom, colonne in self.colonnes.items():
+                valeur = int(profil.get(nom) or 0)
+                colonne.append(valeur)
+                self.totaux[nom][code] += valeur
+            return
+        # Les totaux par classe suivent la ligne: retrait de l'ancienne contribution, ajout de la nouvelle
+        ancien_code = self.classes[ligne]
+        self.classes[ligne] = code
+        self.effectifs[ancien_code] -= 1
+        self.effectifs[code] += 1
+        for nom, colonne in self.colonnes.items():
+            valeur = int(profil.get(nom) or 0)
+            totaux = self.totaux[nom]
+            totaux[ancien_code] -= colonne[ligne]
+            totaux[code] += valeur
+            colonne[ligne] = valeur
+
+    def reconstruire(self, profils):
+        self._vider()
+        self.user_ids = list(profils)
+        self.lignes = {user_id: ligne for ligne, user_id in enumerate(self.user_ids)}
+        valeurs = list(profils.values())
+        for nom in self.noms:
+            self.colonnes[nom] = array('q', (int(p.get(nom) or 0) for p in valeurs))
+        self.classes = bytearray(self._code(p.get('classe')) for p in valeurs)
+        for code in range(len(self.classes_par_code)):
+            self.effectifs[code] = self.classes.count(code)
+            if self.effectifs[code]:
+                masque = self._masque_code(code)
+                for nom in self.noms:
+                    self.totaux[nom][code] = sum(compress(self.colonnes[nom], masque))
+
+    def colonne(self, nom):
+        """Colonne brute (alignée sur user_ids), à ne pas modifier"""
+        return self.colonnes[nom]
+
+    def _masque_code(self, code):
+        """Octet 1 pour les lignes de la classe, 0 sinon (calculé en C par translate)"""
+        table = bytearray(256)
+        table[code] = 1
+        return self.classes.translate(table)
+
+    def _masque(self, classe):
+        code = self.codes_classes.get(classe)
+        return self._masque_code(code) if code is not None else bytearray(len(self.classes))
+
+    def _filtrer(self, valeurs, classe):
+        if classe is TOUTES:
+            return valeurs
+        return compress(valeurs, self._masque(classe))
+
+    def somme(self, nom, classe=TOUTES):
+        """Somme d'une colonne (tenue à jour à chaque mutation: O(1))"""
+        if classe is TOUTES:
+            return sum(self.totaux[nom])
+        code = self.codes_classes.get(classe)
+        return self.totaux[nom][code] if code is not None else 0
+
+    def nombre(self, classe=TOUTES):
+        if classe is TOUTES:
+            return len(self.user_ids)
+        code = self.codes_classes.get(classe)
+        return self.effectifs[code] if code is not None else 0
+
+    def par_classe(self, nom):
+        """classe -> (joueurs, somme de la colonne), pour les classes présentes"""
+        resultat = {}
+        for classe in self.classes_par_code:
+            nombre = self.nombre(classe)
+            if nombre:
+                resultat[classe] = (nombre, self.somme(nom, classe))
+        return resultat
+
+    def top(self, nom, k, classe=TOUTES):
+        """Les k meilleures lignes sur une colonne: [(user_id, valeur)] par valeur décroissante"""
+        if classe is TOUTES:
+            valeurs = self.colonnes[nom]
+            lignes = None
+        else:
+            masque = self._masque(classe)
+            valeurs = array('q', compress(self.colonnes[nom], masque))
+            lignes = list(compress(range(len(masque)), masque))
+        meilleures = heapq.nlargest(k, valeurs)
+        resultat = []
+        for valeur in sorted(set(meilleures), reverse=True):
+            # Recherche des lignes par index() (parcours en C), seulement pour les valeurs retenues
+            position = -1
+            for _ in range(meilleures.count(valeur)):
+                position = valeurs.index(valeur, position + 1)
+                ligne = position if lignes is None else lignes[position]
+                resultat.append((self.user_ids[ligne], valeur))
+        return resultat
+
+    def histogramme(self, nom, largeur=1, classe=TOUTES):
+        """Nombre de lignes par tranche [borne, borne + largeur), trié par borne"""
+        valeurs = self._filtrer(self.colonnes[nom], classe)
+        if largeur == 1:
+            comptes = Counter(valeurs)
+        else:
+            comptes = Counter(map(floordiv, valeurs, repeat(largeur)))
+            comptes = {tranche * largeur: nombre for tranche, nombre in comptes.items()}
+        return dict(sorted(comptes.items()))
+
+
+if __name__ == "__main__":
+    # Comparaison avec le parcours des dicts: python colonnes.py [nombre de profils]
+    import sys
+    import time
+    import random
+
+    nombre = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    aleatoire = random.Random(17)
+    profils = {
+        str(i): {
+            'sable': aleatoire.randint(0, 50000),
+            'puissance': aleatoire.randint(0, 5000),
+            'niveau': aleatoire.randint(1, 60),
+            'prestige': aleatoire.randint(0, 3),
+            'messages_envoyes': aleatoire.randint(0, 20000),
+            'streak_daily': aleatoire.randint(0, 30),
+            'classe': aleatoire.choice(['chevalier', 'samourai', 'mage', None]),
+        }
+        for i in range(nombre)
+    }
+
+    def mesurer(fonction):
+        debut = time.perf_counter()
+        fonction()
+        return (time.perf_counter() - debut) * 1000
+
+    def par_classe_dicts():
+        resultat = {}
+        for p in profils.values():
+            nombre_classe, somme = resultat.get(p['classe'], (0, 0))
+            resultat[p['classe']] = (nombre_classe + 1, somme + p['sable'])
+        return resultat
+
+    vue = VueColonnes()
+    print(f"{nombre} profils, construction de la vue: {mesurer(lambda: vue.reconstruire(profils)):.0f} ms")
+    requetes = [
+        ("somme du sable", lambda: sum(p['sable'] for p in profils.values()), lambda: vue.somme('sable')),
+        ("sable par classe", par_classe_dicts, lambda: vue.par_classe('sable')),
+        ("top 10 puissance", lambda: heapq.nlargest(10, profils.items(), key=lambda e: e[1]['puissance']), lambda: vue.top('puissance', 10)),
+        ("histogramme des niveaux", lambda: Counter(p['niveau'] for p in profils.values()), lambda: vue.histogramme('niveau')),
+    ]
+    for nom, dicts, colonnes in requetes:
+        print(f"{nom:<26} dicts: {mesurer(dicts):>7.1f} ms   colonnes: {mesurer(colonnes):>7.1f} ms")
@@ -0,0 +1,76 @@
+import json
+import contextvars
+from catalogue import CatalogueEquipements, EMPLACEMENTS
+from progression import MoteurAchievements
+
+VERSION_FORMAT = 1  # Format du fichier de contenu compris par ce code
+
+# Version épinglée par la commande en cours (chaque tâche asyncio a sa propre valeur)
+contenu_epingle = contextvars.ContextVar('contenu_epingle', default=None)
+
+
+class ContenuJeu:
+    """Classes, équipements et achievements d'une version du fichier de contenu, déjà compilés"""
+    def __init__(self, version, classes, achievements):
+        self.version = version
+        self.classes = classes
+        self.achievements = achievements
+        self.catalogue = CatalogueEquipements(classes)
+        self.moteur = MoteurAchievements(achievements)
+
+
+def _exiger(condition, message):
+    if not condition:
+        raise ValueError(message)
+
+
+def valider_contenu(brut):
+    """Vérifie la structure du fichier de contenu (ValueError au premier problème)"""
+    _exiger(isinstance(brut, dict), "Le contenu doit être un objet JSON")
+    _exiger(brut.get('format') == VERSION_FORMAT, f"Format de contenu non supporté: {brut.get('format')}")
+    _exiger(isinstance(brut.get('version'), int), "Champ 'version' entier manquant")
+    classes = brut.get('classes')
+    _exiger(isinstance(classes, dict) and classes, "Aucune classe définie")
+    for classe, classe_data in classes.items():
+        _exiger(isinstance(classe_data.get('emoji'), str), f"Classe {classe}: emoji manquant")
+        _exiger(isinstance(classe_data.get('description'), str), f"Classe {classe}: description manquante")
+        for emplacement, liste in EMPLACEMENTS.items():
+            bonus = 'puissance' if emplacement == 'arme' else 'defense'
+            equipements = classe_data.get(liste)
+            _exiger(isinstance(equipements, list), f"Classe {classe}: liste '{liste}' manquante")
+            for equipement in equipements:
+                nom = equipement.get('nom')
+                _exiger(isinstance(nom, str) and nom, f"Classe {classe}: équipement sans nom")
+                for champ in ('cout', bonus, 'niveau_min'):
+                    valeur = equipement.get(champ)
+                    _exiger(isinstance(valeur, int) and valeur >= 0, f"{nom}: '{champ}' doit être un entier positif")
+    achievements = brut.get('achievements')
+    _exiger(isinstance(achievements, dict), "Aucun achievement défini")
+    for achievement_id, definition in achievements.items():
+        for champ in ('nom', 'emoji', 'description'):
+            _exiger(isinstance(definition.get(champ), str), f"Achievement {achievement_id}: '{champ}' manquant")
+        if 'champ' in definition:
+            _exiger(isinstance(definition.get('min'), (int, float)), f"Achievement {achievement_id}: seuil 'min' manquant")
+
+
+def compiler_contenu(brut):
+    """Valide puis compile le contenu en index prêts à l'emploi"""
+    valider_contenu(brut)
+    return ContenuJeu(brut['version'], brut['classes'], brut['achievements'])
+
+
+def charger_contenu(fichier):
+    """Lit, valide et compile le fichier de contenu"""
+    with open(fichier, 'r', encoding='utf-8') as f:
+        return compiler_contenu(json.load(f))
+
+
+def verifier_compatibilite(ancien, nouveau):
+    """Refuse un rechargement qui casserait les profils existants (classes ou équipements retirés)"""
+    _exiger(nouveau.version > ancien.version, f"La version doit augmenter (actuelle: {ancien.version}, fichier: {nouveau.version})")
+    classes_retirees = set(ancien.classes) - set(nouveau.classes)
+    _exiger(not classes_retirees, f"Classes retirées: {', '.join(sorted(classes_retirees))}")
+    anciens_ids = {cle[2] for cle in ancien.catalogue.par_id}
+    nouveaux_ids = {cle[2] for cle in nouveau.catalogue.par_id}
+    ids_retires = anciens_ids - nouveaux_ids
+    _exiger(not ids_retires, f"Équipements retirés: {', '.join(map(str, sorted(ids_retires)))}")
@@ -0,0 +1,72 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AccumulateurRecompenses:
+    """Regroupe les gains de messages par joueur et les applique au stockage par lots"""
+    def __init__(self, sable_par_message, delai_min=1):
+        self.sable_par_message = sable_par_message
+        self.delai_min = delai_min  # Secondes min entre deux gains (anti-spam)
+        self.en_attente = {}  # user_id -> [messages, dernier_gain_message]
+        self.evenements = 0
+        self.absorbes = 0
+        self.ecritures = 0
+        self.lots = 0
+
+    def enregistrer(self, user_id, dernier_gain, timestamp):
+        """Compte un message récompensé si l'anti-spam le permet"""
+        self.evenements += 1
+        user_id = str(user_id)
+        attente = self.en_attente.get(user_id)
+        if timestamp - (attente[1] if attente else dernier_gain) < self.delai_min:
+            return False
+        if attente:
+            attente[0] += 1
+            attente[1] = timestamp
+        else:
+            self.en_attente[user_id] = [1, timestamp]
+        self.absorbes += 1
+        return True
+
+    def _mutation(self, messages, timestamp):
+        """(incréments, valeurs) correspondant à des messages récompensés"""
+        return {'sable': messages * self.sable_par_message, 'messages_envoyes': messages}, {'dernier_gain_message': timestamp}
+
+    def _appliquer(self, user_id, messages, timestamp, appliquer):
+        appliquer(user_id, *self._mutation(messages, timestamp))
+        self.ecritures += 1
+
+    def vider(self, appliquer):
+        """Applique tous les gains en attente: une mutation par joueur"""
+        lot, self.en_attente = self.en_attente, {}
+        for user_id, (messages, timestamp) in lot.items():
+            try:
+                self._appliquer(user_id, messages, timestamp, appliquer)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'application des gains de {user_id}: {e}")
+        if lot:
+            self.lots += 1
+        return len(lot)
+
+    def vider_joueur(self, user_id, appliquer):
+        """Applique immédiatement les gains en attente d'un seul joueur"""
+        attente = self.en_attente.pop(str(user_id), None)
+        if attente:
+            self._appliquer(str(user_id), attente[0], attente[1], appliquer)
+
+    def gains_en_attente(self, user_id):
+        """(incréments, valeurs) pas encore appliqués d'un joueur, sans les appliquer (None s'il n'y en a pas)"""
+        attente = self.en_attente.get(str(user_id))
+        if not attente:
+            return None
+        return self._mutation(attente[0], attente[1])
+
+    def compteurs(self):
+        return {
+            'evenements': self.evenements,
+            'absorbes': self.absorbes,
+            'ecritures': self.ecritures,
+            'lots': self.lots,
+            'en_attente': len(self.en_attente),
+        }
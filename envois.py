@@ -0,0 +1,256 @@
+import time
+import heapq
+import asyncio
+import logging
+from collections import deque
+from limites import LimiteurDebit
+
+logger = logging.getLogger(__name__)
+
+LIMITE_MESSAGE_DISCORD = 2000
+
+
+def regrouper_lignes(lignes, limite=LIMITE_MESSAGE_DISCORD):
+    """Regroupe des lignes en blocs de code qui respectent la limite de caractères"""
+    enveloppe = len("```\n```")
+    maximum = limite - enveloppe
+    blocs = []
+    courant = []
+    taille = 0
+    for ligne in lignes:
+        if len(ligne) > maximum - 1:
+            ligne = ligne[:maximum - 2] + "…"
+        if courant and taille + len(ligne) + 1 > maximum:
+            blocs.append(courant)
+            courant, taille = [], 0
+        courant.append(ligne)
+        taille += len(ligne) + 1
+    if courant:
+        blocs.append(courant)
+    return ["```\n" + "\n".join(bloc) + "```" for bloc in blocs]
+
+
+class ExpediteurLogs:
+    """File de logs envoyée en arrière-plan, plusieurs lignes par message Discord"""
+    def __init__(self, envoyer, intervalle=5, taille_max=500):
+        self.envoyer = envoyer  # Coroutine qui envoie un texte dans le salon de logs
+        self.intervalle = intervalle  # Secondes max avant l'envoi d'un lot
+        self.taille_max = taille_max  # Lignes en file au-delà desquelles les logs non prioritaires sont ignorés
+        self.file = deque()
+        self.caracteres = 0
+        self.ignores = 0
+        self.envoyes = 0
+        self.messages = 0
+        self.reveil = asyncio.Event()
+        self.tache = None
+
+    def ajouter(self, ligne, prioritaire=False):
+        """Met une ligne en file sans jamais bloquer l'appelant"""
+        if len(self.file) >= self.taille_max and not prioritaire:
+            self.ignores += 1
+            return False
+        self.file.append(ligne)
+        self.caracteres += len(ligne) + 1
+        if self.caracteres >= LIMITE_MESSAGE_DISCORD:
+            # Un message plein est prêt: envoyer sans attendre l'intervalle
+            self.reveil.set()
+        return True
+
+    def demarrer(self):
+        if self.tache is None or self.tache.done():
+            self.tache = asyncio.get_running_loop().create_task(self._boucle())
+
+    async def _boucle(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.reveil.wait(), timeout=self.intervalle)
+            except asyncio.TimeoutError:
+                pass
+            self.reveil.clear()
+            await self.vider()
+
+    async def vider(self):
+        """Envoie toutes les lignes en file, regroupées en un minimum de messages"""
+        if not self.file and not self.ignores:
+            return 0
+        lignes = list(self.file)
+        self.file.clear()
+        self.caracteres = 0
+        if self.ignores:
+            lignes.insert(0, f"[{self.ignores} logs ignorés (file saturée)]")
+            self.ignores = 0
+        for bloc in regrouper_lignes(lignes):
+            try:
+                await self.envoyer(bloc)
+                self.messages += 1
+            except Exception as e:
+                logger.error(f"Erreur lors de l'envoi du log: {e}")
+        self.envoyes += len(lignes)
+        return len(lignes)
+
+    async def arreter(self):
+        """Arrête la boucle et envoie les derniers logs"""
+        if self.tache:
+            self.tache.cancel()
+            self.tache = None
+        await self.vider()
+
+    def compteurs(self):
+        return {
+            'en_file': len(self.file),
+            'envoyes': self.envoyes,
+            'messages': self.messages,
+            'ignores': self.ignores,
+        }
+
+
+def delai_rate_limit(erreur):
+    """Secondes à attendre si l'erreur est un rate limit Discord (429), sinon None"""
+    retry_after = getattr(erreur, 'retry_after', None)
+    if retry_after is not None:
+        return float(retry_after)
+    if getattr(erreur, 'status', None) == 429:
+        reponse = getattr(erreur, 'response', None)
+        entetes = getattr(reponse, 'headers', None) or {}
+        return float(entetes.get('Retry-After', 1))
+    return None
+
+
+class PlanificateurEnvois:
+    """Ordonnance les envois vers Discord: réponses interactives d'abord, tâches de fond en dernier"""
+    INTERACTIF = 0
+    NORMAL = 1
+    FOND = 2
+
+    def __init__(self, debit_route=(5, 1.0), ouvriers=1):
+        self.debit_route = debit_route  # Capacité et jetons/seconde par route pour les envois en file
+        self.debits = {}  # route -> (capacite, jetons/seconde) spécifiques
+        self.ouvriers = ouvriers  # Envois en file exécutés simultanément
+        self.limiteur = LimiteurDebit()
+        self.file = []  # Tas de (priorite, sequence, route, fabrique, future)
+        self.sequence = 0
+        self.bloquees = {}  # route -> instant de reprise après un 429 (None = global)
+        self.reveil = asyncio.Event()
+        self.taches = []
+        self.envois = [0, 0, 0]
+        self.rate_limits = 0
+
+    def _attente(self, route):
+        """Secondes avant que la route soit de nouveau utilisable"""
+        maintenant = time.monotonic()
+        reprise = max(self.bloquees.get(route, 0), self.bloquees.get(None, 0))
+        return max(0.0, reprise - maintenant)
+
+    def configurer_route(self, route, capacite, debit):
+        """Fixe le débit d'une route (ex: retraits de rôles d'un serveur)"""
+        self.debits[route] = (capacite, debit)
+
+    def bloquer(self, route, secondes):
+        """Suspend une route (ou tout, si route est None) après un 429"""
+        self.rate_limits += 1
+        reprise = time.monotonic() + secondes
+        self.bloquees[route] = max(self.bloquees.get(route, 0), reprise)
+        logger.warning(f"Rate limit Discord sur {route or 'global'}: pause de {secondes:.1f}s")
+
+    async def _executer(self, route, fabrique, priorite):
+        while True:
+            attente = self._attente(route)
+            if attente:
+                await asyncio.sleep(attente)
+            try:
+                resultat = await fabrique()
+                self.envois[priorite] += 1
+                return resultat
+            except Exception as e:
+                delai = delai_rate_limit(e)
+                if delai is None:
+                    raise
+                self.bloquer(route, delai)
+
+    async def envoyer(self, route, fabrique, priorite=NORMAL):
+        """Envoie via `fabrique()` (coroutine) et attend le résultat
+
+        Les envois interactifs partent immédiatement; les autres passent par la file
+        (ou partent directement si la boucle n'est pas démarrée).
+        """
+        if priorite == self.INTERACTIF or not self.taches:
+            return await self._executer(route, fabrique, priorite)
+        return await self.planifier(route, fabrique, priorite)
+
+    def planifier(self, route, fabrique, priorite=FOND):
+        """Met un envoi en file sans l'attendre, retourne son future"""
+        future = asyncio.get_running_loop().create_future()
+        self.sequence += 1
+        heapq.heappush(self.file, (priorite, self.sequence, route, fabrique, future))
+        self.reveil.set()
+        return future
+
+    def _prochain(self):
+        """Retire l'envoi prioritaire dont la route est libre, ou retourne le délai d'attente"""
+        ecartes = []
+        choisi = None
+        attente_min = None
+        while self.file:
+            element = heapq.heappop(self.file)
+            route = element[2]
+            attente = self._attente(route)
+            if not attente:
+                capacite, debit = self.debits.get(route, self.debit_route)
+                attente = self.limiteur.consommer([(('route', route), capacite, debit, 1)])
+            if not attente:
+                choisi = element
+                break
+            ecartes.append(element)
+            attente_min = attente if attente_min is None else min(attente_min, attente)
+        for element in ecartes:
+            heapq.heappush(self.file, element)
+        return choisi, attente_min
+
+    async def _boucle(self):
+        while True:
+            if not self.file:
+                self.reveil.clear()
+                await self.reveil.wait()
+                continue
+            element, attente = self._prochain()
+            if element is None:
+                self.reveil.clear()
+                try:
+                    await asyncio.wait_for(self.reveil.wait(), timeout=attente)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            priorite, _, route, fabrique, future = element
+            if future.cancelled():
+                continue
+            try:
+                future.set_result(await self._executer(route, fabrique, priorite))
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+
+    def demarrer(self):
+        self.taches = [tache for tache in self.taches if not tache.done()]
+        boucle = asyncio.get_running_loop()
+        while len(self.taches) < self.ouvriers:
+            self.taches.append(boucle.create_task(self._boucle()))
+
+    async def arreter(self):
+        """Arrête les boucles; les envois encore en file sont annulés"""
+        for tache in self.taches:
+            tache.cancel()
+        self.taches = []
+        while self.file:
+            future = heapq.heappop(self.file)[4]
+            if not future.done():
+                future.cancel()
+
+    def compteurs(self):
+        return {
+            'en_file': len(self.file),
+            'interactifs': self.envois[self.INTERACTIF],
+            'normaux': self.envois[self.NORMAL],
+            'fond': self.envois[self.FOND],
+            'rate_limits': self.rate_limits,
+            'routes_bloquees': sum(1 for route in self.bloquees if self._attente(route)),
+        }
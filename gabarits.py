@@ -0,0 +1,44 @@
+class CacheEmbeds:
+    """Embeds construits une fois par version du contenu, puis réutilisés (ou copiés pour être personnalisés)"""
+    def __init__(self):
+        self.version = None  # Version du contenu des embeds en cache
+        self.embeds = {}  # cle -> embed
+        self.constructions = 0
+        self.succes = 0
+
+    def invalider(self, version=None):
+        """Vide le cache (ex: rechargement du contenu)"""
+        self.embeds.clear()
+        self.version = version
+
+    def obtenir(self, version, cle, construire):
+        """Embed partagé pour `cle`, construit par `construire()` au premier appel
+
+        L'embed retourné ne doit pas être modifié: utiliser `copie` pour le personnaliser.
+        """
+        if self.version is None or version > self.version:
+            self.invalider(version)
+        if version < self.version:
+            # Commande épinglée sur une ancienne version: construit sans toucher au cache
+            self.constructions += 1
+            return construire()
+        embed = self.embeds.get(cle)
+        if embed is not None:
+            self.succes += 1
+            return embed
+        embed = construire()
+        self.constructions += 1
+        self.embeds[cle] = embed
+        return embed
+
+    def copie(self, version, cle, construire):
+        """Copie modifiable de l'embed en cache"""
+        return self.obtenir(version, cle, construire).copy()
+
+    def compteurs(self):
+        return {
+            'entrees': len(self.embeds),
+            'version': self.version,
+            'succes': self.succes,
+            'constructions': self.constructions,
+        }
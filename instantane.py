@@ -0,0 +1,426 @@
+import os
+import sys
+import json
+import time
+import mmap
+import zlib
+import struct
+from collections.abc import Mapping
+from profils import BRUT, RegistreBits, ProfilCompact, registre_achievements, encoder_id, encoder_date, decoder_date
+
+# Fichier: en-tête | enregistrements de taille fixe (triés par id) | index des chaînes | chaînes UTF-8
+MAGIQUE = b'MDSB'
+VERSION_FORMAT = 1
+COMPRESSE = 1  # Drapeau: tout ce qui suit l'en-tête est compressé (zlib), donc lu en entier
+EN_TETE = struct.Struct('<4sHHQQQQ')  # magique, version, drapeaux, profils, profils triés, chaînes, réf. table des achievements
+AUCUNE = 0xFFFFFFFF  # Référence de chaîne absente
+BORNES_CHAINE = struct.Struct('<QQ')  # Début et fin d'une chaîne dans la zone des chaînes
+
+# (champ, sorte, format struct): 'entier' borné par son format, 'date' en microsecondes,
+# 'flottant' (un entier d'origine est marqué), 'bits' pour les achievements, 'chaine' dans la table
+CHAMPS = (
+    ('sable', 'entier', 'q'),
+    ('puissance', 'entier', 'q'),
+    ('niveau', 'entier', 'i'),
+    ('prestige', 'entier', 'i'),
+    ('messages_envoyes', 'entier', 'q'),
+    ('sable_depense', 'entier', 'q'),
+    ('boosts', 'entier', 'i'),
+    ('equipment_count', 'entier', 'i'),
+    ('streak_daily', 'entier', 'i'),
+    ('saison', 'entier', 'i'),
+    ('schema_version', 'entier', 'i'),
+    ('journal_seq', 'entier', 'q'),
+    ('temps_vocal_minutes', 'entier', 'q'),
+    ('arme', 'entier', 'i'),
+    ('armure', 'entier', 'i'),
+    ('date_creation', 'date', 'q'),
+    ('dernier_daily', 'date', 'q'),
+    ('dernier_gain_message', 'flottant', 'd'),
+    ('dernier_gain_vocal', 'flottant', 'd'),
+    ('achievements', 'bits', 'Q'),
+    ('username', 'chaine', 'I'),
+    ('classe', 'chaine', 'I'),
+)
+# Clé (id numérique), masques présents/nuls/entiers, référence du JSON des valeurs non encodables
+ENREGISTREMENT = struct.Struct('<QIIII' + ''.join(fmt for _, _, fmt in CHAMPS))
+BORNES = {'i': (-2**31, 2**31 - 1), 'q': (-2**63, 2**63 - 1), 'Q': (0, 2**64 - 1)}
+CLE = '#cle'  # Clé non numérique, gardée dans le JSON des valeurs non encodables
+ID = 'id'  # Le champ id n'est stocké que s'il diffère de la clé
+NOMS = tuple(champ for champ, _, _ in CHAMPS)
+NOMS_CHAMPS = frozenset(NOMS)
+TOUS_PRESENTS = (1 << len(CHAMPS)) - 1
+
+
+def _entier(valeur, fmt):
+    if type(valeur) is not int:
+        return BRUT
+    minimum, maximum = BORNES[fmt]
+    return valeur if minimum <= valeur <= maximum else BRUT
+
+
+class _TableChaines:
+    def __init__(self):
+        self.index = {}
+        self.chaines = []
+
+    def ajouter(self, chaine):
+        reference = self.index.get(chaine)
+        if reference is None:
+            reference = self.index[chaine] = len(self.chaines)
+            self.chaines.append(chaine)
+        return reference
+
+
+def _encoder(cle, profil, chaines, bits):
+    """(clé non numérique, tuple d'enregistrement); ce qui ne tient pas dans le format fixe part dans `extra`"""
+    extra = {}
+    numero = encoder_id(cle)
+    if numero is BRUT or numero >= 2**64:
+        extra[CLE] = cle
+        numero = 0
+    presents = nuls = entiers = 0
+    valeurs = []
+    for position, (champ, sorte, fmt) in enumerate(CHAMPS):
+        valeur = profil.get(champ, BRUT)
+        encodee = BRUT
+        if valeur is None:
+            if champ in profil:
+                nuls |= 1 << position
+                presents |= 1 << position
+            valeurs.append(0)
+            continue
+        if valeur is BRUT:
+            valeurs.append(0)
+            continue
+        if sorte == 'entier':
+            encodee = _entier(valeur, fmt)
+        elif sorte == 'date':
+            encodee = encoder_date(valeur)
+            encodee = BRUT if encodee is None else _entier(encodee, fmt)
+        elif sorte == 'flottant':
+            if type(valeur) is float:
+                encodee = valeur
+            elif type(valeur) is int and abs(valeur) <= 2**53:
+                encodee = float(valeur)
+                entiers |= 1 << position
+        elif sorte == 'bits':
+            encodee = bits.encoder(valeur) if isinstance(valeur, list) else BRUT
+            if encodee is not BRUT and encodee >= 2**64:
+                encodee = BRUT
+        elif isinstance(valeur, str):
+            encodee = chaines.ajouter(valeur)
+        if encodee is BRUT:
+            extra[champ] = valeur
+            valeurs.append(0)
+        else:
+            presents |= 1 << position
+            valeurs.append(encodee)
+    for champ, valeur in profil.items():
+        if champ == ID:
+            if valeur != cle:
+                extra[ID] = valeur
+            else:
+                presents |= 1 << len(CHAMPS)
+        elif champ not in NOMS_CHAMPS:
+            extra[champ] = valeur
+    reference = chaines.ajouter(json.dumps(extra, ensure_ascii=False)) if extra else AUCUNE
+    return CLE in extra, (numero, presents, nuls, entiers, reference, *valeurs)
+
+
+def ecrire_instantane(fichier, profils, compresser=False, niveau=1):
+    """Écrit les profils (dict ou paires (clé, profil) lues en flux) au format binaire
+
+    Fichier temporaire puis remplacement.
+    """
+    chaines = _TableChaines()
+    bits = RegistreBits()
+    bits.enregistrer(registre_achievements.identifiants)
+    paires = profils.items() if isinstance(profils, Mapping) else profils
+    encodes = [_encoder(cle, profil, chaines, bits) for cle, profil in paires]
+    # Ids numériques triés en tête (recherche par dichotomie), les autres à la fin
+    encodes.sort(key=lambda e: (e[0], e[1][0]))
+    tries = sum(1 for non_numerique, _ in encodes if not non_numerique)
+    enregistrements = [e for _, e in encodes]
+    table_achievements = chaines.ajouter(json.dumps(bits.identifiants, ensure_ascii=False))
+
+    octets = [chaine.encode('utf-8') for chaine in chaines.chaines]
+    positions = [0]
+    for bloc in octets:
+        positions.append(positions[-1] + len(bloc))
+    corps = b''.join((
+        b''.join(ENREGISTREMENT.pack(*e) for e in enregistrements),
+        struct.pack(f'<{len(positions)}Q', *positions),
+        b''.join(octets),
+    ))
+    drapeaux = 0
+    if compresser:
+        corps = zlib.compress(corps, niveau)
+        drapeaux |= COMPRESSE
+    temporaire = f"{fichier}.tmp"
+    with open(temporaire, 'wb') as f:
+        f.write(EN_TETE.pack(MAGIQUE, VERSION_FORMAT, drapeaux, len(enregistrements), tries, len(chaines.chaines), table_achievements))
+        f.write(corps)
+    os.replace(temporaire, fichier)
+
+
+class InstantaneBinaire(Mapping):
+    """Lecture d'un instantané binaire: mmap si non compressé, un profil décodé par accès
+
+    Le store, lui, décode tout au chargement (profils(), profils_compacts()).
+    """
+    def __init__(self, fichier):
+        self.fichier = fichier
+        self.carte = None
+        with open(fichier, 'rb') as f:
+            en_tete = f.read(EN_TETE.size)
+            magique, version, drapeaux, self.nombre, self.tries, nb_chaines, table_achievements = EN_TETE.unpack(en_tete)
+            if magique != MAGIQUE or version != VERSION_FORMAT:
+                raise ValueError(f"{fichier}: instantané binaire invalide ou de version {version}")
+            if drapeaux & COMPRESSE:
+                self.donnees = memoryview(zlib.decompress(f.read()))
+            else:
+                # Seules les pages lues sont chargées par le système
+                self.carte = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.donnees = memoryview(self.carte)[EN_TETE.size:]
+        self.fin_enregistrements = self.nombre * ENREGISTREMENT.size
+        self.debut_chaines = self.fin_enregistrements + (nb_chaines + 1) * 8
+        self.achievements = json.loads(self.chaine(table_achievements))
+        self.listes_achievements = {}  # bitset -> achievements (peu de combinaisons distinctes)
+        self.plans = {}  # (présents, nuls, entiers) -> corrections à appliquer après le décodage struct
+        self.plans_compacts = {}  # (présents, nuls, entiers) -> slots à remplir directement (None: passer par le dict)
+        self.bits_globaux = {}  # bitset du fichier -> bitset de registre_achievements (BRUT si non encodable)
+        self.classes = {}  # référence -> nom de classe interné
+
+    def fermer(self):
+        self.donnees.release()
+        if self.carte is not None:
+            self.carte.close()
+
+    def chaine(self, reference):
+        debut, fin = BORNES_CHAINE.unpack_from(self.donnees, self.fin_enregistrements + reference * 8)
+        return str(self.donnees[self.debut_chaines + debut:self.debut_chaines + fin], 'utf-8')
+
+    def _plan(self, presents, nuls, entiers):
+        """Champs absents, nuls, entiers, dates, achievements et chaînes pour cette combinaison de masques"""
+        def noms(masque, sortes=None):
+            return tuple(champ for position, (champ, sorte, _) in enumerate(CHAMPS)
+                         if masque >> position & 1 and (sortes is None or sorte in sortes))
+        convertis = presents & ~nuls
+        plan = self.plans[(presents, nuls, entiers)] = (
+            noms(~presents & TOUS_PRESENTS), noms(nuls), noms(entiers),
+            noms(convertis, ('date',)), noms(convertis, ('bits',)), noms(convertis, ('chaine',)),
+        )
+        return plan
+
+    def _achievements(self, masque):
+        liste = self.listes_achievements.get(masque)
+        if liste is None:
+            liste = self.listes_achievements[masque] = tuple(
+                self.achievements[bit] for bit in range(masque.bit_length()) if masque >> bit & 1)
+        return list(liste)
+
+    def _decoder(self, valeurs):
+        numero, presents, nuls, entiers, reference = valeurs[:5]
+        extra = json.loads(self.chaine(reference)) if reference != AUCUNE else None
+        cle = extra.pop(CLE) if extra and CLE in extra else str(numero)
+        # Construction en C, puis seules les exceptions sont corrigées
+        profil = dict(zip(NOMS, valeurs[5:]))
+        plan = self.plans.get((presents, nuls, entiers)) or self._plan(presents, nuls, entiers)
+        absents, nuls, entiers, dates, achievements, chaines = plan
+        for champ in absents:
+            del profil[champ]
+        for champ in nuls:
+            profil[champ] = None
+        for champ in entiers:
+            profil[champ] = int(profil[champ])
+        for champ in dates:
+            profil[champ] = decoder_date(profil[champ])
+        for champ in achievements:
+            profil[champ] = self._achievements(profil[champ])
+        for champ in chaines:
+            profil[champ] = self.chaine(profil[champ])
+        if presents >> len(CHAMPS) & 1:
+            profil[ID] = cle
+        if extra:
+            profil.update(extra)
+        return cle, profil
+
+    def _enregistrement(self, position):
+        return ENREGISTREMENT.unpack_from(self.donnees, position * ENREGISTREMENT.size)
+
+    def _position(self, cle):
+        numero = encoder_id(cle)
+        if numero is not BRUT and numero < 2**64:
+            # Dichotomie sur les ids triés: seules quelques pages sont lues
+            bas, haut = 0, self.tries
+            while bas < haut:
+                milieu = (bas + haut) // 2
+                if self._enregistrement(milieu)[0] < numero:
+                    bas = milieu + 1
+                else:
+                    haut = milieu
+            if bas < self.tries and self._enregistrement(bas)[0] == numero:
+                return bas
+            return None
+        for position in range(self.tries, self.nombre):
+            if self._decoder(self._enregistrement(position))[0] == cle:
+                return position
+        return None
+
+    def __getitem__(self, cle):
+        position = self._position(str(cle))
+        if position is None:
+            raise KeyError(cle)
+        return self._decoder(self._enregistrement(position))[1]
+
+    def __len__(self):
+        return self.nombre
+
+    def __iter__(self):
+        for cle, _ in self.profils():
+            yield cle
+
+    def _plan_compact(self, presents, nuls, entiers):
+        champs, indices, conversions = [], [], []
+        for position, (champ, sorte, _) in enumerate(CHAMPS):
+            if not presents >> position & 1:
+                continue
+            if nuls >> position & 1:
+                if sorte == 'bits':
+                    return None
+                conversion = 'nul'
+            elif sorte == 'flottant':
+                conversion = 'entier' if entiers >> position & 1 else None
+            elif sorte in ('bits', 'chaine'):
+                conversion = 'classe' if champ == 'classe' else sorte
+            else:
+                conversion = None
+            if conversion:
+                conversions.append((len(champs), conversion))
+            champs.append(champ)
+            indices.append(5 + position)
+        if presents >> len(CHAMPS) & 1:
+            # id égal à la clé numérique: même encodage que ProfilCompact
+            champs.append(ID)
+            indices.append(0)
+        plan = self.plans_compacts[(presents, nuls, entiers)] = (tuple(champs), tuple(indices), tuple(conversions))
+        return plan
+
+    def _bits_globaux(self, masque):
+        bits = self.bits_globaux.get(masque)
+        if bits is None:
+            bits = self.bits_globaux[masque] = registre_achievements.encoder(self._achievements(masque))
+        return bits
+
+    def _classe(self, reference):
+        classe = self.classes.get(reference)
+        if classe is None:
+            classe = self.classes[reference] = sys.intern(self.chaine(reference))
+        return classe
+
+    def _compact(self, valeurs):
+        """(clé, ProfilCompact) sans passer par la forme JSON: les valeurs du fichier sont déjà compactes"""
+        cle_plan = valeurs[1:4]
+        plan = self.plans_compacts[cle_plan] if cle_plan in self.plans_compacts else self._plan_compact(*cle_plan)
+        if plan is None or valeurs[4] != AUCUNE:
+            cle, profil = self._decoder(valeurs)
+            return cle, ProfilCompact.depuis_dict(profil)
+        champs, indices, conversions = plan
+        slots = [valeurs[i] for i in indices]
+        for i, conversion in conversions:
+            if conversion == 'nul':
+                slots[i] = None
+            elif conversion == 'entier':
+                slots[i] = int(slots[i])
+            elif conversion == 'chaine':
+                slots[i] = self.chaine(slots[i])
+            elif conversion == 'classe':
+                slots[i] = self._classe(slots[i])
+            else:
+                slots[i] = self._bits_globaux(slots[i])
+                if slots[i] is BRUT:
+                    cle, profil = self._decoder(valeurs)
+                    return cle, ProfilCompact.depuis_dict(profil)
+        return str(valeurs[0]), ProfilCompact.depuis_forme_compacte(champs, slots)
+
+    def profils_compacts(self):
+        """Tous les profils directement sous forme de ProfilCompact: (clé, profil)"""
+        for valeurs in ENREGISTREMENT.iter_unpack(self.donnees[:self.fin_enregistrements]):
+            yield self._compact(valeurs)
+
+    def profils(self):
+        """Décode tous les profils dans l'ordre du fichier: (clé, profil)"""
+        for valeurs in ENREGISTREMENT.iter_unpack(self.donnees[:self.fin_enregistrements]):
+            yield self._decoder(valeurs)
+
+    def charger_tout(self):
+        return dict(self.profils())
+
+
+def lire_instantane(fichier, compacts=False):
+    """Tous les profils d'un instantané binaire, décodés d'un coup (dict vide s'il est absent), en ProfilCompact si demandé"""
+    if not os.path.exists(fichier):
+        return {}
+    instantane = InstantaneBinaire(fichier)
+    try:
+        return dict(instantane.profils_compacts()) if compacts else instantane.charger_tout()
+    finally:
+        instantane.fermer()
+
+
+def _mesurer(nombre):
+    from profils import profils_exemple, ACHIEVEMENTS_EXEMPLE
+    from stockage import ecrire_json_atomique, lire_json
+    registre_achievements.enregistrer(ACHIEVEMENTS_EXEMPLE)
+    profils = profils_exemple(nombre)
+    formats = [
+        ('JSON (indent=2)', 'mesure.json', lambda f: ecrire_json_atomique(f, profils), lire_json),
+        ('binaire', 'mesure.bin', lambda f: ecrire_instantane(f, profils), lire_instantane),
+        ('binaire zlib', 'mesure.bin.z', lambda f: ecrire_instantane(f, profils, compresser=True), lire_instantane),
+        ('JSON -> compact', 'mesure.json', lambda f: ecrire_json_atomique(f, profils),
+         lambda f: {user_id: ProfilCompact.depuis_dict(p) for user_id, p in lire_json(f).items()}),
+        ('binaire -> compact', 'mesure.bin', lambda f: ecrire_instantane(f, profils), lambda f: lire_instantane(f, compacts=True)),
+    ]
+    print(f"{nombre} profils")
+    for nom, fichier, ecrire, lire in formats:
+        debut = time.perf_counter()
+        ecrire(fichier)
+        ecriture = time.perf_counter() - debut
+        debut = time.perf_counter()
+        relus = lire(fichier)
+        lecture = time.perf_counter() - debut
+        debut = time.perf_counter()
+        if fichier.endswith('.bin'):
+            instantane = InstantaneBinaire(fichier)
+            instantane[next(iter(profils))]
+            instantane.fermer()
+        acces = time.perf_counter() - debut
+        taille = os.path.getsize(fichier)
+        os.remove(fichier)
+        print(f"  {nom:<18} écriture {ecriture:6.2f}s  lecture {lecture:6.2f}s  "
+              f"{taille / 2**20:8.1f} Mo ({taille / nombre:5.0f} o/profil)  sans perte: {'oui' if relus == profils else 'NON'}"
+              + (f"  un profil par mmap: {acces * 1000:.1f} ms" if fichier.endswith('.bin') else ""))
+
+
+if __name__ == "__main__":
+    # python instantane.py exporter marchand.bin joueurs.json   (binaire -> JSON lisible)
+    # python instantane.py importer joueurs.json marchand.bin   (JSON -> binaire)
+    # python instantane.py mesurer [nombres de profils...]
+    commande = sys.argv[1] if len(sys.argv) > 1 else None
+    if commande == 'exporter' and len(sys.argv) == 4:
+        from stockage import ecrire_json_atomique
+        profils = lire_instantane(sys.argv[2])
+        ecrire_json_atomique(sys.argv[3], profils)
+        print(f"✅ {len(profils)} profils exportés dans {sys.argv[3]}")
+    elif commande == 'importer' and len(sys.argv) == 4:
+        from stockage import lire_json
+        profils = lire_json(sys.argv[2])
+        ecrire_instantane(sys.argv[3], profils)
+        print(f"✅ {len(profils)} profils importés dans {sys.argv[3]}")
+    elif commande == 'mesurer':
+        for nombre in map(int, sys.argv[2:] or ['10000', '100000', '1000000']):
+            _mesurer(nombre)
+    else:
+        print("Usage: python instantane.py exporter <fichier.bin> <joueurs.json> | importer <joueurs.json> <fichier.bin> | mesurer [nombres...]")
+        sys.exit(1)
@@ -0,0 +1,101 @@
+import time
+
+
+class TableExpirante:
+    """Table clé -> expiration qui oublie d'elle-même les entrées expirées (roue temporelle)"""
+    def __init__(self, granularite=1.0):
+        self.granularite = granularite  # Largeur d'une case de la roue en secondes
+        self.expirations = {}  # cle -> instant d'expiration
+        self.valeurs = {}  # cle -> valeur associée (optionnelle)
+        self.cases = {}  # numéro de case -> clés qui expirent dans cette case
+        self.curseur = int(time.monotonic() / granularite)
+
+    def _case(self, instant):
+        return int(instant / self.granularite)
+
+    def purger(self, maintenant=None):
+        """Supprime les entrées expirées (coût amorti O(1) par entrée)"""
+        maintenant = time.monotonic() if maintenant is None else maintenant
+        case_actuelle = self._case(maintenant)
+        if case_actuelle - self.curseur > len(self.cases):
+            # Longue inactivité: parcourir les cases existantes plutôt que chaque seconde écoulée
+            numeros = sorted(numero for numero in self.cases if numero < case_actuelle)
+        else:
+            numeros = range(self.curseur, case_actuelle)
+        for numero in numeros:
+            for cle in self.cases.pop(numero, ()):
+                if self.expirations.get(cle, maintenant + 1) <= maintenant:
+                    del self.expirations[cle]
+                    self.valeurs.pop(cle, None)
+        self.curseur = case_actuelle
+
+    def ajouter(self, cle, duree, valeur=None):
+        """Ajoute (ou prolonge) une entrée valable `duree` secondes"""
+        maintenant = time.monotonic()
+        self.purger(maintenant)
+        expiration = maintenant + duree
+        self.expirations[cle] = expiration
+        if valeur is not None:
+            self.valeurs[cle] = valeur
+        self.cases.setdefault(self._case(expiration), set()).add(cle)
+
+    def actif(self, cle):
+        """Indique si l'entrée existe et n'a pas expiré (O(1))"""
+        maintenant = time.monotonic()
+        self.purger(maintenant)
+        expiration = self.expirations.get(cle)
+        return expiration is not None and expiration > maintenant
+
+    def valeur(self, cle):
+        """Valeur associée à une entrée active (None si absente ou expirée)"""
+        if self.actif(cle):
+            return self.valeurs.get(cle)
+        return None
+
+    def restant(self, cle):
+        """Secondes restantes avant expiration (0 si absente)"""
+        expiration = self.expirations.get(cle)
+        return max(0.0, expiration - time.monotonic()) if expiration else 0.0
+
+    def __len__(self):
+        self.purger()
+        return len(self.expirations)
+
+
+class LimiteurDebit:
+    """Seaux à jetons (capacité de rafale + débit de recharge), oubliés une fois pleins"""
+    def __init__(self):
+        self.seaux = TableExpirante()  # cle -> (jetons, instant de mise à jour)
+        self.acceptes = 0
+        self.rejets = 0
+
+    def consommer(self, demandes):
+        """Consomme des jetons dans plusieurs seaux à la fois
+
+        `demandes` est une liste de (cle, capacite, jetons_par_seconde, cout).
+        Retourne 0 si tout est accepté, sinon le nombre de secondes à attendre (rien n'est consommé).
+        """
+        maintenant = time.monotonic()
+        restes = []
+        attente = 0
+        for cle, capacite, debit, cout in demandes:
+            cout = min(cout, capacite)
+            etat = self.seaux.valeur(cle)
+            if etat is None:
+                jetons = capacite
+            else:
+                jetons = min(capacite, etat[0] + (maintenant - etat[1]) * debit)
+            if jetons < cout:
+                attente = max(attente, (cout - jetons) / debit)
+            restes.append((cle, capacite, debit, jetons - cout))
+        if attente:
+            self.rejets += 1
+            return attente
+        for cle, capacite, debit, reste in restes:
+            # Le seau expire quand il serait de nouveau plein
+            self.seaux.ajouter(cle, (capacite - reste) / debit, (reste, maintenant))
+        self.acceptes += 1
+        return 0
+
+    def __len__(self):
+        return len(self.seaux)
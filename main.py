@@ -1,13 +1,26 @@
 import discord
 from discord.ext import commands, tasks
-import json
 import os
 from datetime import datetime
 import asyncio
-import math
 from dotenv import load_dotenv
-from collections import defaultdict
 import logging
+from collections import Counter
+from itertools import compress
+from operator import ne
+from classements import Classements, StatistiquesServeur
+from colonnes import VueColonnes
+from contenu import charger_contenu, verifier_compatibilite, contenu_epingle
+from economie import AccumulateurRecompenses
+from envois import ExpediteurLogs, PlanificateurEnvois
+from gabarits import CacheEmbeds
+from limites import TableExpirante, LimiteurDebit
+from membres import CacheNoms
+from migrations import MigrationsProfils
+from profils import ProfilCompact, registre_achievements
+from progression import TableNiveaux
+from roles import OperationRoles, planifier_roles, reprendre_avancement
+from stockage import PlayerStore, TicketStore, EtatStore, BackendJSON, BackendSQLite, BackendBinaire, JournalEconomie, PersistanceAsync, source_ecriture, appliquer_delta
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -22,23 +35,88 @@ intents.message_content = True
 intents.voice_states = True
 intents.members = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+class ContexteMarchand(commands.Context):
+    """Contexte dont les réponses passent en priorité par le planificateur d'envois"""
+    async def send(self, *args, **kwargs):
+        return await planificateur_envois.envoyer(
+            ('salon', self.channel.id),
+            lambda: commands.Context.send(self, *args, **kwargs),
+            PlanificateurEnvois.INTERACTIF
+        )
+
+class MarchandBot(commands.Bot):
+    """Bot qui envoie les derniers logs en attente avant de se déconnecter"""
+    async def get_context(self, origin, *, cls=ContexteMarchand):
+        return await super().get_context(origin, cls=cls)
+
+    async def close(self):
+        await expediteur_logs.arreter()
+        await planificateur_envois.arreter()
+        await super().close()
+
+# Les rate limits longs lèvent une erreur au lieu de bloquer: le planificateur les gère
+bot = MarchandBot(command_prefix='!', intents=intents, max_ratelimit_timeout=30)
 
 # Flag pour ajouter les views une seule fois
 views_added = False
 
-# Flag pour éviter les doublons de commandes
-last_command = {}
+# Messages de commande récents pour éviter les doublons (expirent après 100ms)
+last_command = TableExpirante(granularite=0.1)
+
+# Appels par commande (comparés aux écritures qu'elles provoquent dans !perf)
+invocations_commandes = Counter()
+
+# Commandes en lecture seule: aucune écriture (les gains de messages en attente ne sont pas appliqués)
+COMMANDES_LECTURE = frozenset({'sable', 'info', 'boutique', 'classement', 'rang', 'aide', 'niveaux',
+                               'achievements', 'stats', 'equilibrage', 'perf'})
+
+# Origine attribuée aux écritures des gains de messages (!perf)
+SOURCE_GAINS_MESSAGES = 'gains de messages'
 
 # Constantes
 SABLE_PAR_MESSAGE = 10
+PSEUDOS_TTL_SECONDES = 600  # Durée de validité d'un pseudo en cache
+RECOMPENSES_INTERVALLE_SECONDES = 5  # Délai entre deux applications des gains de messages
+RECONCILIATION_STATS_MINUTES = 30  # Recalcul complet des agrégats de !stats
 SABLE_BOOST_SERVEUR = 500
 SABLE_INVITE = 100
 JOUEURS_FILE = 'joueurs.json'
+CONTENU_FILE = os.getenv('CONTENU_FILE', 'contenu_jeu.json')
+# Profil d'un joueur au début de chaque saison (appliqué paresseusement après un !reset)
+VALEURS_NOUVELLE_SAISON = {
+    'sable': 50,
+    'classe': None,
+    'arme': None,
+    'armure': None,
+    'puissance': 0,
+    'niveau': 1,
+    'dernier_gain_message': 0
+}
+VIDAGE_INTERVALLE_SECONDES = 300  # Délai max avant la compaction du journal dans le snapshot
+VIDAGE_SEUIL_PROFILS = 100  # Nombre de profils modifiés déclenchant une écriture (sans journal)
+JOURNAL_FILE = os.getenv('JOURNAL_FILE', 'journal_economie.jsonl')
+JOURNAL_TAILLE_GROUPE = 64  # Enregistrements regroupés par fsync
+JOURNAL_SEUIL_COMPACTION = 10000  # Enregistrements avant compaction forcée
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 FONDATEUR_ID = int(os.getenv('FONDATEUR_ID', '0'))
 LOG_CHANNEL_ID = os.getenv('LOG_CHANNEL_ID')
 
+# Métriques disponibles pour !rang (nom de la commande -> champ du profil)
+METRIQUES_CLASSEMENT = {
+    'puissance': 'puissance',
+    'sable': 'sable',
+    'niveau': 'niveau',
+    'prestige': 'prestige',
+    'streak': 'streak_daily'
+}
+EMOJIS_METRIQUES = {
+    'puissance': '⚡',
+    'sable': '⏳',
+    'niveau': '⭐',
+    'prestige': '✨',
+    'streak_daily': '🔥'
+}
+
 # Prestige et Daily Login
 NIVEAU_PRESTIGE = 100  # Niveau nécessaire pour prestige
 SABLE_DAILY_BASE = 200  # Sable de base pour daily login
@@ -49,222 +127,177 @@ MAIN_CHANNEL_ID = os.getenv('MAIN_CHANNEL_ID')  # Salon principal "Marchand de S
 TICKETS_CATEGORY_ID = int(os.getenv('TICKETS_CATEGORY_ID', '0'))  # Catégorie pour les salons privés
 TICKETS_FILE = 'tickets.json'
 
+# Stockage: 'json' (joueurs.json/tickets.json) ou 'sqlite'
+STOCKAGE_BACKEND = os.getenv('STOCKAGE_BACKEND', 'json').lower()
+SQLITE_FILE = os.getenv('SQLITE_FILE', 'marchand.db')
+BINAIRE_FILE = os.getenv('BINAIRE_FILE', 'joueurs.bin')
+BINAIRE_COMPRESSION = os.getenv('BINAIRE_COMPRESSION', '0') == '1'
+
 # Récompenses tutoriel
 SABLE_TUTORIEL = 100  # Bonus sable pour terminer le tutoriel
 SABLE_SKIP_TUTORIEL = -50  # Pénalité pour skipper
 
-# Cooldowns (défini avant les fonctions)
-cooldowns = defaultdict(lambda: {})
+# Limitation de débit (défini avant les commandes): seaux à jetons par
+# utilisateur et par commande, puis par salon et global partagés entre les commandes
+limiteur = LimiteurDebit()
+DEBIT_SALON = (20, 2)  # Capacité, jetons regagnés par seconde
+DEBIT_GLOBAL = (60, 10)
 
-def ajouter_cooldown(user_id, commande, secondes):
-    """Ajoute un cooldown pour une commande"""
-    cooldowns[user_id][commande] = datetime.now().timestamp() + secondes
+class DebitDepasse(commands.CheckFailure):
+    """Levée quand une commande dépasse sa limite de débit"""
+    def __init__(self, attente):
+        super().__init__(f"Limite de débit atteinte, réessayez dans {attente:.1f}s")
+        self.attente = attente
 
-def verifier_cooldown(user_id, commande):
-    """Vérifie si le cooldown est actif"""
-    if user_id not in cooldowns or commande not in cooldowns[user_id]:
+def limite_debit(capacite=1, periode=2, cout=1):
+    """Limite une commande: `capacite` utilisations d'affilée, un jeton regagné toutes les `periode` secondes.
+    
+    `cout` est le poids de la commande dans les seaux partagés du salon et du serveur.
+    """
+    async def predicate(ctx):
+        attente = limiteur.consommer([
+            (('utilisateur', ctx.command.name, ctx.author.id), capacite, 1 / periode, 1),
+            (('salon', ctx.channel.id), DEBIT_SALON[0], DEBIT_SALON[1], cout),
+            (('global',), DEBIT_GLOBAL[0], DEBIT_GLOBAL[1], cout)
+        ])
+        if attente:
+            raise DebitDepasse(attente)
         return True
-    return cooldowns[user_id][commande] < datetime.now().timestamp()
+    return commands.check(predicate)
+
+# Planificateur des envois vers Discord
+ENVOIS_DEBIT_ROUTE = (5, 1.0)  # Rafale et envois/seconde par route pour le trafic en file
+ENVOIS_OUVRIERS = 5  # Envois en file exécutés simultanément
+
+planificateur_envois = PlanificateurEnvois(debit_route=ENVOIS_DEBIT_ROUTE, ouvriers=ENVOIS_OUVRIERS)
+
+async def envoyer_salon(channel, priorite=PlanificateurEnvois.NORMAL, **kwargs):
+    """Envoie un message dans un salon via le planificateur d'envois"""
+    return await planificateur_envois.envoyer(('salon', channel.id), lambda: channel.send(**kwargs), priorite)
 
 # Système de logs
+LOGS_INTERVALLE_SECONDES = 5  # Délai max avant l'envoi d'un lot de logs
+LOGS_TAILLE_FILE = 500  # Au-delà, les logs non prioritaires sont ignorés (et comptés)
+LOGS_PRIORITAIRES = {'ERROR', 'START', 'RESET', 'SETUP', 'PRESTIGE'}
+
+async def envoyer_salon_logs(texte):
+    """Envoie un bloc de logs dans le salon de logs"""
+    channel = bot.get_channel(int(LOG_CHANNEL_ID))
+    if isinstance(channel, discord.TextChannel):
+        await envoyer_salon(channel, PlanificateurEnvois.FOND, content=texte)
+
+# Les logs sont regroupés et envoyés en arrière-plan
+expediteur_logs = ExpediteurLogs(envoyer_salon_logs, intervalle=LOGS_INTERVALLE_SECONDES, taille_max=LOGS_TAILLE_FILE)
+
 async def envoyer_log(message, type_log="INFO"):
-    """Envoie un log sur Discord et dans la console"""
+    """Envoie un log sur Discord (en arrière-plan) et dans la console"""
     timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
     log_message = f"[{timestamp}] [{type_log}] {message}"
     
     logger.info(log_message)
     
     if LOG_CHANNEL_ID:
-        try:
-            channel = bot.get_channel(int(LOG_CHANNEL_ID))
-            if isinstance(channel, discord.TextChannel):
-                await channel.send(f"```{log_message}```")
-        except Exception as e:
-            logger.error(f"Erreur lors de l'envoi du log: {e}")
+        expediteur_logs.ajouter(log_message, prioritaire=type_log in LOGS_PRIORITAIRES)
+
+# Système de niveaux infini basé sur la puissance (seuils précalculés, étendus à la demande)
+table_niveaux = TableNiveaux(base=50, niveaux_par_decade=10)
 
-# Système de niveaux infini basé sur la puissance
 def calculer_niveau(puissance):
     """Calcule le niveau basé sur la puissance (système infini)"""
-    if puissance < 50:
-        return 1
-    niveau = int(1 + math.log10(puissance / 50) * 10)
-    return max(1, niveau)
+    return table_niveaux.niveau(puissance)
 
 def calculer_seuil_prochain_niveau(niveau_actuel):
     """Calcule la puissance nécessaire pour atteindre le prochain niveau"""
-    return int(50 * (10 ** ((niveau_actuel) / 10)))
-
-# Classes et équipements (système scalable avec niveaux)
-CLASSES = {
-    'chevalier': {
-        'emoji': '🛡️',
-        'description': 'Inébranlable et puissant',
-        'armes': [
-            {'nom': 'Épée de bronze', 'cout': 100, 'puissance': 10, 'niveau_min': 1},
-            {'nom': 'Épée de fer', 'cout': 300, 'puissance': 25, 'niveau_min': 1},
-            {'nom': 'Épée d\'acier', 'cout': 1000, 'puissance': 50, 'niveau_min': 2},
-            {'nom': 'Lame légendaire du Roi', 'cout': 5000, 'puissance': 150, 'niveau_min': 5},
-            {'nom': 'Épée des anciens dieux', 'cout': 15000, 'puissance': 400, 'niveau_min': 10},
-            {'nom': 'Excalibur - Lame suprême', 'cout': 50000, 'puissance': 1200, 'niveau_min': 20}
-        ],
-        'armures': [
-            {'nom': 'Armure de cuir', 'cout': 150, 'defense': 15, 'niveau_min': 1},
-            {'nom': 'Armure de fer', 'cout': 400, 'defense': 35, 'niveau_min': 1},
-            {'nom': 'Armure d\'acier forgé', 'cout': 1500, 'defense': 75, 'niveau_min': 2},
-            {'nom': 'Armure légendaire du Roi', 'cout': 6000, 'defense': 200, 'niveau_min': 5},
-            {'nom': 'Armure des anciens dieux', 'cout': 18000, 'defense': 550, 'niveau_min': 10},
-            {'nom': 'Armure indestructible de Hephaïstos', 'cout': 60000, 'defense': 1600, 'niveau_min': 20}
-        ]
-    },
-    'samourai': {
-        'emoji': '⚔️',
-        'description': 'Rapide et tranchant',
-        'armes': [
-            {'nom': 'Katana en bois', 'cout': 80, 'puissance': 8, 'niveau_min': 1},
-            {'nom': 'Katana de bronze', 'cout': 250, 'puissance': 22, 'niveau_min': 1},
-            {'nom': 'Katana de fer forgé', 'cout': 900, 'puissance': 48, 'niveau_min': 2},
-            {'nom': 'Kusanagi - L\'épée de la légende', 'cout': 4500, 'puissance': 140, 'niveau_min': 5},
-            {'nom': 'Murasama - Lame de tempête', 'cout': 13000, 'puissance': 380, 'niveau_min': 10},
-            {'nom': 'Honjo Masamune - Lame immortelle', 'cout': 45000, 'puissance': 1100, 'niveau_min': 20}
-        ],
-        'armures': [
-            {'nom': 'Armure de soie', 'cout': 120, 'defense': 12, 'niveau_min': 1},
-            {'nom': 'Armure de cuir renforcé', 'cout': 350, 'defense': 30, 'niveau_min': 1},
-            {'nom': 'Armure de laques', 'cout': 1200, 'defense': 65, 'niveau_min': 2},
-            {'nom': 'Armure légendaire du Shogun', 'cout': 5500, 'defense': 180, 'niveau_min': 5},
-            {'nom': 'Armure de samouraï ancestral', 'cout': 16000, 'defense': 520, 'niveau_min': 10},
-            {'nom': 'Armure du Daimyo éternel', 'cout': 55000, 'defense': 1550, 'niveau_min': 20}
-        ]
-    },
-    'mage': {
-        'emoji': '✨',
-        'description': 'Mystique et puissant',
-        'armes': [
-            {'nom': 'Bâton d\'apprenti', 'cout': 120, 'puissance': 12, 'niveau_min': 1},
-            {'nom': 'Bâton de sorcier', 'cout': 350, 'puissance': 28, 'niveau_min': 1},
-            {'nom': 'Bâton des anciens', 'cout': 1100, 'puissance': 55, 'niveau_min': 2},
-            {'nom': 'Bâton du Sorcier Suprême', 'cout': 5500, 'puissance': 160, 'niveau_min': 5},
-            {'nom': 'Bâton du Archmage', 'cout': 14000, 'puissance': 420, 'niveau_min': 10},
-            {'nom': 'Bâton de Morgue - Source infinie de magie', 'cout': 48000, 'puissance': 1250, 'niveau_min': 20}
-        ],
-        'armures': [
-            {'nom': 'Robe de novice', 'cout': 100, 'defense': 10, 'niveau_min': 1},
-            {'nom': 'Robe de magicien', 'cout': 300, 'defense': 25, 'niveau_min': 1},
-            {'nom': 'Robe des sages', 'cout': 1000, 'defense': 60, 'niveau_min': 2},
-            {'nom': 'Robe légendaire de Merlin', 'cout': 5000, 'defense': 170, 'niveau_min': 5},
-            {'nom': 'Robe du Grand Mage', 'cout': 15000, 'defense': 580, 'niveau_min': 10},
-            {'nom': 'Robe de l\'Enchanteur Éternel', 'cout': 52000, 'defense': 1700, 'niveau_min': 20}
-        ]
-    }
-}
+    return table_niveaux.seuil(niveau_actuel + 1)
 
-# Système de achievements/badges
-ACHIEVEMENTS = {
-    'first_steps': {
-        'nom': 'Premiers pas',
-        'emoji': '👣',
-        'description': 'Choisir une classe',
-        'condition': lambda profil: profil.get('classe') is not None
-    },
-    'collector': {
-        'nom': 'Collectionneur',
-        'emoji': '🎁',
-        'description': 'Acheter son premier équipement',
-        'condition': lambda profil: profil.get('arme') is not None or profil.get('armure') is not None
-    },
-    'spender': {
-        'nom': 'Dépensier',
-        'emoji': '💸',
-        'description': 'Dépenser 1000 sable',
-        'condition': lambda profil: profil.get('sable_depense', 0) >= 1000
-    },
-    'wealthy': {
-        'nom': 'Riche',
-        'emoji': '💰',
-        'description': 'Accumuler 10,000 sable',
-        'condition': lambda profil: profil.get('sable', 0) >= 10000
-    },
-    'powerful': {
-        'nom': 'Puissant',
-        'emoji': '⚡',
-        'description': 'Atteindre le niveau 5',
-        'condition': lambda profil: profil.get('niveau', 1) >= 5
-    },
-    'legendary': {
-        'nom': 'Légendaire',
-        'emoji': '👑',
-        'description': 'Atteindre le niveau 20',
-        'condition': lambda profil: profil.get('niveau', 1) >= 20
-    },
-    'talker': {
-        'nom': 'Bavard',
-        'emoji': '💬',
-        'description': 'Envoyer 100 messages',
-        'condition': lambda profil: profil.get('messages_envoyes', 0) >= 100
-    },
-    'boost_champion': {
-        'nom': 'Champion du boost',
-        'emoji': '🚀',
-        'description': 'Booster le serveur',
-        'condition': lambda profil: profil.get('boosts', 0) > 0
-    },
-    'elite_collector': {
-        'nom': 'Collectionneur élite',
-        'emoji': '🏆',
-        'description': 'Avoir les 6 tiers d\'équipement',
-        'condition': lambda profil: profil.get('equipment_count', 0) >= 6
-    }
-}
+# Classes, équipements et achievements: chargés depuis CONTENU_FILE, rechargeables avec !recharger
+contenu_jeu = charger_contenu(CONTENU_FILE)
+
+# Bits des achievements des profils compacts, dans l'ordre de définition du contenu
+registre_achievements.enregistrer(contenu_jeu.achievements)
+
+def contenu():
+    """Contenu épinglé par la commande en cours, sinon la dernière version chargée"""
+    return contenu_epingle.get() or contenu_jeu
+
+# Embeds statiques et de boutique, reconstruits seulement quand le contenu change
+cache_embeds = CacheEmbeds()
+
+def embed_en_cache(cle, construire, *args, copie=False):
+    """Embed construit par `construire(contenu, *args)` une fois par version du contenu
+
+    Avec `copie=True`, retourne une copie modifiable (champs propres au joueur).
+    """
+    jeu = contenu()
+    methode = cache_embeds.copie if copie else cache_embeds.obtenir
+    return methode(jeu.version, cle, lambda: construire(jeu, *args))
 
 # ================== GESTION DES DONNÉES ==================
 
+def creer_backend():
+    """Crée le backend de stockage configuré"""
+    if STOCKAGE_BACKEND == 'sqlite':
+        return BackendSQLite(SQLITE_FILE)
+    if STOCKAGE_BACKEND == 'binaire':
+        return BackendBinaire(BINAIRE_FILE, TICKETS_FILE, compresser=BINAIRE_COMPRESSION, compacts=True)
+    return BackendJSON(JOUEURS_FILE, TICKETS_FILE)
+
+backend_stockage = creer_backend()
+
+# Thread dédié aux sérialisations et écritures disque (hors boucle asyncio)
+persistance = PersistanceAsync()
+
+# Journal append-only des mutations de l'économie
+journal_economie = JournalEconomie(JOURNAL_FILE, taille_groupe=JOURNAL_TAILLE_GROUPE, seuil_compaction=JOURNAL_SEUIL_COMPACTION)
+
+# Migrations de schéma des profils (étapes définies plus bas), appliquées une fois au chargement
+migrations_profils = MigrationsProfils()
+
+# Profils en ProfilCompact avec le backend binaire (chargés directement sous cette forme);
+# avec le JSON, les garder en dicts évite une conversion au démarrage
+compacter_profils = ProfilCompact.depuis_dict if STOCKAGE_BACKEND == 'binaire' else None
+
+# Profils en mémoire, journalisés puis compactés sur disque par lots
+magasin_joueurs = PlayerStore(backend_stockage, journal=journal_economie, persistance=persistance, seuil_lot=VIDAGE_SEUIL_PROFILS, intervalle=VIDAGE_INTERVALLE_SECONDES, valeurs_saison=VALEURS_NOUVELLE_SAISON, migrations=migrations_profils, compacter=compacter_profils)
+
+# Classements tenus à jour à chaque mutation (reconstruits au chargement)
+classements = Classements(METRIQUES_CLASSEMENT.values())
+magasin_joueurs.abonner(classements)
+
+# Agrégats du serveur pour !stats, réconciliés périodiquement avec les profils
+statistiques_serveur = StatistiquesServeur(classements['sable'], classements['puissance'])
+magasin_joueurs.abonner(statistiques_serveur)
+
+# Profils de la saison en colonnes typées (analyses et traitements par lots)
+vue_colonnes = VueColonnes()
+magasin_joueurs.abonner(vue_colonnes)
+
 def charger_joueurs():
-    """Charge les données des joueurs depuis le JSON"""
-    if os.path.exists(JOUEURS_FILE):
-        try:
-            with open(JOUEURS_FILE, 'r', encoding='utf-8') as f:
-                contenu = f.read().strip()
-                if contenu:
-                    return json.loads(contenu)
-        except (json.JSONDecodeError, ValueError):
-            logger.error("Erreur lors du chargement du JSON, retour dict vide")
-    return {}
+    """Retourne tous les profils depuis le cache mémoire"""
+    return magasin_joueurs.tous()
 
 def sauvegarder_joueurs(joueurs):
-    """Sauvegarde les données des joueurs"""
-    try:
-        with open(JOUEURS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(joueurs, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        logger.error(f"Erreur lors de la sauvegarde: {e}")
-
-def migrer_profil(profil):
-    """Migre un profil ancien vers le nouveau format"""
-    champs_requis = {
-        'id': str(profil.get('id', '')),
-        'username': profil.get('username', 'Inconnu'),
-        'sable': profil.get('sable', 50),
-        'classe': profil.get('classe', None),
-        'arme': profil.get('arme', None),
-        'armure': profil.get('armure', None),
-        'puissance': profil.get('puissance', 0),
-        'niveau': profil.get('niveau', 1),
-        'date_creation': profil.get('date_creation', datetime.now().isoformat()),
-        'dernier_gain_message': profil.get('dernier_gain_message', 0),
-        'achievements': profil.get('achievements', []),
-        'messages_envoyes': profil.get('messages_envoyes', 0),
-        'sable_depense': profil.get('sable_depense', 0),
-        'boosts': profil.get('boosts', 0),
-        'equipment_count': profil.get('equipment_count', 0),
-        'prestige': profil.get('prestige', 0),
-        'dernier_daily': None,
-        'streak_daily': 0
-    }
-    return champs_requis
+    """Remplace tous les profils et les écrit sur disque en arrière-plan"""
+    magasin_joueurs.remplacer_tout(joueurs)
+
+@migrations_profils.etape(1)
+def migration_champs_par_defaut(profil):
+    """Ajoute les champs manquants sans toucher à ceux présents (temps vocal, daily...)"""
+    profil['id'] = str(profil.get('id', ''))
+    profil.setdefault('saison', 0)  # Profil antérieur aux saisons
+    for champ, valeur in creer_profil_joueur(profil['id'], 'Inconnu').items():
+        profil.setdefault(champ, valeur)
+
+@migrations_profils.etape(2)
+def migration_equipements_par_id(profil):
+    """Remplace les noms d'équipement portés par leurs identifiants"""
+    catalogue = contenu().catalogue
+    for emplacement in ('arme', 'armure'):
+        profil[emplacement] = catalogue.migrer_reference(profil['classe'], emplacement, profil[emplacement])
 
 def creer_profil_joueur(user_id, username):
-    """Crée un nouveau profil de joueur"""
-    return {
+    """Crée un nouveau profil de joueur (compact si les profils chargés le sont)"""
+    profil = {
         'id': str(user_id),
         'username': username,
         'sable': 50,
@@ -282,20 +315,15 @@ def creer_profil_joueur(user_id, username):
         'equipment_count': 0,
         'prestige': 0,
         'dernier_daily': None,
-        'streak_daily': 0
+        'streak_daily': 0,
+        'saison': magasin_joueurs.saison,
+        'schema_version': migrations_profils.version
     }
+    return compacter_profils(profil) if compacter_profils else profil
 
-def verifier_achievements(profil):
-    """Vérifie quels achievements le joueur devrait avoir"""
-    achievements_actuels = set(profil.get('achievements', []))
-    achievements_nouveaux = []
-    
-    for achievement_id, achievement_data in ACHIEVEMENTS.items():
-        if achievement_id not in achievements_actuels:
-            if achievement_data['condition'](profil):
-                achievements_nouveaux.append(achievement_id)
-    
-    return achievements_nouveaux
+def verifier_achievements(profil, champs=None):
+    """Vérifie quels achievements le joueur devrait avoir (seulement ceux liés à `champs` si fourni)"""
+    return contenu().moteur.evaluer(profil, champs)
 
 def ajouter_achievement(profil, achievement_id):
     """Ajoute un achievement au profil du joueur"""
@@ -303,19 +331,21 @@ def ajouter_achievement(profil, achievement_id):
         profil['achievements'] = []
     
     if achievement_id not in profil['achievements']:
-        profil['achievements'].append(achievement_id)
+        # Réassigné (pas de append): un profil compact retourne une copie de la liste
+        profil['achievements'] = profil['achievements'] + [achievement_id]
         return True
     return False
 
 def passer_prestige(profil):
     """Permet à un joueur de faire un prestige"""
     if profil.get('niveau', 1) >= NIVEAU_PRESTIGE:
-        profil['prestige'] = profil.get('prestige', 0) + 1
-        profil['niveau'] = 1 + profil.get('prestige', 0)  # Bonus de niveau
-        profil['puissance'] = 0
-        profil['arme'] = None
-        profil['armure'] = None
-        profil['sable'] = 50
+        appliquer_mutation(profil['id'], {'prestige': 1}, {
+            'niveau': 2 + profil.get('prestige', 0),  # Bonus de niveau
+            'puissance': 0,
+            'arme': None,
+            'armure': None,
+            'sable': 50
+        })
         return True
     return False
 
@@ -352,79 +382,104 @@ def verifier_daily_login(profil):
     
     # Calcul du bonus
     bonus_sable = SABLE_DAILY_BASE + (streak * 10)
-    profil['sable'] += bonus_sable
-    profil['dernier_daily'] = now.isoformat()
-    profil['streak_daily'] = streak
+    appliquer_mutation(profil['id'], {'sable': bonus_sable}, {
+        'dernier_daily': now.isoformat(),
+        'streak_daily': streak
+    })
     
     return bonus_sable, streak
 
 def obtenir_joueur(user_id):
-    """Récupère le profil d'un joueur"""
-    joueurs = charger_joueurs()
-    profil = joueurs.get(str(user_id))
-    
-    if profil:
-        # Migrer le profil s'il manque des champs
-        profil = migrer_profil(profil)
-        joueurs[str(user_id)] = profil
-        sauvegarder_joueurs(joueurs)
-        return profil
-    return None
+    """Récupère le profil d'un joueur (déjà migré au chargement)"""
+    return magasin_joueurs.obtenir(user_id)
+
+def voir_joueur(user_id):
+    """Vue en lecture seule du profil d'un joueur (aucune écriture, rien n'est stocké)
+
+    Les gains de messages pas encore appliqués sont ajoutés à une copie, sans être écrits.
+    """
+    joueur = magasin_joueurs.consulter(user_id)
+    gains = accumulateur_recompenses.gains_en_attente(user_id)
+    if joueur is None or gains is None:
+        return joueur
+    vue = dict(joueur)
+    appliquer_delta(vue, *gains)
+    return vue
 
 def sauvegarder_joueur(user_id, profil):
-    """Sauvegarde le profil d'un joueur"""
+    """Sauvegarde le profil d'un joueur (écriture différée)"""
     try:
-        joueurs = charger_joueurs()
-        joueurs[str(user_id)] = profil
-        sauvegarder_joueurs(joueurs)
+        magasin_joueurs.sauvegarder(user_id, profil)
     except Exception as e:
         logger.error(f"Erreur lors de la sauvegarde du joueur {user_id}: {e}")
 
+def appliquer_mutation(user_id, increments=None, valeurs=None):
+    """Applique un delta au profil d'un joueur et l'ajoute au journal"""
+    return magasin_joueurs.appliquer(user_id, increments, valeurs)
+
+# Gains de messages regroupés en mémoire puis appliqués par lots
+accumulateur_recompenses = AccumulateurRecompenses(SABLE_PAR_MESSAGE, delai_min=1)
+
+def crediter_messages(user_id, increments, valeurs):
+    """Applique le lot de gains de messages d'un joueur (achievements vérifiés une fois)"""
+    if not magasin_joueurs.obtenir(user_id):
+        return
+    joueur = appliquer_mutation(user_id, increments, valeurs)
+    debloquer_achievements(user_id, joueur, increments.keys())
+
+def debloquer_achievements(user_id, joueur, champs=None):
+    """Ajoute les nouveaux achievements du joueur et les journalise"""
+    achievements_gagnes = verifier_achievements(joueur, champs)
+    for ach_id in achievements_gagnes:
+        ajouter_achievement(joueur, ach_id)
+    if achievements_gagnes:
+        appliquer_mutation(user_id, valeurs={'achievements': list(joueur['achievements'])})
+    return achievements_gagnes
+
 # ================== GESTION DES TICKETS ==================
 
+# Tickets en mémoire, écrits en arrière-plan
+magasin_tickets = TicketStore(backend_stockage, persistance)
+
+# État global (opérations en cours à reprendre après un redémarrage)
+etat_bot = EtatStore(backend_stockage, persistance)
+
 def charger_tickets():
-    """Charge les données des tickets depuis le JSON"""
-    if os.path.exists(TICKETS_FILE):
-        try:
-            with open(TICKETS_FILE, 'r', encoding='utf-8') as f:
-                contenu = f.read().strip()
-                if contenu:
-                    return json.loads(contenu)
-        except (json.JSONDecodeError, ValueError):
-            logger.error("Erreur lors du chargement des tickets")
+    """Charge les données des tickets depuis le cache mémoire"""
+    try:
+        return magasin_tickets.tous()
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement des tickets: {e}")
     return {}
 
 def sauvegarder_tickets(tickets):
-    """Sauvegarde les données des tickets"""
+    """Sauvegarde les données des tickets (en arrière-plan)"""
     try:
-        with open(TICKETS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(tickets, f, indent=2, ensure_ascii=False)
+        magasin_tickets.remplacer_tout(tickets)
     except Exception as e:
         logger.error(f"Erreur lors de la sauvegarde des tickets: {e}")
 
 def creer_ticket(user_id, channel_id):
     """Crée un ticket dans la DB"""
-    tickets = charger_tickets()
-    tickets[str(user_id)] = {
+    sauvegarder_ticket(user_id, {
         'user_id': str(user_id),
         'channel_id': str(channel_id),
         'creation_date': datetime.now().isoformat(),
         'tutoriel_etape': 1,
         'tutoriel_complete': False,
         'archive': False
-    }
-    sauvegarder_tickets(tickets)
+    })
 
 def obtenir_ticket(user_id):
     """Récupère le ticket d'un utilisateur"""
-    tickets = charger_tickets()
-    return tickets.get(str(user_id))
+    return charger_tickets().get(str(user_id))
 
 def sauvegarder_ticket(user_id, ticket_data):
-    """Sauvegarde les données d'un ticket"""
-    tickets = charger_tickets()
-    tickets[str(user_id)] = ticket_data
-    sauvegarder_tickets(tickets)
+    """Sauvegarde les données d'un ticket (en arrière-plan)"""
+    try:
+        magasin_tickets.sauvegarder(user_id, ticket_data)
+    except Exception as e:
+        logger.error(f"Erreur lors de la sauvegarde du ticket {user_id}: {e}")
 
 def calculer_puissance(classe, arme_data, armure_data):
     """Calcule la puissance totale"""
@@ -435,6 +490,24 @@ def calculer_puissance(classe, arme_data, armure_data):
         puissance += armure_data.get('defense', 0)
     return puissance
 
+def puissance_equipement(joueur):
+    """Puissance de l'équipement porté (seul l'équipement de la classe du joueur compte)"""
+    classe = joueur['classe']
+    return calculer_puissance(
+        classe,
+        contenu().catalogue.obtenir(classe, 'arme', joueur.get('arme'), meme_classe=True),
+        contenu().catalogue.obtenir(classe, 'armure', joueur.get('armure'), meme_classe=True)
+    )
+
+def recalculer_niveaux():
+    """Recalcule en un lot le niveau de tous les profils de la saison (changement de courbe)"""
+    niveaux = table_niveaux.niveaux_lot(vue_colonnes.colonne('puissance'))
+    # Lignes à corriger relevées avant les mutations (qui mettent la vue à jour)
+    lignes = list(compress(range(len(niveaux)), map(ne, niveaux, vue_colonnes.colonne('niveau'))))
+    for ligne in lignes:
+        appliquer_mutation(vue_colonnes.user_ids[ligne], valeurs={'niveau': niveaux[ligne]})
+    return len(lignes)
+
 def mettre_a_jour_niveau(joueur):
     """Met à jour le niveau du joueur selon sa puissance"""
     ancien_niveau = joueur.get('niveau', 1)
@@ -473,10 +546,13 @@ async def assigner_role_classe(member, classe):
         await envoyer_log(f"Erreur rôle: {e}", "ERROR")
         return False
 
+# Pseudos par serveur, alimentés par la gateway (évite les fetch_member)
+cache_noms = CacheNoms(ttl=PSEUDOS_TTL_SECONDES)
+
 def obtenir_pseudo_serveur(member: discord.User | discord.Member):
     """Obtient le pseudo du serveur (nickname) ou le nom d'utilisateur"""
-    if isinstance(member, discord.Member) and member.nick:
-        return member.nick
+    if isinstance(member, discord.Member):
+        return cache_noms.memoriser_membre(member)
     return member.name
 
 # ================== ÉVÉNEMENTS ==================
@@ -486,6 +562,10 @@ async def on_ready():
     """Quand le bot est prêt"""
     global views_added
     
+    planificateur_envois.demarrer()
+    if LOG_CHANNEL_ID:
+        expediteur_logs.demarrer()
+    
     if bot.user:
         print(f'{bot.user} est connecté !')
         print(f'Bot ID: {bot.user.id}')
@@ -498,23 +578,48 @@ async def on_ready():
         bot.add_view(BoutonsClasse(0))
         bot.add_view(BoutonsFermeture(0))
         views_added = True
+    
+    if not vidage_joueurs.is_running():
+        vidage_joueurs.start()
+    if not recompenses_messages.is_running():
+        recompenses_messages.start()
+    if not reconciliation_stats.is_running():
+        reconciliation_stats.start()
+    
+    # Reprendre un reset interrompu par un redémarrage
+    global tache_reset
+    etat_reset = etat_bot.obtenir(OPERATION_RESET)
+    if etat_reset and (tache_reset is None or tache_reset.done()):
+        tache_reset = asyncio.create_task(reprendre_reset(etat_reset))
 
 @bot.before_invoke
 async def before_invoke(ctx):
     """Évite les doublons de commandes"""
-    global last_command
+    # La commande garde jusqu'au bout la version du contenu avec laquelle elle a commencé
+    contenu_epingle.set(contenu_jeu)
+    
+    # Les écritures de la commande lui sont attribuées
+    source_ecriture.set(f"!{ctx.command.name}")
+    invocations_commandes[ctx.command.name] += 1
     
     # Créer une clé unique pour le message
-    key = f"{ctx.author.id}:{ctx.message.id}"
-    current_time = datetime.now().timestamp()
+    key = (ctx.author.id, ctx.message.id)
     
     # Vérifier si la même commande a été exécutée récemment (dans les 100ms)
-    if key in last_command:
-        if current_time - last_command[key] < 0.1:
-            await ctx.message.delete()
-            return
+    if last_command.actif(key):
+        await ctx.message.delete()
+        return
+    
+    last_command.ajouter(key, 0.1)
     
-    last_command[key] = current_time
+    # Les commandes qui modifient le profil partent du sable gagné par les messages pas encore appliqués
+    # (les commandes de lecture l'ajoutent à leur vue sans l'écrire); écriture attribuée aux messages
+    if ctx.command.name not in COMMANDES_LECTURE:
+        jeton = source_ecriture.set(SOURCE_GAINS_MESSAGES)
+        try:
+            accumulateur_recompenses.vider_joueur(ctx.author.id, crediter_messages)
+        finally:
+            source_ecriture.reset(jeton)
 
 @bot.event
 async def on_message(message):
@@ -531,18 +636,9 @@ async def on_message(message):
         
         # Récompenser les messages SEULEMENT si classe choisie et pas de cooldown
         if joueur['classe']:
+            # Min 1 sec entre les gains, appliqués par lots par recompenses_messages
             timestamp_actuel = datetime.now().timestamp()
-            if timestamp_actuel - joueur.get('dernier_gain_message', 0) >= 1:  # Min 1 sec entre les gains
-                joueur['sable'] += SABLE_PAR_MESSAGE
-                joueur['messages_envoyes'] = joueur.get('messages_envoyes', 0) + 1
-                joueur['dernier_gain_message'] = timestamp_actuel
-                
-                # Vérifier les achievements
-                achievements_gagnes = verifier_achievements(joueur)
-                for ach_id in achievements_gagnes:
-                    ajouter_achievement(joueur, ach_id)
-                
-                sauvegarder_joueur(message.author.id, joueur)
+            accumulateur_recompenses.enregistrer(message.author.id, joueur.get('dernier_gain_message', 0), timestamp_actuel)
         
     except Exception as e:
         logger.error(f"Erreur dans on_message: {e}")
@@ -555,26 +651,55 @@ async def on_message(message):
 async def on_member_update(before, after):
     """Détecte les boosts du serveur"""
     try:
+        if before.nick != after.nick or before.name != after.name:
+            cache_noms.memoriser_membre(after)
+        
         if before.premium_since != after.premium_since and after.premium_since is not None:
-            joueur = obtenir_joueur(after.id)
-            if not joueur:
-                joueur = creer_profil_joueur(after.id, after.name)
+            if not obtenir_joueur(after.id):
+                sauvegarder_joueur(after.id, creer_profil_joueur(after.id, after.name))
             
-            joueur['sable'] += SABLE_BOOST_SERVEUR
-            joueur['boosts'] = joueur.get('boosts', 0) + 1
+            joueur = appliquer_mutation(after.id, {'sable': SABLE_BOOST_SERVEUR, 'boosts': 1})
             
             # Vérifier les achievements
-            achievements_gagnes = verifier_achievements(joueur)
-            for ach_id in achievements_gagnes:
-                ajouter_achievement(joueur, ach_id)
-            
-            sauvegarder_joueur(after.id, joueur)
+            debloquer_achievements(after.id, joueur, ('sable', 'boosts'))
             
             pseudo = obtenir_pseudo_serveur(after)
             await envoyer_log(f"{pseudo} a boosté le serveur +{SABLE_BOOST_SERVEUR} ⏳", "BOOST")
     except Exception as e:
         logger.error(f"Erreur dans on_member_update: {e}")
 
+@bot.event
+async def on_member_join(member):
+    """Ajoute le pseudo du nouveau membre au cache"""
+    cache_noms.memoriser_membre(member)
+
+@bot.event
+async def on_member_remove(member):
+    """Retire le pseudo du membre parti du cache"""
+    cache_noms.oublier(member.guild.id, member.id)
+
+@tasks.loop(seconds=RECOMPENSES_INTERVALLE_SECONDES)
+async def recompenses_messages():
+    """Applique les gains de messages accumulés (une mutation par joueur)"""
+    source_ecriture.set(SOURCE_GAINS_MESSAGES)
+    accumulateur_recompenses.vider(crediter_messages)
+
+@tasks.loop(minutes=RECONCILIATION_STATS_MINUTES)
+async def reconciliation_stats():
+    """Recalcule les agrégats de !stats depuis les profils pour corriger toute dérive"""
+    ecarts = statistiques_serveur.reconcilier(magasin_joueurs.profils_saison())
+    if ecarts:
+        logger.warning(f"Statistiques réconciliées, écarts: {ecarts}")
+
+@tasks.loop(seconds=1)
+async def vidage_joueurs():
+    """Force le journal sur disque et le compacte périodiquement dans le snapshot"""
+    magasin_joueurs.planifier_synchronisation()
+    if magasin_joueurs.doit_vider():
+        nombre = await magasin_joueurs.vider_async()
+        if nombre:
+            logger.info(f"Compaction du journal: {nombre} profils sauvegardés")
+
 @tasks.loop(minutes=1)
 async def compteur_vocal():
     """Récompense les utilisateurs en vocal chaque minute (DÉSACTIVÉ)"""
@@ -714,7 +839,7 @@ class BoutonsClasse(discord.ui.View):
         joueur['classe'] = classe
         
         # Vérifier achievements
-        achievements_gagnes = verifier_achievements(joueur)
+        achievements_gagnes = verifier_achievements(joueur, ('classe',))
         for ach_id in achievements_gagnes:
             ajouter_achievement(joueur, ach_id)
         
@@ -734,7 +859,7 @@ class BoutonsClasse(discord.ui.View):
         
         embed = discord.Embed(
             title="✅ Classe Choisie !",
-            description=f"Tu es maintenant un {CLASSES[classe]['emoji']} **{classe.capitalize()}**",
+            description=f"Tu es maintenant un {contenu().classes[classe]['emoji']} **{classe.capitalize()}**",
             color=discord.Color.green()
         )
         await interaction.followup.send(embed=embed, ephemeral=True)
@@ -772,7 +897,11 @@ class BoutonsFermeture(discord.ui.View):
             embed.add_field(name="Achievements", value=f"{len(joueur.get('achievements', []))} 🏆", inline=True)
         
         embed.set_footer(text="Salon sera archivé dans 7 jours")
-        await interaction.followup.send(embed=embed)
+        await planificateur_envois.envoyer(
+            ('salon', interaction.channel_id),
+            lambda: interaction.followup.send(embed=embed),
+            PlanificateurEnvois.FOND
+        )
         
         if ticket:
             ticket['archive'] = True
@@ -782,8 +911,8 @@ class BoutonsFermeture(discord.ui.View):
 
 # Fonctions d'envoi du tutoriel
 
-async def envoyer_tutoriel_etape1(channel: discord.TextChannel, user: discord.User | discord.Member):
-    """Étape 1: Bienvenue"""
+def construire_tutoriel_etape1(jeu):
+    """Embed de l'étape 1 (sans la miniature du joueur)"""
     embed = discord.Embed(
         title="👋 Étape 1: Bienvenue",
         description="Bienvenue dans Le Marchand de Sable !",
@@ -810,21 +939,25 @@ async def envoyer_tutoriel_etape1(channel: discord.TextChannel, user: discord.Us
         value="**Étape 1 de 5** - Bienvenue ✅",
         inline=False
     )
-    
+    return embed
+
+async def envoyer_tutoriel_etape1(channel: discord.TextChannel, user: discord.User | discord.Member):
+    """Étape 1: Bienvenue"""
+    embed = embed_en_cache(('tutoriel', 1), construire_tutoriel_etape1, copie=True)
     embed.set_thumbnail(url=user.avatar.url if user.avatar else None)
     
     view = BoutonsTutoriel(user.id, 1)
-    await channel.send(embed=embed, view=view)
+    await envoyer_salon(channel, embed=embed, view=view)
 
-async def envoyer_tutoriel_etape2(channel: discord.TextChannel, user: discord.User | discord.Member):
-    """Étape 2: Choisir une classe"""
+def construire_tutoriel_etape2(jeu):
+    """Embed de l'étape 2"""
     embed = discord.Embed(
         title="🎭 Étape 2: Choisir Ta Classe",
         description="Chaque classe a ses propres équipements uniques !",
         color=discord.Color.purple()
     )
     
-    for nom, info in CLASSES.items():
+    for nom, info in jeu.classes.items():
         embed.add_field(
             name=f"{info['emoji']} {nom.capitalize()}",
             value=info['description'],
@@ -836,33 +969,24 @@ async def envoyer_tutoriel_etape2(channel: discord.TextChannel, user: discord.Us
         value="**Étape 2 de 5** - Choisir une classe",
         inline=False
     )
-    
+    return embed
+
+async def envoyer_tutoriel_etape2(channel: discord.TextChannel, user: discord.User | discord.Member):
+    """Étape 2: Choisir une classe"""
+    embed = embed_en_cache(('tutoriel', 2), construire_tutoriel_etape2)
     view = BoutonsClasse(user.id)
-    await channel.send(embed=embed, view=view)
+    await envoyer_salon(channel, embed=embed, view=view)
 
-async def envoyer_tutoriel_etape3(channel: discord.TextChannel, user: discord.User | discord.Member):
-    """Étape 3: Équipement gratuit"""
+def construire_tutoriel_etape3(jeu, classe):
+    """Embed de l'étape 3 pour une classe (None: pas d'équipement offert)"""
     embed = discord.Embed(
         title="🎁 Étape 3: Ton Premier Équipement",
         description="Voici un équipement gratuit pour bien commencer !",
         color=discord.Color.green()
     )
     
-    joueur = obtenir_joueur(user.id)
-    if joueur and joueur['classe']:
-        classe_data = CLASSES[joueur['classe']]
-        arme = classe_data['armes'][0]
-        
-        joueur['arme'] = arme['nom']
-        joueur['sable'] += SABLE_TUTORIEL
-        
-        # Calculer puissance
-        arme_data = arme
-        armure_data = None
-        joueur['puissance'] = calculer_puissance(joueur['classe'], arme_data, armure_data)
-        
-        sauvegarder_joueur(user.id, joueur)
-        
+    if classe:
+        arme = jeu.catalogue.numero(classe, 'arme', 1)
         embed.add_field(
             name="⚔️ Équipement Reçu",
             value=f"{arme['nom']}\nPuissance: +{arme['puissance']} ⚡",
@@ -880,12 +1004,30 @@ async def envoyer_tutoriel_etape3(channel: discord.TextChannel, user: discord.Us
         value="**Étape 3 de 5** - Équipement ✅",
         inline=False
     )
+    return embed
+
+async def envoyer_tutoriel_etape3(channel: discord.TextChannel, user: discord.User | discord.Member):
+    """Étape 3: Équipement gratuit"""
+    joueur = obtenir_joueur(user.id)
+    classe = None
+    if joueur and joueur['classe']:
+        classe = joueur['classe']
+        arme = contenu().catalogue.numero(classe, 'arme', 1)
+        
+        joueur['arme'] = arme['id']
+        joueur['sable'] += SABLE_TUTORIEL
+        
+        # Calculer puissance
+        joueur['puissance'] = puissance_equipement(joueur)
+        
+        sauvegarder_joueur(user.id, joueur)
     
+    embed = embed_en_cache(('tutoriel', 3, classe), construire_tutoriel_etape3, classe)
     view = BoutonsTutoriel(user.id, 3)
-    await channel.send(embed=embed, view=view)
+    await envoyer_salon(channel, embed=embed, view=view)
 
-async def envoyer_tutoriel_etape4(channel: discord.TextChannel, user: discord.User | discord.Member):
-    """Étape 4: Système de sable"""
+def construire_tutoriel_etape4(jeu):
+    """Embed de l'étape 4"""
     embed = discord.Embed(
         title="💰 Étape 4: Comment Gagner du Sable",
         description="Il y a plusieurs façons de devenir riche !",
@@ -903,12 +1045,16 @@ async def envoyer_tutoriel_etape4(channel: discord.TextChannel, user: discord.Us
         value="**Étape 4 de 5** - Système de Sable",
         inline=False
     )
-    
+    return embed
+
+async def envoyer_tutoriel_etape4(channel: discord.TextChannel, user: discord.User | discord.Member):
+    """Étape 4: Système de sable"""
+    embed = embed_en_cache(('tutoriel', 4), construire_tutoriel_etape4)
     view = BoutonsTutoriel(user.id, 4)
-    await channel.send(embed=embed, view=view)
+    await envoyer_salon(channel, embed=embed, view=view)
 
-async def envoyer_tutoriel_etape5(channel: discord.TextChannel, user: discord.User | discord.Member):
-    """Étape 5: Commandes essentielles"""
+def construire_tutoriel_etape5(jeu):
+    """Embed de l'étape 5"""
     embed = discord.Embed(
         title="📚 Étape 5: Commandes Essentielles",
         description="Voici les commandes principales !",
@@ -943,23 +1089,23 @@ async def envoyer_tutoriel_etape5(channel: discord.TextChannel, user: discord.Us
         value="**Étape 5 de 5** - Commandes",
         inline=False
     )
-    
+    return embed
+
+async def envoyer_tutoriel_etape5(channel: discord.TextChannel, user: discord.User | discord.Member):
+    """Étape 5: Commandes essentielles"""
+    embed = embed_en_cache(('tutoriel', 5), construire_tutoriel_etape5)
     view = BoutonsTutoriel(user.id, 5)
-    await channel.send(embed=embed, view=view)
+    await envoyer_salon(channel, embed=embed, view=view)
 
-async def envoyer_tutoriel_complete(channel: discord.TextChannel, user: discord.User | discord.Member):
-    """Tutoriel complété"""
+def construire_tutoriel_complete(jeu, recompense):
+    """Embed de fin du tutoriel (avec ou sans la récompense finale)"""
     embed = discord.Embed(
         title="🎉 Tutoriel Complété !",
         description="Tu es prêt à commencer ton aventure !",
         color=discord.Color.green()
     )
     
-    joueur = obtenir_joueur(user.id)
-    if joueur:
-        joueur['sable'] += SABLE_TUTORIEL * 2  # Bonus final
-        sauvegarder_joueur(user.id, joueur)
-        
+    if recompense:
         embed.add_field(
             name="🎁 Récompenses Finales",
             value=f"+{SABLE_TUTORIEL * 2} ⏳ bonus de completion",
@@ -974,30 +1120,32 @@ async def envoyer_tutoriel_complete(channel: discord.TextChannel, user: discord.
               "• Partage avec tes amis ! 👥",
         inline=False
     )
+    return embed
+
+async def envoyer_tutoriel_complete(channel: discord.TextChannel, user: discord.User | discord.Member):
+    """Tutoriel complété"""
+    joueur = obtenir_joueur(user.id)
+    if joueur:
+        joueur['sable'] += SABLE_TUTORIEL * 2  # Bonus final
+        sauvegarder_joueur(user.id, joueur)
     
     ticket = obtenir_ticket(user.id)
     if ticket:
         ticket['tutoriel_complete'] = True
         sauvegarder_ticket(user.id, ticket)
     
-    await channel.send(embed=embed)
+    embed = embed_en_cache(('tutoriel', 'complete', bool(joueur)), construire_tutoriel_complete, bool(joueur))
+    await envoyer_salon(channel, embed=embed)
 
 # ================== COMMANDES ==================
 
 @bot.command(name='sable')
+@limite_debit(capacite=2, periode=2)
 async def afficher_sable(ctx):
     """Affiche le sable du joueur"""
     try:
-        if not verifier_cooldown(ctx.author.id, 'sable'):
-            await ctx.send("⏱️ Attendez un peu avant de relancer cette commande !")
-            return
-        
-        ajouter_cooldown(ctx.author.id, 'sable', 2)
-        
-        joueur = obtenir_joueur(ctx.author.id)
-        if not joueur:
-            joueur = creer_profil_joueur(ctx.author.id, ctx.author.name)
-            sauvegarder_joueur(ctx.author.id, joueur)
+        # Lecture seule: le profil n'est créé qu'à la première action qui le modifie
+        joueur = voir_joueur(ctx.author.id) or creer_profil_joueur(ctx.author.id, ctx.author.name)
         
         pseudo = obtenir_pseudo_serveur(ctx.author)
         
@@ -1008,11 +1156,11 @@ async def afficher_sable(ctx):
         )
         embed.add_field(name="Puissance", value=f"{joueur['puissance']} ⚡", inline=False)
         if joueur['arme']:
-            embed.add_field(name="Arme", value=joueur['arme'], inline=True)
+            embed.add_field(name="Arme", value=contenu().catalogue.nom(joueur['classe'], 'arme', joueur['arme']), inline=True)
         if joueur['armure']:
-            embed.add_field(name="Armure", value=joueur['armure'], inline=True)
+            embed.add_field(name="Armure", value=contenu().catalogue.nom(joueur['classe'], 'armure', joueur['armure']), inline=True)
         if joueur['classe']:
-            embed.add_field(name="Classe", value=f"{CLASSES[joueur['classe']]['emoji']} {joueur['classe'].capitalize()}", inline=True)
+            embed.add_field(name="Classe", value=f"{contenu().classes[joueur['classe']]['emoji']} {joueur['classe'].capitalize()}", inline=True)
         
         await ctx.send(embed=embed)
     except Exception as e:
@@ -1021,15 +1169,10 @@ async def afficher_sable(ctx):
         await envoyer_log(f"Erreur !sable: {e}", "ERROR")
 
 @bot.command(name='info')
+@limite_debit(capacite=2, periode=2)
 async def afficher_info(ctx, membre: discord.Member | None = None):
     """Affiche les informations détaillées d'un profil"""
     try:
-        if not verifier_cooldown(ctx.author.id, 'info'):
-            await ctx.send("⏱️ Attendez un peu avant de relancer cette commande !")
-            return
-        
-        ajouter_cooldown(ctx.author.id, 'info', 2)
-        
         if membre is None:
             membre = ctx.author
         
@@ -1037,7 +1180,7 @@ async def afficher_info(ctx, membre: discord.Member | None = None):
             await ctx.send("❌ Impossible de trouver le membre !")
             return
         
-        joueur = obtenir_joueur(membre.id)
+        joueur = voir_joueur(membre.id)
         if not joueur:
             pseudo = obtenir_pseudo_serveur(membre)
             await ctx.send(f"❌ {pseudo} n'a pas encore de profil !")
@@ -1065,7 +1208,7 @@ async def afficher_info(ctx, membre: discord.Member | None = None):
             )
         
         if joueur['classe']:
-            classe_data = CLASSES[joueur['classe']]
+            classe_data = contenu().classes[joueur['classe']]
             embed.add_field(
                 name="🎭 Classe",
                 value=f"{classe_data['emoji']} {joueur['classe'].capitalize()}",
@@ -1073,9 +1216,9 @@ async def afficher_info(ctx, membre: discord.Member | None = None):
             )
         
         if joueur['arme']:
-            embed.add_field(name="⚔️ Arme", value=joueur['arme'], inline=True)
+            embed.add_field(name="⚔️ Arme", value=contenu().catalogue.nom(joueur['classe'], 'arme', joueur['arme']), inline=True)
         if joueur['armure']:
-            embed.add_field(name="🛡️ Armure", value=joueur['armure'], inline=True)
+            embed.add_field(name="🛡️ Armure", value=contenu().catalogue.nom(joueur['classe'], 'armure', joueur['armure']), inline=True)
         
         niveau = joueur.get('niveau', 1)
         prochain_seuil = calculer_seuil_prochain_niveau(niveau)
@@ -1085,24 +1228,19 @@ async def afficher_info(ctx, membre: discord.Member | None = None):
             inline=False
         )
         
-        # Vérifier et mettre à jour les achievements
-        achievements_gagnes = verifier_achievements(joueur)
-        for ach_id in achievements_gagnes:
-            ajouter_achievement(joueur, ach_id)
-        sauvegarder_joueur(membre.id, joueur)
-        
-        achievements = joueur.get('achievements', [])
+        # Achievements mérités mais pas encore journalisés: affichés sans être sauvegardés
+        achievements = joueur['achievements'] + verifier_achievements(joueur)
         achievements_display = ""
         if achievements:
             for ach_id in achievements:
-                if ach_id in ACHIEVEMENTS:
-                    ach = ACHIEVEMENTS[ach_id]
+                if ach_id in contenu().achievements:
+                    ach = contenu().achievements[ach_id]
                     achievements_display += f"{ach['emoji']} {ach['nom']}\n"
         else:
             achievements_display = "Aucun achievement pour l'instant"
         
         embed.add_field(
-            name=f"🏆 Achievements ({len(achievements)}/{len(ACHIEVEMENTS)})",
+            name=f"🏆 Achievements ({len(achievements)}/{len(contenu().achievements)})",
             value=achievements_display,
             inline=False
         )
@@ -1140,6 +1278,7 @@ async def afficher_info(ctx, membre: discord.Member | None = None):
         await envoyer_log(f"Erreur !info: {e}", "ERROR")
 
 @bot.command(name='classe')
+@limite_debit(capacite=2, periode=3)
 async def choisir_classe(ctx, classe: str | None = None):
     """Choisit une classe (chevalier, samourai, mage)"""
     try:
@@ -1153,7 +1292,7 @@ async def choisir_classe(ctx, classe: str | None = None):
                 color=discord.Color.purple(),
                 description="Tapez `!classe <nom>` pour choisir votre classe"
             )
-            for nom, info in CLASSES.items():
+            for nom, info in contenu().classes.items():
                 embed.add_field(
                     name=f"{info['emoji']} {nom.capitalize()}",
                     value=info['description'],
@@ -1163,7 +1302,7 @@ async def choisir_classe(ctx, classe: str | None = None):
             return
         
         classe = classe.lower()
-        if classe not in CLASSES:
+        if classe not in contenu().classes:
             await ctx.send("❌ Classe invalide ! Choisissez entre : chevalier, samourai, mage")
             return
         
@@ -1174,7 +1313,7 @@ async def choisir_classe(ctx, classe: str | None = None):
         joueur['classe'] = classe
         
         # Vérifier les achievements
-        achievements_gagnes = verifier_achievements(joueur)
+        achievements_gagnes = verifier_achievements(joueur, ('classe',))
         for ach_id in achievements_gagnes:
             ajouter_achievement(joueur, ach_id)
         
@@ -1185,7 +1324,7 @@ async def choisir_classe(ctx, classe: str | None = None):
         embed = discord.Embed(
             title="✨ Classe choisie !",
             color=discord.Color.green(),
-            description=f"Vous êtes désormais un {CLASSES[classe]['emoji']} **{classe.capitalize()}**\n\n{CLASSES[classe]['description']}\n\n💰 Le système de récompense est maintenant activé !"
+            description=f"Vous êtes désormais un {contenu().classes[classe]['emoji']} **{classe.capitalize()}**\n\n{contenu().classes[classe]['description']}\n\n💰 Le système de récompense est maintenant activé !"
         )
         await ctx.send(embed=embed)
     except Exception as e:
@@ -1194,6 +1333,7 @@ async def choisir_classe(ctx, classe: str | None = None):
         await envoyer_log(f"Erreur !classe: {e}", "ERROR")
 
 @bot.command(name='retirer_classe')
+@limite_debit(capacite=1, periode=5)
 async def retirer_classe(ctx):
     """Retire la classe du joueur (arrête les gains de sable)"""
     try:
@@ -1207,7 +1347,7 @@ async def retirer_classe(ctx):
             return
         
         try:
-            for classe_nom in CLASSES.keys():
+            for classe_nom in contenu().classes.keys():
                 role_name = f"Rêveur {classe_nom.capitalize()}"
                 role = discord.utils.get(ctx.guild.roles, name=role_name)
                 if role and role in ctx.author.roles:
@@ -1233,65 +1373,63 @@ async def retirer_classe(ctx):
         await ctx.send("❌ Une erreur s'est produite !")
         await envoyer_log(f"Erreur !retirer_classe: {e}", "ERROR")
 
+# Présentation de la boutique par emplacement: (titre, couleur, statistique, libellé, emoji, autre catégorie)
+PRESENTATION_BOUTIQUE = {
+    'arme': ("Armes", discord.Color.orange(), 'puissance', "Puissance", "⚡", "armures"),
+    'armure': ("Armures", discord.Color.blue(), 'defense', "Défense", "🛡️", "armes"),
+}
+
+def construire_boutique(jeu, classe, emplacement, palier):
+    """Embed de boutique commun aux joueurs d'une classe dont le niveau débloque `palier` équipements"""
+    titre, couleur, statistique, libelle, emoji, autre = PRESENTATION_BOUTIQUE[emplacement]
+    classe_data = jeu.classes[classe]
+    # Tous les niveaux d'un même palier débloquent les mêmes équipements
+    niveaux = jeu.catalogue.niveaux[(classe, emplacement)]
+    niveau = niveaux[palier - 1] if palier else 0
+    embed = discord.Embed(
+        title=f"🛒 {titre} - {classe_data['emoji']} {classe.capitalize()}",
+        color=couleur
+    )
+    for i, equipement in enumerate(jeu.catalogue.liste(classe, emplacement), 1):
+        niveau_requis = equipement.get('niveau_min', 1)
+        etat = f"🔒 Niveau {niveau_requis} requis" if niveau < niveau_requis else "✅ Accessible"
+        
+        embed.add_field(
+            name=f"{i}. {equipement['nom']} ",
+            value=f"Coût: {equipement['cout']} ⏳ | {libelle}: {equipement[statistique]} {emoji} | {etat}",
+            inline=False
+        )
+    embed.set_footer(text=f"Tapez !boutique {autre} pour voir les {autre}")
+    return embed
+
+def embed_boutique(joueur, emplacement):
+    """Embed de boutique en cache, complété avec le sable, le niveau et l'équipement du joueur"""
+    jeu = contenu()
+    classe = joueur['classe']
+    niveau = joueur.get('niveau', 1)
+    palier = jeu.catalogue.nb_debloques(classe, emplacement, niveau)
+    embed = embed_en_cache(('boutique', classe, emplacement, palier), construire_boutique, classe, emplacement, palier, copie=True)
+    embed.description = f"Votre sable: {joueur['sable']} ⏳ | Niveau: {niveau} ⭐\n\nTapez `!acheter {emplacement} <numéro>`"
+    position = jeu.catalogue.position(classe, emplacement, joueur.get(emplacement))
+    if position is not None:
+        champ = embed.fields[position]
+        embed.set_field_at(position, name=f"{champ.name}✅", value=champ.value, inline=False)
+    return embed
+
 @bot.command(name='boutique')
+@limite_debit(capacite=2, periode=2)
 async def afficher_boutique(ctx, categorie: str | None = None):
     """Affiche la boutique d'équipements"""
     try:
-        if not verifier_cooldown(ctx.author.id, 'boutique'):
-            await ctx.send("⏱️ Attendez un peu avant de relancer cette commande !")
-            return
-        
-        ajouter_cooldown(ctx.author.id, 'boutique', 2)
-        
-        joueur = obtenir_joueur(ctx.author.id)
-        if not joueur:
-            joueur = creer_profil_joueur(ctx.author.id, ctx.author.name)
-            sauvegarder_joueur(ctx.author.id, joueur)
-        
-        if not joueur['classe']:
+        joueur = voir_joueur(ctx.author.id)
+        if not joueur or not joueur['classe']:
             await ctx.send("❌ Vous devez d'abord choisir une classe avec `!classe <nom>`")
             return
         
-        classe_data = CLASSES[joueur['classe']]
-        niveau = joueur.get('niveau', 1)
-        
-        if not categorie or categorie.lower() == 'armes':
-            embed = discord.Embed(
-                title=f"🛒 Armes - {classe_data['emoji']} {joueur['classe'].capitalize()}",
-                color=discord.Color.orange(),
-                description=f"Votre sable: {joueur['sable']} ⏳ | Niveau: {niveau} ⭐\n\nTapez `!acheter arme <numéro>`"
-            )
-            for i, arme in enumerate(classe_data['armes'], 1):
-                statut = "✅" if joueur.get('arme') == arme['nom'] else ""
-                niveau_requis = arme.get('niveau_min', 1)
-                etat = f"🔒 Niveau {niveau_requis} requis" if niveau < niveau_requis else f"✅ Accessible"
-                
-                embed.add_field(
-                    name=f"{i}. {arme['nom']} {statut}",
-                    value=f"Coût: {arme['cout']} ⏳ | Puissance: {arme['puissance']} ⚡ | {etat}",
-                    inline=False
-                )
-            embed.set_footer(text="Tapez !boutique armures pour voir les armures")
-            await ctx.send(embed=embed)
-        
-        elif categorie.lower() == 'armures':
-            embed = discord.Embed(
-                title=f"🛒 Armures - {classe_data['emoji']} {joueur['classe'].capitalize()}",
-                color=discord.Color.blue(),
-                description=f"Votre sable: {joueur['sable']} ⏳ | Niveau: {niveau} ⭐\n\nTapez `!acheter armure <numéro>`"
-            )
-            for i, armure in enumerate(classe_data['armures'], 1):
-                statut = "✅" if joueur.get('armure') == armure['nom'] else ""
-                niveau_requis = armure.get('niveau_min', 1)
-                etat = f"🔒 Niveau {niveau_requis} requis" if niveau < niveau_requis else f"✅ Accessible"
-                
-                embed.add_field(
-                    name=f"{i}. {armure['nom']} {statut}",
-                    value=f"Coût: {armure['cout']} ⏳ | Défense: {armure['defense']} 🛡️ | {etat}",
-                    inline=False
-                )
-            embed.set_footer(text="Tapez !boutique armes pour voir les armes")
-            await ctx.send(embed=embed)
+        categories = {'armes': 'arme', 'armures': 'armure'}
+        emplacement = categories.get((categorie or 'armes').lower())
+        if emplacement:
+            await ctx.send(embed=embed_boutique(joueur, emplacement))
         else:
             await ctx.send("❌ Catégorie invalide ! Utilisez : `!boutique armes` ou `!boutique armures`")
     except Exception as e:
@@ -1299,16 +1437,14 @@ async def afficher_boutique(ctx, categorie: str | None = None):
         await ctx.send("❌ Une erreur s'est produite !")
         await envoyer_log(f"Erreur !boutique: {e}", "ERROR")
 
+# Champs modifiés par un achat (pour la vérification des achievements)
+CHAMPS_ACHAT = ('sable', 'sable_depense', 'equipment_count', 'arme', 'armure', 'puissance', 'niveau')
+
 @bot.command(name='acheter')
+@limite_debit(capacite=2, periode=2)
 async def acheter_equipement(ctx, categorie: str, numero: int):
     """Achète un équipement"""
     try:
-        if not verifier_cooldown(ctx.author.id, 'acheter'):
-            await ctx.send("⏱️ Attendez un peu avant de relancer cette commande !")
-            return
-        
-        ajouter_cooldown(ctx.author.id, 'acheter', 2)
-        
         joueur = obtenir_joueur(ctx.author.id)
         if not joueur:
             joueur = creer_profil_joueur(ctx.author.id, ctx.author.name)
@@ -1318,22 +1454,15 @@ async def acheter_equipement(ctx, categorie: str, numero: int):
             await ctx.send("❌ Vous devez d'abord choisir une classe avec `!classe <nom>`")
             return
         
-        classe_data = CLASSES[joueur['classe']]
         categorie = categorie.lower()
         
-        if categorie == 'arme':
-            if numero < 1 or numero > len(classe_data['armes']):
-                await ctx.send(f"❌ Numéro invalide ! Choisissez entre 1 et {len(classe_data['armes'])}")
-                return
-            equipement = classe_data['armes'][numero - 1]
-        elif categorie == 'armure':
-            if numero < 1 or numero > len(classe_data['armures']):
-                await ctx.send(f"❌ Numéro invalide ! Choisissez entre 1 et {len(classe_data['armures'])}")
-                return
-            equipement = classe_data['armures'][numero - 1]
-        else:
+        if categorie not in ('arme', 'armure'):
             await ctx.send("❌ Catégorie invalide ! Utilisez : `arme` ou `armure`")
             return
+        equipement = contenu().catalogue.numero(joueur['classe'], categorie, numero)
+        if equipement is None:
+            await ctx.send(f"❌ Numéro invalide ! Choisissez entre 1 et {len(contenu().catalogue.liste(joueur['classe'], categorie))}")
+            return
         
         niveau_requis = equipement.get('niveau_min', 1)
         niveau_joueur = joueur.get('niveau', 1)
@@ -1346,37 +1475,18 @@ async def acheter_equipement(ctx, categorie: str, numero: int):
             await ctx.send(f"❌ Vous n'avez pas assez de sable ! Il vous faut {equipement['cout'] - joueur['sable']} ⏳ de plus.")
             return
         
-        joueur['sable'] -= equipement['cout']
-        joueur['sable_depense'] = joueur.get('sable_depense', 0) + equipement['cout']
-        joueur['equipment_count'] = joueur.get('equipment_count', 0) + 1
-        
-        if categorie == 'arme':
-            joueur['arme'] = equipement['nom']
-        else:
-            joueur['armure'] = equipement['nom']
-        
-        arme_data = None
-        armure_data = None
-        if joueur['arme']:
-            for arme in classe_data['armes']:
-                if arme['nom'] == joueur['arme']:
-                    arme_data = arme
-                    break
-        if joueur['armure']:
-            for armure in classe_data['armures']:
-                if armure['nom'] == joueur['armure']:
-                    armure_data = armure
-                    break
+        joueur = appliquer_mutation(
+            ctx.author.id,
+            {'sable': -equipement['cout'], 'sable_depense': equipement['cout'], 'equipment_count': 1},
+            {categorie: equipement['id']}
+        )
         
-        joueur['puissance'] = calculer_puissance(joueur['classe'], arme_data, armure_data)
+        joueur['puissance'] = puissance_equipement(joueur)
+        niveau_up = mettre_a_jour_niveau(joueur)
+        appliquer_mutation(ctx.author.id, valeurs={'puissance': joueur['puissance'], 'niveau': joueur['niveau']})
         
         # Vérifier les achievements
-        achievements_gagnes = verifier_achievements(joueur)
-        for ach_id in achievements_gagnes:
-            ajouter_achievement(joueur, ach_id)
-        
-        niveau_up = mettre_a_jour_niveau(joueur)
-        sauvegarder_joueur(ctx.author.id, joueur)
+        debloquer_achievements(ctx.author.id, joueur, CHAMPS_ACHAT)
         
         nouveau_niveau = joueur.get('niveau', 1)
         message_niveau = ""
@@ -1400,26 +1510,22 @@ async def acheter_equipement(ctx, categorie: str, numero: int):
         await envoyer_log(f"Erreur !acheter: {e}", "ERROR")
 
 @bot.command(name='classement')
+@limite_debit(capacite=1, periode=5, cout=2)
 async def afficher_classement(ctx):
     """Affiche le classement des 5 plus puissants"""
     try:
-        if not verifier_cooldown(ctx.author.id, 'classement'):
-            await ctx.send("⏱️ Attendez un peu avant de relancer cette commande !")
-            return
-        
-        ajouter_cooldown(ctx.author.id, 'classement', 5)
+        classement = [(magasin_joueurs.consulter(user_id), user_id) for user_id, _ in classements['puissance'].top(5)]
         
-        joueurs = charger_joueurs()
-        
-        if not joueurs:
+        if not classement:
             await ctx.send("Aucun joueur pour le moment !")
             return
         
-        classement = sorted(
-            [(profil, nom) for nom, profil in joueurs.items()],
-            key=lambda x: x[0]['puissance'],
-            reverse=True
-        )[:5]
+        # Pseudos depuis le cache, les inconnus sont récupérés en parallèle
+        pseudos = await cache_noms.resoudre(
+            ctx.guild,
+            [user_id for _, user_id in classement],
+            {user_id: profil['username'] for profil, user_id in classement}
+        )
         
         embed = discord.Embed(
             title="🏆 Top 5 des Rêveurs les Plus Puissants",
@@ -1430,16 +1536,12 @@ async def afficher_classement(ctx):
         for i, (profil, user_id) in enumerate(classement, 1):
             classe_emoji = ''
             if profil['classe']:
-                classe_emoji = CLASSES[profil['classe']]['emoji']
+                classe_emoji = contenu().classes[profil['classe']]['emoji']
             
             niveau = profil.get('niveau', 1)
             medal = ['🥇', '🥈', '🥉', '4️⃣', '5️⃣'][i-1]
             
-            try:
-                member = await ctx.guild.fetch_member(int(user_id))
-                pseudo = obtenir_pseudo_serveur(member)
-            except:
-                pseudo = profil['username']
+            pseudo = pseudos[user_id]
             
             embed.add_field(
                 name=f"{medal} {pseudo} {classe_emoji}",
@@ -1453,17 +1555,137 @@ async def afficher_classement(ctx):
         await ctx.send("❌ Une erreur s'est produite !")
         await envoyer_log(f"Erreur !classement: {e}", "ERROR")
 
+@bot.command(name='rang')
+@limite_debit(capacite=1, periode=3, cout=2)
+async def afficher_rang(ctx, metrique: str = 'puissance'):
+    """Affiche le rang du joueur et les joueurs autour de lui"""
+    try:
+        champ = METRIQUES_CLASSEMENT.get(metrique.lower())
+        if not champ:
+            await ctx.send(f"❌ Métrique invalide ! Choisissez entre : {', '.join(METRIQUES_CLASSEMENT)}")
+            return
+        
+        index = classements[champ]
+        rang = index.rang(ctx.author.id)
+        if rang is None:
+            await ctx.send("❌ Vous n'avez pas encore de profil !")
+            return
+        
+        emoji = EMOJIS_METRIQUES[champ]
+        embed = discord.Embed(
+            title=f"📈 Votre rang - {metrique.capitalize()}",
+            color=discord.Color.gold(),
+            description=f"Vous êtes **#{rang}** sur {len(index)} joueurs"
+        )
+        
+        voisins = index.autour(ctx.author.id, 5)
+        defauts = {}
+        for _, user_id, _ in voisins:
+            profil = magasin_joueurs.consulter(user_id)
+            defauts[user_id] = profil['username'] if profil else 'Inconnu'
+        pseudos = await cache_noms.resoudre(ctx.guild, list(defauts), defauts)
+        
+        lignes = []
+        for position, user_id, valeur in voisins:
+            pseudo = pseudos[user_id]
+            ligne = f"#{position} {pseudo} - {valeur:,} {emoji}"
+            lignes.append(f"**{ligne}** ⬅️" if user_id == str(ctx.author.id) else ligne)
+        
+        embed.add_field(name="🏆 Autour de vous", value="\n".join(lignes), inline=False)
+        await ctx.send(embed=embed)
+    except Exception as e:
+        logger.error(f"Erreur dans !rang: {e}")
+        await ctx.send("❌ Une erreur s'est produite !")
+        await envoyer_log(f"Erreur !rang: {e}", "ERROR")
+
+# Reset de saison: rôles traités en masse avec point de reprise dans le stockage
+OPERATION_RESET = 'reset_en_cours'  # État planifié (listes de membres), écrit une fois
+AVANCEMENT_RESET = 'reset_avancement'  # Point de reprise (compteurs et positions), écrit toutes les 2s
+RESET_CONCURRENCE = 5  # Retraits de rôles simultanés
+RESET_DEBIT_ROLES = (10, 1.0)  # Rafale et opérations/seconde sur les rôles d'un serveur
+
+operation_roles = OperationRoles(
+    planificateur_envois,
+    lambda avancement: etat_bot.definir(AVANCEMENT_RESET, avancement),
+    concurrence=RESET_CONCURRENCE
+)
+tache_reset = None
+
+async def executer_reset(guild, message, etat):
+    """Traite les rôles puis les profils; reprend là où `etat` s'est arrêté"""
+    planificateur_envois.configurer_route(('roles', guild.id), *RESET_DEBIT_ROLES)
+    
+    async def progression(etat):
+        try:
+            await message.edit(content=f"🔄 **Réinitialisation en cours...**\n"
+                                       f"⏳ Rôles: {etat['traites']}/{etat['total']} opérations")
+        except Exception as e:
+            logger.error(f"Erreur mise à jour de la progression du reset: {e}")
+    
+    await operation_roles.executer(guild, etat, progression)
+    
+    # Nouvelle saison en O(1): chaque profil sera remis à zéro à son prochain accès
+    if magasin_joueurs.saison < etat['saison']:
+        magasin_joueurs.nouvelle_saison()
+        await asyncio.wrap_future(etat_bot.definir('saison', magasin_joueurs.saison))
+    joueurs_resetés = len(magasin_joueurs.profils)
+    etat_bot.definir(OPERATION_RESET, None)
+    etat_bot.definir(AVANCEMENT_RESET, None)
+    
+    # Message de confirmation final
+    embed = discord.Embed(
+        title="🌙 NOUVELLE SAISON - RÉINITIALISATION COMPLÈTE",
+        color=discord.Color.gold(),
+        description=f"✅ La réinitialisation est terminée avec succès !\n\n"
+                    f"**Statistiques:**\n"
+                    f"• {etat['nb_roles']} rôles traités ({etat['traites']} opérations, {etat['echecs']} échecs)\n"
+                    f"• {joueurs_resetés} profils réinitialisés (à leur prochaine activité)\n"
+                    f"• Chaque joueur: 50 ⏳ de sable\n\n"
+                    f"🎮 Les joueurs peuvent maintenant recommencer avec `!classe <nom>` !"
+    )
+    
+    await message.delete()
+    await envoyer_salon(message.channel, PlanificateurEnvois.INTERACTIF, embed=embed)
+    await envoyer_log(f"NOUVELLE SAISON lancée - {joueurs_resetés} joueurs réinitialisés, {etat['nb_roles']} rôles traités", "RESET")
+
+async def reprendre_reset(etat):
+    """Reprend un reset interrompu (appelé au démarrage)"""
+    try:
+        reprendre_avancement(etat, etat_bot.obtenir(AVANCEMENT_RESET))
+        guild = bot.get_guild(etat['guild_id'])
+        channel = bot.get_channel(etat['channel_id'])
+        if guild is None or channel is None:
+            logger.error("Reset interrompu: serveur ou salon introuvable")
+            return
+        try:
+            message = await channel.fetch_message(etat['message_id'])
+        except discord.NotFound:
+            message = await envoyer_salon(channel, content="🔄 **Reprise de la réinitialisation...**")
+            etat['message_id'] = message.id
+            etat_bot.definir(OPERATION_RESET, etat)
+        await envoyer_log(f"Reprise du reset: {etat['traites']}/{etat['total']} opérations déjà faites", "RESET")
+        await executer_reset(guild, message, etat)
+    except Exception as e:
+        logger.error(f"Erreur lors de la reprise du reset: {e}")
+        await envoyer_log(f"Erreur reprise !reset: {e}", "ERROR")
+
 @bot.command(name='reset')
-async def reset_economie(ctx):
+async def reset_economie(ctx, option: str = None):
     """Reset l'économie et les rôles (fondateur seulement) - Nouvelle saison"""
+    global tache_reset
     try:
         if ctx.author.id != FONDATEUR_ID:
             await ctx.send("❌ Vous n'avez pas la permission d'utiliser cette commande !")
             return
         
+        if tache_reset is not None and not tache_reset.done():
+            await ctx.send("❌ Un reset est déjà en cours !")
+            return
+        
+        garder_roles = option == 'garder_roles'
         confirmation_msg = await ctx.send("⚠️ **ATTENTION !** Vous êtes sur le point de lancer une **NOUVELLE SAISON**:\n"
                                           "• Tous les profils seront réinitialisés\n"
-                                          "• Tous les rôles de classe seront retirés\n"
+                                          f"• Tous les rôles de classe seront {'retirés (rôles conservés)' if garder_roles else 'supprimés'}\n"
                                           "• Chaque joueur retrouvera 50 ⏳ de sable\n\n"
                                           "Tapez `!confirm` pour confirmer.")
         
@@ -1479,63 +1701,80 @@ async def reset_economie(ctx):
         # Message de démarrage du reset
         reset_msg = await ctx.send("🔄 **Réinitialisation en cours...**\n⏳ Suppression des rôles...")
         
-        # Étape 1: Supprimer tous les rôles de classe
-        rôles_supprimes = 0
-        try:
-            for classe_nom in CLASSES.keys():
-                role_name = f"Rêveur {classe_nom.capitalize()}"
-                role = discord.utils.get(ctx.guild.roles, name=role_name)
-                if role:
-                    # Retirer le rôle de tous les membres
-                    for member in ctx.guild.members:
-                        if role in member.roles:
-                            await member.remove_roles(role)
-                    # Supprimer le rôle
-                    await role.delete()
-                    rôles_supprimes += 1
-                    logger.info(f"Rôle supprimé: {role_name}")
-        except Exception as e:
-            logger.error(f"Erreur lors de la suppression des rôles: {e}")
-            await envoyer_log(f"Erreur suppression rôles: {e}", "ERROR")
-        
-        await reset_msg.edit(content=f"🔄 **Réinitialisation en cours...**\n✅ {rôles_supprimes} rôles supprimés\n⏳ Réinitialisation des profils...")
-        
-        # Étape 2: Réinitialiser tous les profils
-        joueurs = charger_joueurs()
-        joueurs_resetés = 0
-        for user_id, profil in joueurs.items():
-            profil['sable'] = 50
-            profil['classe'] = None
-            profil['arme'] = None
-            profil['armure'] = None
-            profil['puissance'] = 0
-            profil['niveau'] = 1
-            profil['dernier_gain_message'] = 0
-            joueurs_resetés += 1
-        
-        sauvegarder_joueurs(joueurs)
-        
-        # Message de confirmation final
-        embed = discord.Embed(
-            title="🌙 NOUVELLE SAISON - RÉINITIALISATION COMPLÈTE",
-            color=discord.Color.gold(),
-            description=f"✅ La réinitialisation est terminée avec succès !\n\n"
-                        f"**Statistiques:**\n"
-                        f"• {rôles_supprimes} rôles supprimés\n"
-                        f"• {joueurs_resetés} profils réinitialisés\n"
-                        f"• Chaque joueur: 50 ⏳ de sable\n\n"
-                        f"🎮 Les joueurs peuvent maintenant recommencer avec `!classe <nom>` !"
-        )
-        
-        await reset_msg.delete()
-        await ctx.send(embed=embed)
-        await envoyer_log(f"NOUVELLE SAISON lancée - {joueurs_resetés} joueurs réinitialisés, {rôles_supprimes} rôles supprimés", "RESET")
+        roles = []
+        for classe_nom in contenu().classes.keys():
+            role = discord.utils.get(ctx.guild.roles, name=f"Rêveur {classe_nom.capitalize()}")
+            if role:
+                roles.append(role)
+        
+        # Point de reprise enregistré avant le premier appel à Discord
+        etat = planifier_roles(ctx.guild, roles, garder_role=garder_roles)
+        etat.update({
+            'nb_roles': len(roles),
+            'channel_id': ctx.channel.id,
+            'message_id': reset_msg.id,
+            'saison': magasin_joueurs.saison + 1
+        })
+        etat_bot.definir(AVANCEMENT_RESET, None)
+        etat_bot.definir(OPERATION_RESET, etat)
+        
+        tache_reset = asyncio.current_task()
+        await executer_reset(ctx.guild, reset_msg, etat)
         
     except Exception as e:
         logger.error(f"Erreur dans !reset: {e}")
         await ctx.send("❌ Une erreur s'est produite lors du reset !")
         await envoyer_log(f"Erreur !reset critique: {e}", "ERROR")
 
+def construire_setup_marchand(jeu):
+    """Embed du message d'accueil"""
+    embed = discord.Embed(
+        title="🌙 Bienvenue au Marchand de Sable",
+        color=discord.Color.purple(),
+        description="Découvrez un monde magique où le sable est la monnaie suprême !",
+        url="https://discord.gg"
+    )
+    
+    embed.add_field(
+        name="✨ L'Aventure t'attend",
+        value="Clique sur le bouton ci-dessous pour commencer ton voyage !\n\n"
+              "Tu seras guidé pas à pas à travers un tutoriel complet pour apprendre à jouer.",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🎯 L'Objectif",
+        value="Deviens le plus puissant de tous ! \n\n"
+              "Accumule du sable magique ⏳ en restant actif sur le serveur et achète des équipements légendaires pour augmenter ta puissance. "
+              "Tu découvriras comment gagner du sable lors du tutoriel ! 📚",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🛡️ Les 3 Grandes Classes",
+        value=f"{jeu.classes['chevalier']['emoji']} **Chevalier** - Puissant et inébranlable\n"
+              f"{jeu.classes['samourai']['emoji']} **Samouraï** - Rapide et tranchant\n"
+              f"{jeu.classes['mage']['emoji']} **Mage** - Mystique et puissant",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="📊 Progression Infinie",
+        value="Débloquez toujours de nouveaux équipements et niveaux ! "
+              "Le système n'a pas de limite - deviens aussi puissant que tu le souhaites.",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🏆 Achievements & Prestige",
+        value="Gagne des badges en accomplissant des objectifs et deviens légendaire avec le système de prestige !",
+        inline=False
+    )
+    
+    embed.set_footer(text="Bonne chance, Rêveur ! 🌙")
+    embed.set_thumbnail(url="https://cdn-icons-png.flaticon.com/512/1995/1995506.png")
+    return embed
+
 @bot.command(name='setup_marchand')
 async def setup_marchand(ctx):
     """Configure et poste le message d'accueil du jeu (fondateur seulement)"""
@@ -1544,52 +1783,7 @@ async def setup_marchand(ctx):
             await ctx.send("❌ Vous n'avez pas la permission d'utiliser cette commande !")
             return
         
-        embed = discord.Embed(
-            title="🌙 Bienvenue au Marchand de Sable",
-            color=discord.Color.purple(),
-            description="Découvrez un monde magique où le sable est la monnaie suprême !",
-            url="https://discord.gg"
-        )
-        
-        embed.add_field(
-            name="✨ L'Aventure t'attend",
-            value="Clique sur le bouton ci-dessous pour commencer ton voyage !\n\n"
-                  "Tu seras guidé pas à pas à travers un tutoriel complet pour apprendre à jouer.",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🎯 L'Objectif",
-            value="Deviens le plus puissant de tous ! \n\n"
-                  "Accumule du sable magique ⏳ en restant actif sur le serveur et achète des équipements légendaires pour augmenter ta puissance. "
-                  "Tu découvriras comment gagner du sable lors du tutoriel ! 📚",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🛡️ Les 3 Grandes Classes",
-            value=f"{CLASSES['chevalier']['emoji']} **Chevalier** - Puissant et inébranlable\n"
-                  f"{CLASSES['samourai']['emoji']} **Samouraï** - Rapide et tranchant\n"
-                  f"{CLASSES['mage']['emoji']} **Mage** - Mystique et puissant",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="📊 Progression Infinie",
-            value="Débloquez toujours de nouveaux équipements et niveaux ! "
-                  "Le système n'a pas de limite - deviens aussi puissant que tu le souhaites.",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🏆 Achievements & Prestige",
-            value="Gagne des badges en accomplissant des objectifs et deviens légendaire avec le système de prestige !",
-            inline=False
-        )
-        
-        embed.set_footer(text="Bonne chance, Rêveur ! 🌙")
-        embed.set_thumbnail(url="https://cdn-icons-png.flaticon.com/512/1995/1995506.png")
-        
+        embed = embed_en_cache(('setup_marchand',), construire_setup_marchand)
         view = BoutonCommencerAventure()
         await ctx.send(embed=embed, view=view)
         
@@ -1600,117 +1794,129 @@ async def setup_marchand(ctx):
         await ctx.send("❌ Une erreur s'est produite !")
         await envoyer_log(f"Erreur !setup_marchand: {e}", "ERROR")
 
+def construire_aide(jeu):
+    """Embed de l'aide"""
+    embed = discord.Embed(
+        title="🌙 Le Marchand de Sable - Aide",
+        color=discord.Color.purple(),
+        description="Guide complet du jeu"
+    )
+    
+    embed.add_field(
+        name="📚 Commandes principales",
+        value="`!sable` - Affiche votre sable rapidement\n"
+              "`!info` - Voir votre profil détaillé\n"
+              "`!info @membre` - Voir le profil d'un autre joueur\n"
+              "`!classe <nom>` - Choisir votre classe\n"
+              "`!retirer_classe` - Retirer votre classe (arrête les gains)\n"
+              "`!boutique <armes/armures>` - Voir les équipements\n"
+              "`!acheter <arme/armure> <numéro>` - Acheter un équipement\n"
+              "`!classement` - Voir le top 5 des plus puissants\n"
+              "`!rang [puissance/sable/niveau/prestige/streak]` - Voir votre rang",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🏆 Progression et Statistiques",
+        value="`!achievements` - Voir vos badges et achievements\n"
+              "`!stats` - Voir les statistiques du serveur\n"
+              "`!niveaux` - Comprendre le système de niveaux infini",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="✨ Prestige et Récompenses",
+        value="`!daily` - Recevoir le bonus quotidien de sable (Streak system)\n"
+              "`!prestige` - Passer un prestige quand vous atteignez niveau 100\n"
+              "Niveau requis pour prestige: **100**",
+        inline=False
+    )
+    embed.add_field(
+        name="💰 Comment gagner du sable",
+        value=f"**⚠️ Vous devez d'abord choisir une classe avec `!classe`**\n\n"
+              f"• Envoyer un message: +{SABLE_PAR_MESSAGE} ⏳\n"
+              f"• Booster le serveur: +{SABLE_BOOST_SERVEUR} ⏳",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🎮 Classes disponibles",
+        value=f"{jeu.classes['chevalier']['emoji']} **Chevalier** - {jeu.classes['chevalier']['description']}\n"
+              f"{jeu.classes['samourai']['emoji']} **Samouraï** - {jeu.classes['samourai']['description']}\n"
+              f"{jeu.classes['mage']['emoji']} **Mage** - {jeu.classes['mage']['description']}",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🎭 Rôles automatiques",
+        value="Quand vous choisissez une classe, un rôle Discord est assigné automatiquement !",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="⭐ Système de niveaux infini",
+        value="Plus votre puissance augmente, plus votre niveau monte ! Débloquez de nouveaux équipements toujours plus puissants.\nTapez `!niveaux` pour plus de détails.",
+        inline=False
+    )
+    return embed
+
 @bot.command(name='aide')
+@limite_debit(capacite=1, periode=5)
 async def afficher_aide(ctx):
     """Affiche l'aide du jeu"""
     try:
-        embed = discord.Embed(
-            title="🌙 Le Marchand de Sable - Aide",
-            color=discord.Color.purple(),
-            description="Guide complet du jeu"
-        )
-        
-        embed.add_field(
-            name="📚 Commandes principales",
-            value="`!sable` - Affiche votre sable rapidement\n"
-                  "`!info` - Voir votre profil détaillé\n"
-                  "`!info @membre` - Voir le profil d'un autre joueur\n"
-                  "`!classe <nom>` - Choisir votre classe\n"
-                  "`!retirer_classe` - Retirer votre classe (arrête les gains)\n"
-                  "`!boutique <armes/armures>` - Voir les équipements\n"
-                  "`!acheter <arme/armure> <numéro>` - Acheter un équipement\n"
-                  "`!classement` - Voir le top 5 des plus puissants",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🏆 Progression et Statistiques",
-            value="`!achievements` - Voir vos badges et achievements\n"
-                  "`!stats` - Voir les statistiques du serveur\n"
-                  "`!niveaux` - Comprendre le système de niveaux infini",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="✨ Prestige et Récompenses",
-            value="`!daily` - Recevoir le bonus quotidien de sable (Streak system)\n"
-                  "`!prestige` - Passer un prestige quand vous atteignez niveau 100\n"
-                  "Niveau requis pour prestige: **100**",
-            inline=False
-        )
-        embed.add_field(
-            name="💰 Comment gagner du sable",
-            value=f"**⚠️ Vous devez d'abord choisir une classe avec `!classe`**\n\n"
-                  f"• Envoyer un message: +{SABLE_PAR_MESSAGE} ⏳\n"
-                  f"• Booster le serveur: +{SABLE_BOOST_SERVEUR} ⏳",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🎮 Classes disponibles",
-            value=f"{CLASSES['chevalier']['emoji']} **Chevalier** - {CLASSES['chevalier']['description']}\n"
-                  f"{CLASSES['samourai']['emoji']} **Samouraï** - {CLASSES['samourai']['description']}\n"
-                  f"{CLASSES['mage']['emoji']} **Mage** - {CLASSES['mage']['description']}",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🎭 Rôles automatiques",
-            value="Quand vous choisissez une classe, un rôle Discord est assigné automatiquement !",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="⭐ Système de niveaux infini",
-            value="Plus votre puissance augmente, plus votre niveau monte ! Débloquez de nouveaux équipements toujours plus puissants.\nTapez `!niveaux` pour plus de détails.",
-            inline=False
-        )
-        
+        embed = embed_en_cache(('aide',), construire_aide)
         await ctx.send(embed=embed)
     except Exception as e:
         logger.error(f"Erreur dans !aide: {e}")
         await ctx.send("❌ Une erreur s'est produite !")
 
+def construire_niveaux(jeu):
+    """Embed du système de niveaux"""
+    embed = discord.Embed(
+        title="⭐ Système de Niveaux Infini",
+        color=discord.Color.gold(),
+        description="Progression sans fin avec déblocage d'équipements progressifs"
+    )
+    
+    embed.add_field(
+        name="📈 Comment ça marche ?",
+        value="Chaque équipement augmente votre **puissance** ⚡. "
+              "À chaque palier de puissance atteint, votre **niveau** ⭐ augmente et de nouveaux équipements se débloquent !",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🔓 Déblocage d'équipements",
+        value="• **Niveau 1**: Débuts\n"
+              "• **Niveau 2**: Équipements avancés (Puissance: 50+)\n"
+              "• **Niveau 5**: Équipements légendaires (Puissance: 300+)\n"
+              "• **Niveau 10**: Équipements anciens (Puissance: 2,000+)\n"
+              "• **Niveau 20+**: Équipements suprêmes (Puissance: 100,000+)\n"
+              "• **Et bien d'autres...**",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="💡 Progression",
+        value="Votre progression est **illimitée** ! Continuez à acheter des équipements de plus en plus puissants et vous débloquerez des niveaux de plus en plus élevés.",
+        inline=False
+    )
+    return embed
+
 @bot.command(name='niveaux')
+@limite_debit(capacite=1, periode=5)
 async def afficher_niveaux(ctx):
     """Affiche le système de niveaux"""
     try:
-        embed = discord.Embed(
-            title="⭐ Système de Niveaux Infini",
-            color=discord.Color.gold(),
-            description="Progression sans fin avec déblocage d'équipements progressifs"
-        )
-        
-        embed.add_field(
-            name="📈 Comment ça marche ?",
-            value="Chaque équipement augmente votre **puissance** ⚡. "
-                  "À chaque palier de puissance atteint, votre **niveau** ⭐ augmente et de nouveaux équipements se débloquent !",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🔓 Déblocage d'équipements",
-            value="• **Niveau 1**: Débuts\n"
-                  "• **Niveau 2**: Équipements avancés (Puissance: 50+)\n"
-                  "• **Niveau 5**: Équipements légendaires (Puissance: 300+)\n"
-                  "• **Niveau 10**: Équipements anciens (Puissance: 2,000+)\n"
-                  "• **Niveau 20+**: Équipements suprêmes (Puissance: 100,000+)\n"
-                  "• **Et bien d'autres...**",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="💡 Progression",
-            value="Votre progression est **illimitée** ! Continuez à acheter des équipements de plus en plus puissants et vous débloquerez des niveaux de plus en plus élevés.",
-            inline=False
-        )
-        
+        embed = embed_en_cache(('niveaux',), construire_niveaux)
         await ctx.send(embed=embed)
     except Exception as e:
         logger.error(f"Erreur dans !niveaux: {e}")
         await ctx.send("❌ Une erreur s'est produite !")
 
 @bot.command(name='achievements')
+@limite_debit(capacite=2, periode=5)
 async def afficher_achievements(ctx, utilisateur: discord.User | None = None):
     """Affiche les achievements du joueur"""
     try:
@@ -1721,27 +1927,22 @@ async def afficher_achievements(ctx, utilisateur: discord.User | None = None):
             await ctx.send("❌ Impossible de trouver l'utilisateur !")
             return
         
-        joueur = obtenir_joueur(utilisateur.id)
+        joueur = voir_joueur(utilisateur.id)
         if not joueur:
             await ctx.send("❌ Ce joueur n'a pas encore de profil !")
             return
         
-        # Vérifier et mettre à jour les achievements actuels
-        achievements_gagnes = verifier_achievements(joueur)
-        for ach_id in achievements_gagnes:
-            ajouter_achievement(joueur, ach_id)
-        sauvegarder_joueur(utilisateur.id, joueur)
+        # Achievements mérités mais pas encore journalisés: affichés sans être sauvegardés
+        achievements_list = joueur['achievements'] + verifier_achievements(joueur)
         
         pseudo = obtenir_pseudo_serveur(utilisateur)
         embed = discord.Embed(
             title=f"🏆 Achievements de {pseudo}",
             color=discord.Color.gold(),
-            description=f"Total: {len(joueur.get('achievements', []))} / {len(ACHIEVEMENTS)}"
+            description=f"Total: {len(achievements_list)} / {len(contenu().achievements)}"
         )
         
-        achievements_list = joueur.get('achievements', [])
-        
-        for ach_id, ach_data in ACHIEVEMENTS.items():
+        for ach_id, ach_data in contenu().achievements.items():
             if ach_id in achievements_list:
                 status = "✅"
                 value = f"Débloqué ! {ach_data['description']}"
@@ -1762,43 +1963,32 @@ async def afficher_achievements(ctx, utilisateur: discord.User | None = None):
         await envoyer_log(f"Erreur !achievements: {e}", "ERROR")
 
 @bot.command(name='stats')
+@limite_debit(capacite=1, periode=10, cout=5)
 async def afficher_stats(ctx):
     """Affiche les statistiques du serveur"""
     try:
-        joueurs = charger_joueurs()
+        stats = statistiques_serveur.resume()
         
-        if not joueurs:
+        if not stats['total_joueurs']:
             await ctx.send("❌ Aucune donnée de joueur disponible !")
             return
         
-        total_joueurs = len(joueurs)
-        total_sable = sum(j.get('sable', 0) for j in joueurs.values())
-        total_puissance = sum(j.get('puissance', 0) for j in joueurs.values())
-        total_messages = sum(j.get('messages_envoyes', 0) for j in joueurs.values())
-        total_vocal = sum(j.get('temps_vocal_minutes', 0) for j in joueurs.values())
-        
-        # Calculer les niveaux et moyenne
-        niveaux = [j.get('niveau', 1) for j in joueurs.values()]
-        niveau_moyen = sum(niveaux) / len(niveaux) if niveaux else 0
+        total_joueurs = stats['total_joueurs']
+        total_sable = stats['total_sable']
+        total_puissance = stats['total_puissance']
+        total_messages = stats['total_messages']
+        total_vocal = stats['total_vocal']
+        niveau_moyen = stats['niveau_moyen']
         
         # Classe la plus populaire
-        classes_count = {}
-        for j in joueurs.values():
-            classe = j.get('classe')
-            if classe:
-                classes_count[classe] = classes_count.get(classe, 0) + 1
-        
+        classes_count = stats['classes']
         classe_populaire = "Aucune" if not classes_count else max(classes_count, key=lambda x: classes_count[x])
         
-        # Joueur plus riche
-        joueur_plus_riche = max(joueurs.values(), key=lambda j: j.get('sable', 0))
-        pseudo_riche = joueur_plus_riche.get('username', 'Inconnu')
-        sable_max = joueur_plus_riche.get('sable', 0)
-        
-        # Joueur le plus puissant
-        joueur_plus_puissant = max(joueurs.values(), key=lambda j: j.get('puissance', 0))
-        pseudo_puissant = joueur_plus_puissant.get('username', 'Inconnu')
-        puissance_max = joueur_plus_puissant.get('puissance', 0)
+        # Joueur plus riche et joueur le plus puissant
+        id_riche, sable_max = stats['plus_riche']
+        id_puissant, puissance_max = stats['plus_puissant']
+        pseudo_riche = (magasin_joueurs.consulter(id_riche) or {}).get('username', 'Inconnu')
+        pseudo_puissant = (magasin_joueurs.consulter(id_puissant) or {}).get('username', 'Inconnu')
         
         embed = discord.Embed(
             title="📊 Statistiques du Serveur",
@@ -1818,12 +2008,24 @@ async def afficher_stats(ctx):
             inline=True
         )
         
+        embed.add_field(
+            name="📐 Niveau Médian",
+            value=f"**{stats['niveau_median']}**",
+            inline=True
+        )
+        
         embed.add_field(
             name="💰 Sable Total",
             value=f"**{total_sable:,}** ⏳",
             inline=True
         )
         
+        embed.add_field(
+            name="⏳ Sable Médian / Top 10%",
+            value=f"**{stats['sable_median']:,}** / **{stats['sable_p90']:,}**",
+            inline=True
+        )
+        
         embed.add_field(
             name="⚡ Puissance Totale",
             value=f"**{total_puissance:,}**",
@@ -1842,6 +2044,16 @@ async def afficher_stats(ctx):
             inline=True
         )
         
+        sable_par_classe = vue_colonnes.par_classe('sable')
+        embed.add_field(
+            name="🎭 Sable Moyen par Classe",
+            value="\n".join(
+                f"{classe.capitalize()}: {somme // nombre:,} ⏳ ({nombre} joueurs)"
+                for classe, (nombre, somme) in sable_par_classe.items() if classe
+            ) or "Aucune classe choisie",
+            inline=False
+        )
+        
         embed.add_field(
             name="🎤 Temps Vocal",
             value=f"**{total_vocal:,}** minutes",
@@ -1867,6 +2079,7 @@ async def afficher_stats(ctx):
         await envoyer_log(f"Erreur !stats: {e}", "ERROR")
 
 @bot.command(name='daily')
+@limite_debit(capacite=1, periode=5)
 async def daily_login(ctx):
     """Réclamez votre bonus quotidien"""
     try:
@@ -1881,8 +2094,6 @@ async def daily_login(ctx):
             await ctx.send(f"❌ Vous avez déjà reçu votre bonus aujourd'hui !\nRevenez demain (Streak: {streak} 🔥)")
             return
         
-        sauvegarder_joueur(ctx.author.id, joueur)
-        
         embed = discord.Embed(
             title="✅ Daily Login Bonus",
             color=discord.Color.gold(),
@@ -1913,6 +2124,7 @@ async def daily_login(ctx):
         await envoyer_log(f"Erreur !daily: {e}", "ERROR")
 
 @bot.command(name='prestige')
+@limite_debit(capacite=1, periode=10)
 async def faire_prestige(ctx):
     """Faire un prestige (reset à niveau 1 + bonus)"""
     try:
@@ -1929,7 +2141,6 @@ async def faire_prestige(ctx):
         ancien_prestige = joueur.get('prestige', 0)
         
         passer_prestige(joueur)
-        sauvegarder_joueur(ctx.author.id, joueur)
         
         pseudo = obtenir_pseudo_serveur(ctx.author)
         embed = discord.Embed(
@@ -1973,11 +2184,184 @@ async def faire_prestige(ctx):
         await ctx.send("❌ Une erreur s'est produite !")
         await envoyer_log(f"Erreur !prestige: {e}", "ERROR")
 
+@bot.command(name='equilibrage')
+async def afficher_equilibrage(ctx):
+    """Répartition de l'économie par classe et par niveau (fondateur seulement)"""
+    try:
+        if ctx.author.id != FONDATEUR_ID:
+            await ctx.send("❌ Vous n'avez pas la permission d'utiliser cette commande !")
+            return
+        
+        if not len(vue_colonnes):
+            await ctx.send("❌ Aucune donnée de joueur disponible !")
+            return
+        
+        embed = discord.Embed(
+            title="⚖️ Équilibrage",
+            color=discord.Color.dark_grey(),
+            description=f"{len(vue_colonnes)} joueurs cette saison"
+        )
+        
+        sable = vue_colonnes.par_classe('sable')
+        puissance = vue_colonnes.par_classe('puissance')
+        lignes = []
+        for classe, (nombre, total_sable) in sable.items():
+            nom = classe.capitalize() if classe else "Sans classe"
+            lignes.append(f"{nom}: {nombre} joueurs, {total_sable // nombre:,} ⏳ / {puissance[classe][1] // nombre:,} ⚡ en moyenne")
+        embed.add_field(name="🎭 Par classe", value="\n".join(lignes), inline=False)
+        
+        niveaux = vue_colonnes.histogramme('niveau', largeur=10)
+        embed.add_field(
+            name="📊 Niveaux",
+            value="\n".join(f"{borne}-{borne + 9}: {nombre}" for borne, nombre in niveaux.items()),
+            inline=True
+        )
+        
+        prestiges = vue_colonnes.histogramme('prestige')
+        embed.add_field(
+            name="✨ Prestiges",
+            value="\n".join(f"{prestige}: {nombre}" for prestige, nombre in prestiges.items()),
+            inline=True
+        )
+        
+        riches = vue_colonnes.top('sable', 3)
+        pseudos = await cache_noms.resoudre(
+            ctx.guild,
+            [user_id for user_id, _ in riches],
+            {user_id: (magasin_joueurs.consulter(user_id) or {}).get('username', 'Inconnu') for user_id, _ in riches}
+        )
+        embed.add_field(
+            name="💎 Plus riches",
+            value="\n".join(f"{pseudos[user_id]} - {valeur:,} ⏳" for user_id, valeur in riches),
+            inline=False
+        )
+        
+        await ctx.send(embed=embed)
+    except Exception as e:
+        logger.error(f"Erreur dans !equilibrage: {e}")
+        await ctx.send("❌ Une erreur s'est produite !")
+
+@bot.command(name='recharger')
+async def recharger_contenu(ctx):
+    """Recharge classes, équipements et achievements sans redémarrer (fondateur seulement)"""
+    global contenu_jeu
+    try:
+        if ctx.author.id != FONDATEUR_ID:
+            await ctx.send("❌ Vous n'avez pas la permission d'utiliser cette commande !")
+            return
+        
+        ancien = contenu_jeu
+        try:
+            # Lecture et compilation hors de la boucle asyncio
+            nouveau = await persistance.executer(charger_contenu, CONTENU_FILE)
+            verifier_compatibilite(ancien, nouveau)
+        except (OSError, ValueError) as e:
+            await ctx.send(f"❌ Contenu refusé, la version {ancien.version} reste active:\n`{e}`")
+            return
+        
+        # Remplacement atomique: les commandes en cours gardent l'ancienne version
+        contenu_jeu = nouveau
+        cache_embeds.invalider(nouveau.version)
+        registre_achievements.enregistrer(nouveau.achievements)
+        
+        await ctx.send(f"✅ Contenu rechargé: version {ancien.version} → {nouveau.version} "
+                       f"({len(nouveau.classes)} classes, {len(nouveau.catalogue.par_id)} équipements, "
+                       f"{len(nouveau.achievements)} achievements)")
+        await envoyer_log(f"Contenu rechargé: version {ancien.version} → {nouveau.version}", "SETUP")
+    except Exception as e:
+        logger.error(f"Erreur dans !recharger: {e}")
+        await ctx.send("❌ Une erreur s'est produite !")
+        await envoyer_log(f"Erreur !recharger: {e}", "ERROR")
+
+@bot.command(name='perf')
+async def afficher_perf(ctx):
+    """Affiche les compteurs internes du bot (fondateur seulement)"""
+    try:
+        if ctx.author.id != FONDATEUR_ID:
+            await ctx.send("❌ Vous n'avez pas la permission d'utiliser cette commande !")
+            return
+        
+        embed = discord.Embed(
+            title="⚙️ Compteurs internes",
+            color=discord.Color.dark_grey()
+        )
+        
+        recompenses = accumulateur_recompenses.compteurs()
+        embed.add_field(
+            name="💬 Gains de messages",
+            value=f"Messages reçus: {recompenses['evenements']}\n"
+                  f"Gains absorbés: {recompenses['absorbes']}\n"
+                  f"Écritures: {recompenses['ecritures']} ({recompenses['lots']} lots)\n"
+                  f"En attente: {recompenses['en_attente']} joueurs",
+            inline=False
+        )
+        
+        logs = expediteur_logs.compteurs()
+        embed.add_field(
+            name="📜 Logs Discord",
+            value=f"En file: {logs['en_file']}\n"
+                  f"Lignes envoyées: {logs['envoyes']} en {logs['messages']} messages\n"
+                  f"Ignorés (en attente de résumé): {logs['ignores']}",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="⏱️ Limitation de débit",
+            value=f"Seaux de débit actifs: {len(limiteur)}\n"
+                  f"Acceptées/rejetées: {limiteur.acceptes}/{limiteur.rejets}\n"
+                  f"Commandes récentes: {len(last_command)}",
+            inline=False
+        )
+        
+        envois = planificateur_envois.compteurs()
+        embed.add_field(
+            name="📨 Planificateur d'envois",
+            value=f"En file: {envois['en_file']}\n"
+                  f"Interactifs/normaux/fond: {envois['interactifs']}/{envois['normaux']}/{envois['fond']}\n"
+                  f"Rate limits (429): {envois['rate_limits']} ({envois['routes_bloquees']} routes en pause)",
+            inline=False
+        )
+        
+        gabarits = cache_embeds.compteurs()
+        embed.add_field(
+            name="🧩 Embeds en cache",
+            value=f"Contenu: version {gabarits['version']} ({gabarits['entrees']} embeds)\n"
+                  f"Réutilisés/construits: {gabarits['succes']}/{gabarits['constructions']}",
+            inline=False
+        )
+        
+        ecritures = magasin_joueurs.ecritures_par_source + magasin_tickets.ecritures_par_source
+        lignes = []
+        for source, nb in ecritures.most_common(8):
+            appels = invocations_commandes.get(source.lstrip('!'))
+            lignes.append(f"{source}: {nb}" + (f" ({nb / appels:.2f}/appel)" if source.startswith('!') and appels else ""))
+        embed.add_field(
+            name="💾 Écritures par origine",
+            value="\n".join(lignes) or "Aucune écriture",
+            inline=False
+        )
+        
+        noms = cache_noms.compteurs()
+        embed.add_field(
+            name="👥 Cache des pseudos",
+            value=f"Entrées: {noms['entrees']}\n"
+                  f"Succès/échecs: {noms['succes']}/{noms['echecs']}\n"
+                  f"Requêtes fetch_member: {noms['requetes']}",
+            inline=False
+        )
+        
+        await ctx.send(embed=embed)
+    except Exception as e:
+        logger.error(f"Erreur dans !perf: {e}")
+        await ctx.send("❌ Une erreur s'est produite !")
+
 @bot.event
 async def on_command_error(ctx, error):
     """Gère les erreurs de commandes"""
     try:
-        if isinstance(error, commands.CommandNotFound):
+        if isinstance(error, DebitDepasse):
+            await ctx.send("⏱️ Attendez un peu avant de relancer cette commande !")
+        elif isinstance(error, commands.CommandNotFound):
             await ctx.send("❌ Commande non trouvée ! Tapez `!aide` pour voir toutes les commandes.")
         elif isinstance(error, commands.MissingRequiredArgument):
             await ctx.send(f"❌ Arguments manquants ! Tapez `!aide` pour la syntaxe correcte.")
@@ -1996,4 +2380,24 @@ if __name__ == "__main__":
         print("❌ ERREUR: Token Discord non trouvé dans .env")
         exit(1)
     
-    bot.run(DISCORD_TOKEN)
+    magasin_joueurs.saison = etat_bot.obtenir('saison', 0)
+    magasin_joueurs.charger()
+    if magasin_joueurs.migration and magasin_joueurs.migration[0]:
+        migres, secondes = magasin_joueurs.migration
+        print(f"🧬 {migres} profils migrés vers le schéma v{migrations_profils.version} "
+              f"en {secondes:.2f}s ({migres / max(secondes, 1e-6):,.0f} profils/s)")
+    
+    # Courbe de niveaux modifiée depuis le dernier démarrage: recalcul en un lot
+    courbe = etat_bot.obtenir('courbe_niveaux')
+    if courbe is not None and courbe != table_niveaux.signature():
+        print(f"📈 Courbe de niveaux modifiée: {recalculer_niveaux()} profils mis à jour")
+    if courbe != table_niveaux.signature():
+        etat_bot.definir('courbe_niveaux', table_niveaux.signature())
+    try:
+        bot.run(DISCORD_TOKEN)
+    finally:
+        # Dernière écriture des profils en attente à l'arrêt
+        accumulateur_recompenses.vider(crediter_messages)
+        persistance.fermer()
+        magasin_joueurs.synchroniser_journal()
+        magasin_joueurs.vider()
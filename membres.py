@@ -0,0 +1,91 @@
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def pseudo_membre(member):
+    """Pseudo du serveur (nickname) ou nom d'utilisateur"""
+    return getattr(member, 'nick', None) or member.name
+
+
+class CacheNoms:
+    """Cache des pseudos par serveur, alimenté par la gateway et rafraîchi après un TTL"""
+    def __init__(self, ttl=600, requetes_simultanees=5):
+        self.ttl = ttl
+        self.requetes_simultanees = requetes_simultanees  # fetch_member lancés en parallèle
+        self.noms = {}  # (guild_id, user_id) -> (pseudo, expiration)
+        self.succes = 0
+        self.echecs = 0
+        self.requetes = 0
+
+    def memoriser(self, guild_id, user_id, pseudo):
+        self.noms[(int(guild_id), int(user_id))] = (pseudo, time.monotonic() + self.ttl)
+
+    def memoriser_membre(self, member):
+        """Mémorise le pseudo d'un membre et le retourne"""
+        pseudo = pseudo_membre(member)
+        guild = getattr(member, 'guild', None)
+        if guild is not None:
+            self.memoriser(guild.id, member.id, pseudo)
+        return pseudo
+
+    def oublier(self, guild_id, user_id):
+        self.noms.pop((int(guild_id), int(user_id)), None)
+
+    def obtenir(self, guild_id, user_id):
+        """Pseudo en cache, None s'il est absent ou expiré"""
+        cle = (int(guild_id), int(user_id))
+        entree = self.noms.get(cle)
+        if entree is None:
+            self.echecs += 1
+            return None
+        if entree[1] < time.monotonic():
+            del self.noms[cle]
+            self.echecs += 1
+            return None
+        self.succes += 1
+        return entree[0]
+
+    async def resoudre(self, guild, user_ids, defauts=None):
+        """Retourne {user_id: pseudo}; les inconnus sont récupérés en parallèle par lots"""
+        defauts = defauts or {}
+        pseudos = {}
+        manquants = []
+        for user_id in user_ids:
+            pseudo = self.obtenir(guild.id, user_id)
+            if pseudo is None:
+                # Cache membres de la gateway: aucune requête HTTP
+                member = guild.get_member(int(user_id))
+                if member is not None:
+                    pseudo = self.memoriser_membre(member)
+            if pseudo is None:
+                manquants.append(user_id)
+            else:
+                pseudos[user_id] = pseudo
+
+        if manquants:
+            semaphore = asyncio.Semaphore(self.requetes_simultanees)
+
+            async def recuperer(user_id):
+                async with semaphore:
+                    self.requetes += 1
+                    try:
+                        return self.memoriser_membre(await guild.fetch_member(int(user_id)))
+                    except Exception as e:
+                        logger.debug(f"Membre {user_id} introuvable: {e}")
+                        return None
+
+            resultats = await asyncio.gather(*(recuperer(user_id) for user_id in manquants))
+            for user_id, pseudo in zip(manquants, resultats):
+                pseudos[user_id] = pseudo or defauts.get(user_id, 'Inconnu')
+        return pseudos
+
+    def compteurs(self):
+        return {
+            'entrees': len(self.noms),
+            'succes': self.succes,
+            'echecs': self.echecs,
+            'requetes': self.requetes,
+        }
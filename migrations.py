@@ -0,0 +1,69 @@
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHAMP_VERSION = 'schema_version'
+
+
+class MigrationsProfils:
+    """Migrations de schéma ordonnées, appliquées une seule fois à chaque profil (au chargement)"""
+    def __init__(self):
+        self.etapes = []  # (version atteinte, fonction(profil) qui modifie le profil sur place)
+        self.duree_flux = 0.0  # Secondes passées à migrer pendant le dernier migrer_flux
+
+    @property
+    def version(self):
+        """Version du schéma des profils à jour"""
+        return self.etapes[-1][0] if self.etapes else 0
+
+    def etape(self, version):
+        """Décorateur qui enregistre la migration vers `version` (versions consécutives)"""
+        def enregistrer(fonction):
+            if version != self.version + 1:
+                raise ValueError(f"Migration v{version} hors séquence (dernière: v{self.version})")
+            self.etapes.append((version, fonction))
+            return fonction
+        return enregistrer
+
+    def a_jour(self, profil):
+        return profil.get(CHAMP_VERSION, 0) >= self.version
+
+    def migrer(self, profil):
+        """Applique sur place les étapes manquantes; retourne True si le profil a changé"""
+        version = profil.get(CHAMP_VERSION, 0)
+        if version >= self.version:
+            return False
+        for version_etape, fonction in self.etapes:
+            if version_etape > version:
+                fonction(profil)
+                profil[CHAMP_VERSION] = version_etape
+        return True
+
+    def _migrer_un(self, user_id, profil, migres):
+        try:
+            if self.migrer(profil):
+                migres.append(user_id)
+        except Exception as e:
+            logger.error(f"Erreur de migration du profil {user_id}: {e}")
+
+    def migrer_tous(self, profils):
+        """Migre les profils sur place (aucune copie); retourne les ids migrés et la durée"""
+        debut = time.perf_counter()
+        migres = []
+        for user_id, profil in profils.items():
+            self._migrer_un(user_id, profil, migres)
+        return migres, time.perf_counter() - debut
+
+    def migrer_flux(self, profils, migres, exclus=()):
+        """Migre chaque (user_id, profil) au passage, pendant la lecture du stockage
+
+        Les ids migrés sont ajoutés à `migres`; ceux de `exclus` passent sans être migrés.
+        """
+        self.duree_flux = 0.0
+        for user_id, profil in profils:
+            if user_id not in exclus:
+                debut = time.perf_counter()
+                self._migrer_un(user_id, profil, migres)
+                self.duree_flux += time.perf_counter() - debut
+            yield user_id, profil
@@ -0,0 +1,287 @@
+import sys
+from datetime import datetime, timedelta
+from collections.abc import MutableMapping
+
+EPOQUE = datetime(1970, 1, 1)
+MICROSECONDE = timedelta(microseconds=1)
+
+# Valeur qu'un codec ne sait pas encoder sans perte: gardée telle quelle
+BRUT = object()
+
+
+class RegistreBits:
+    """Attribue à chaque identifiant (ex: achievement) un bit stable pour la durée du processus"""
+    def __init__(self):
+        self.bits = {}  # identifiant -> numéro de bit
+        self.identifiants = []  # numéro de bit -> identifiant
+
+    def enregistrer(self, identifiants):
+        """Réserve les bits dans l'ordre donné (ex: ordre de définition du contenu)"""
+        for identifiant in identifiants:
+            self.bit(identifiant)
+
+    def bit(self, identifiant):
+        bit = self.bits.get(identifiant)
+        if bit is None:
+            bit = self.bits[identifiant] = len(self.identifiants)
+            self.identifiants.append(sys.intern(identifiant))
+        return bit
+
+    def encoder(self, identifiants):
+        """Bitset des identifiants, ou BRUT si la liste n'est pas dans l'ordre des bits (perte d'ordre)"""
+        masque = 0
+        precedent = -1
+        for identifiant in identifiants:
+            if not isinstance(identifiant, str):
+                return BRUT
+            bit = self.bit(identifiant)
+            if bit <= precedent:
+                return BRUT
+            masque |= 1 << bit
+            precedent = bit
+        return masque
+
+    def decoder(self, masque):
+        identifiants = []
+        bit = 0
+        while masque:
+            if masque & 1:
+                identifiants.append(self.identifiants[bit])
+            masque >>= 1
+            bit += 1
+        return identifiants
+
+
+registre_achievements = RegistreBits()
+
+
+def encoder_id(valeur):
+    if isinstance(valeur, str) and valeur.isdigit() and str(int(valeur)) == valeur:
+        return int(valeur)
+    return BRUT
+
+
+def decoder_date(valeur):
+    return None if valeur is None else (EPOQUE + valeur * MICROSECONDE).isoformat()
+
+
+def encoder_date(valeur):
+    """Date ISO -> microsecondes depuis l'époque (seulement si la conversion inverse redonne la même chaîne)"""
+    if valeur is None:
+        return None
+    if isinstance(valeur, str):
+        try:
+            microsecondes = (datetime.fromisoformat(valeur) - EPOQUE) // MICROSECONDE
+        except (ValueError, TypeError):
+            return BRUT
+        if decoder_date(microsecondes) == valeur:
+            return microsecondes
+    return BRUT
+
+
+def _encoder_classe(valeur):
+    return sys.intern(valeur) if isinstance(valeur, str) else valeur
+
+
+def _encoder_achievements(valeur):
+    return registre_achievements.encoder(valeur) if isinstance(valeur, list) else BRUT
+
+
+# Champ -> (encodage vers la forme compacte, décodage vers la forme JSON)
+CODECS = {
+    'id': (encoder_id, str),
+    'classe': (_encoder_classe, None),
+    'date_creation': (encoder_date, decoder_date),
+    'dernier_daily': (encoder_date, decoder_date),
+    'achievements': (_encoder_achievements, registre_achievements.decoder),
+}
+
+CHAMPS = ('id', 'username', 'sable', 'classe', 'arme', 'armure', 'puissance', 'niveau',
+          'date_creation', 'dernier_gain_message', 'achievements', 'messages_envoyes',
+          'sable_depense', 'boosts', 'equipment_count', 'prestige', 'dernier_daily',
+          'streak_daily', 'saison', 'schema_version', 'journal_seq', 'temps_vocal_minutes',
+          'dernier_gain_vocal')
+_CHAMPS = frozenset(CHAMPS)
+
+ABSENT = object()  # Slot non rempli
+
+# Tables dérivées des codecs pour les conversions en bloc (sans passer par __getitem__/__setitem__)
+_ENCODEURS = {champ: CODECS[champ][0] if champ in CODECS else None for champ in CHAMPS}
+_DECODEURS = tuple((champ, CODECS[champ][1] if champ in CODECS else None) for champ in CHAMPS)
+
+
+class ProfilCompact(MutableMapping):
+    """Profil à slots, lu et modifié comme le dict JSON d'origine
+
+    Les champs connus sont stockés sous forme compacte (id entier, classe internée,
+    dates en microsecondes, achievements en bitset); une valeur qui ne peut pas être
+    encodée sans perte, ou un champ inconnu, est gardée telle quelle dans `_extra`.
+    Les listes retournées sont des copies: réassigner le champ pour le modifier.
+    """
+    __slots__ = CHAMPS + ('_extra',)
+
+    def __init__(self, donnees=()):
+        self._extra = None
+        self.update(donnees)
+
+    @classmethod
+    def depuis_dict(cls, donnees):
+        """Profil compact depuis sa forme JSON (retourné tel quel s'il est déjà compact)"""
+        if isinstance(donnees, cls):
+            return donnees
+        profil = cls.__new__(cls)
+        extra = None
+        for cle, valeur in donnees.items():
+            if cle in _ENCODEURS:
+                encodeur = _ENCODEURS[cle]
+                encodee = encodeur(valeur) if encodeur else valeur
+                if encodee is not BRUT:
+                    setattr(profil, cle, encodee)
+                    continue
+            if extra is None:
+                extra = {}
+            extra[cle] = valeur
+        profil._extra = extra
+        return profil
+
+    @classmethod
+    def depuis_forme_compacte(cls, champs, valeurs):
+        """Profil construit depuis des valeurs déjà encodées (ex: instantané binaire), sans conversion"""
+        profil = cls.__new__(cls)
+        profil._extra = None
+        for champ, valeur in zip(champs, valeurs):
+            setattr(profil, champ, valeur)
+        return profil
+
+    def en_dict(self):
+        """Forme JSON du profil (lecture directe des slots, ex: pour la sérialiser)"""
+        donnees = {}
+        for champ, decodeur in _DECODEURS:
+            valeur = getattr(self, champ, ABSENT)
+            if valeur is not ABSENT:
+                donnees[champ] = decodeur(valeur) if decodeur else valeur
+        if self._extra is not None:
+            donnees.update(self._extra)
+        return donnees
+
+    def __getitem__(self, cle):
+        if cle in _CHAMPS:
+            try:
+                valeur = getattr(self, cle)
+            except AttributeError:
+                pass
+            else:
+                codec = CODECS.get(cle)
+                return codec[1](valeur) if codec and codec[1] else valeur
+        if self._extra is not None and cle in self._extra:
+            return self._extra[cle]
+        raise KeyError(cle)
+
+    def __setitem__(self, cle, valeur):
+        if cle in _CHAMPS:
+            codec = CODECS.get(cle)
+            encodee = codec[0](valeur) if codec else valeur
+            if encodee is not BRUT:
+                setattr(self, cle, encodee)
+                if self._extra is not None:
+                    self._retirer_extra(cle)
+                return
+            if hasattr(self, cle):
+                delattr(self, cle)
+        if self._extra is None:
+            self._extra = {}
+        self._extra[cle] = valeur
+
+    def _retirer_extra(self, cle):
+        self._extra.pop(cle, None)
+        if not self._extra:
+            self._extra = None
+
+    def __delitem__(self, cle):
+        if cle in _CHAMPS and hasattr(self, cle):
+            delattr(self, cle)
+        elif self._extra is None or cle not in self._extra:
+            raise KeyError(cle)
+        else:
+            del self._extra[cle]
+            if not self._extra:
+                self._extra = None
+
+    def __iter__(self):
+        for cle in CHAMPS:
+            if hasattr(self, cle):
+                yield cle
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"ProfilCompact({self.en_dict()!r})"
+
+
+ACHIEVEMENTS_EXEMPLE = ('first_steps', 'collector', 'spender', 'wealthy', 'powerful',
+                        'legendary', 'talker', 'boost_champion', 'elite_collector')
+
+
+def profils_exemple(nombre, graine=17):
+    """Profils réalistes générés pour les mesures (mémoire, formats de fichier)"""
+    import random
+    aleatoire = random.Random(graine)
+    maintenant = datetime.now()
+    profils = {}
+    for i in range(nombre):
+        user_id = str(100000000000000000 + i * 7919)
+        profils[user_id] = {
+            'id': user_id,
+            'username': f"joueur{i}",
+            'sable': aleatoire.randint(0, 50000),
+            'classe': aleatoire.choice(['chevalier', 'samourai', 'mage']),
+            'arme': aleatoire.choice([None, 101, 201, 301]),
+            'armure': aleatoire.choice([None, 151, 251, 351]),
+            'puissance': aleatoire.randint(0, 5000),
+            'niveau': aleatoire.randint(1, 60),
+            'date_creation': (maintenant - timedelta(seconds=aleatoire.randint(0, 10**8))).isoformat(),
+            'dernier_gain_message': maintenant.timestamp() - aleatoire.random() * 10**6,
+            'achievements': [a for a in ACHIEVEMENTS_EXEMPLE if aleatoire.random() < 0.3],
+            'messages_envoyes': aleatoire.randint(0, 20000),
+            'sable_depense': aleatoire.randint(0, 50000),
+            'boosts': 0,
+            'equipment_count': aleatoire.randint(0, 12),
+            'prestige': aleatoire.randint(0, 3),
+            'dernier_daily': (maintenant - timedelta(days=aleatoire.randint(0, 30))).isoformat(),
+            'streak_daily': aleatoire.randint(0, 30),
+            'saison': 0,
+            'schema_version': 2,
+            'journal_seq': aleatoire.randint(0, 10**6),
+        }
+    return profils
+
+
+if __name__ == "__main__":
+    # Mesure mémoire: python profils.py [nombre de profils]
+    import gc
+    import json
+    import tracemalloc
+
+    nombre = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    registre_achievements.enregistrer(ACHIEVEMENTS_EXEMPLE)
+    texte = json.dumps(profils_exemple(nombre))
+
+    gc.collect()
+    tracemalloc.start()
+    profils = json.loads(texte)
+    octets_dict = tracemalloc.get_traced_memory()[0]
+    compacts = {user_id: ProfilCompact.depuis_dict(p) for user_id, p in profils.items()}
+    del profils
+    gc.collect()
+    octets_compacts = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    references = json.loads(texte)
+    sans_perte = all(compacts[user_id] == p and compacts[user_id].en_dict() == p for user_id, p in references.items())
+    print(f"{nombre} profils")
+    print(f"dict JSON:     {octets_dict / nombre:,.0f} octets/profil")
+    print(f"ProfilCompact: {octets_compacts / nombre:,.0f} octets/profil")
+    print(f"Aller-retour JSON sans perte: {'oui' if sans_perte else 'NON'}")
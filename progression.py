@@ -0,0 +1,128 @@
+import math
+from array import array
+from bisect import bisect_right
+from functools import partial
+
+
+class MoteurAchievements:
+    """Évalue les achievements de façon incrémentale à partir de leurs champs déclarés"""
+    def __init__(self, definitions):
+        self.definitions = definitions
+        self.seuils = {}  # champ -> ([seuils triés], [achievement_ids alignés])
+        self.presences = {}  # champ -> [achievement_ids débloqués si le champ est défini]
+        self.dependances = {}  # achievement_id -> champs dont il dépend
+        self.ordre = {achievement_id: i for i, achievement_id in enumerate(definitions)}
+        self._compiler()
+
+    def _compiler(self):
+        seuils = {}
+        for achievement_id, definition in self.definitions.items():
+            if 'champ' in definition:
+                seuils.setdefault(definition['champ'], []).append((definition['min'], achievement_id))
+                self.dependances[achievement_id] = (definition['champ'],)
+            elif 'definis' in definition:
+                for champ in definition['definis']:
+                    self.presences.setdefault(champ, []).append(achievement_id)
+                self.dependances[achievement_id] = tuple(definition['definis'])
+            else:
+                raise ValueError(f"Achievement sans condition déclarative: {achievement_id}")
+        for champ, paires in seuils.items():
+            paires.sort()
+            self.seuils[champ] = ([seuil for seuil, _ in paires], [a for _, a in paires])
+
+    def champs_surveilles(self):
+        return set(self.seuils) | set(self.presences)
+
+    def evaluer(self, profil, champs=None):
+        """Retourne les achievements nouvellement débloqués
+
+        Si `champs` est fourni, seuls les achievements dépendant de ces champs sont évalués.
+        """
+        if champs is None:
+            champs = self.champs_surveilles()
+        possedes = profil.get('achievements', [])
+        nouveaux = []
+        for champ in champs:
+            if champ in self.seuils:
+                valeurs, achievement_ids = self.seuils[champ]
+                # Tous les seuils <= valeur sont atteints
+                atteints = bisect_right(valeurs, profil.get(champ) or 0)
+                for achievement_id in achievement_ids[:atteints]:
+                    if achievement_id not in possedes and achievement_id not in nouveaux:
+                        nouveaux.append(achievement_id)
+            if champ in self.presences and profil.get(champ) is not None:
+                for achievement_id in self.presences[champ]:
+                    if achievement_id not in possedes and achievement_id not in nouveaux:
+                        nouveaux.append(achievement_id)
+        return sorted(nouveaux, key=self.ordre.get)
+
+
+class TableNiveaux:
+    """Seuils de puissance par niveau, précalculés et étendus à la demande (niveaux infinis)"""
+    def __init__(self, base=50, niveaux_par_decade=10):
+        self.base = base  # Puissance du niveau 2
+        self.niveaux_par_decade = niveaux_par_decade  # Niveaux gagnés quand la puissance est multipliée par 10
+        # seuils[n - 1] = puissance minimale du niveau n (le niveau 1 n'a pas de minimum)
+        self.seuils = [float('-inf')]
+
+    def signature(self):
+        """Identifie la courbe (un changement impose de recalculer les niveaux)"""
+        return [self.base, self.niveaux_par_decade]
+
+    def _formule(self, puissance):
+        if puissance < self.base:
+            return 1
+        return max(1, int(1 + math.log10(puissance / self.base) * self.niveaux_par_decade))
+
+    def _etendre(self, niveau):
+        """Ajoute les seuils jusqu'au niveau donné (plus petit entier qui atteint chaque niveau)"""
+        while len(self.seuils) < niveau:
+            n = len(self.seuils) + 1
+            self.seuils.append(self._premier_atteignant(n))
+
+    def _premier_atteignant(self, n):
+        """Plus petite puissance (>= base) dont la formule donne au moins n
+
+        L'estimation flottante n'est juste qu'à une erreur relative près (plus de 1 au-delà
+        de ~1e16): la formule étant croissante, le seuil exact est cherché par dichotomie
+        autour d'elle, pour rester identique à la formule.
+        """
+        estimation = self.base * 10 ** ((n - 1) / self.niveaux_par_decade)
+        bas = max(self.base, math.floor(estimation * (1 - 1e-9)))
+        haut = max(self.base, math.ceil(estimation * (1 + 1e-9)))
+        # Élargit l'encadrement si besoin: formule(bas) < n (ou bas = base), formule(haut) >= n
+        while bas > self.base and self._formule(bas) >= n:
+            bas = max(self.base, bas - 2 * (haut - bas) - 1)
+        while self._formule(haut) < n:
+            haut += 2 * (haut - bas) + 1
+        if self._formule(bas) >= n:
+            return bas
+        while haut - bas > 1:
+            milieu = (bas + haut) // 2
+            if self._formule(milieu) >= n:
+                haut = milieu
+            else:
+                bas = milieu
+        return haut
+
+    def _couvrir(self, puissance):
+        while self.seuils[-1] <= puissance:
+            self._etendre(len(self.seuils) + 1)
+
+    def niveau(self, puissance):
+        """Niveau atteint avec cette puissance"""
+        self._couvrir(puissance)
+        return bisect_right(self.seuils, puissance)
+
+    def seuil(self, niveau):
+        """Puissance minimale pour atteindre ce niveau"""
+        if niveau <= 1:
+            return 0
+        self._etendre(niveau)
+        return self.seuils[niveau - 1]
+
+    def niveaux_lot(self, puissances):
+        """Niveaux d'un tableau entier de puissances (migrations, changement de courbe)"""
+        if len(puissances):
+            self._couvrir(max(puissances))
+        return array('l', map(partial(bisect_right, self.seuils), puissances))
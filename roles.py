@@ -0,0 +1,139 @@
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODE_SUPPRIMER = 'supprimer'  # Un seul appel: Discord retire le rôle à tout le monde
+MODE_RETIRER = 'retirer'  # Un appel par membre: le rôle et sa configuration sont conservés
+
+
+def choisir_mode(nb_membres, garder_role):
+    """Supprimer le rôle coûte un appel, le retirer à chacun en coûte un par membre"""
+    if garder_role and nb_membres:
+        return MODE_RETIRER
+    return MODE_SUPPRIMER
+
+
+def planifier_roles(guild, roles, garder_role=False):
+    """Construit l'état (sérialisable) d'une opération sur les rôles donnés"""
+    etat = {'guild_id': guild.id, 'roles': {}, 'traites': 0, 'echecs': 0, 'total': 0}
+    for role in roles:
+        membres = [member.id for member in role.members]
+        mode = choisir_mode(len(membres), garder_role)
+        etat['roles'][str(role.id)] = {
+            'nom': role.name,
+            'mode': mode,
+            'membres': membres if mode == MODE_RETIRER else [],
+            'fait': 0,  # Membres déjà traités (préfixe de la liste, qui ne change plus)
+        }
+        etat['total'] += len(membres) if mode == MODE_RETIRER else 1
+    return etat
+
+
+def reprendre_avancement(etat, avancement):
+    """Applique le dernier point de reprise (voir OperationRoles.avancement) à l'état planifié"""
+    if avancement:
+        etat['traites'] = avancement['traites']
+        etat['echecs'] = avancement['echecs']
+        faits = avancement['faits']
+        for role_id in list(etat['roles']):
+            if role_id in faits:
+                etat['roles'][role_id]['fait'] = faits[role_id]
+            else:
+                del etat['roles'][role_id]
+    return etat
+
+
+class OperationRoles:
+    """Retire ou supprime des rôles en masse, avec concurrence bornée et point de reprise"""
+    def __init__(self, planificateur, enregistrer, concurrence=5, intervalle_point=2.0, priorite=2):
+        self.planificateur = planificateur  # PlanificateurEnvois (rythme par route et pauses sur 429)
+        self.enregistrer = enregistrer  # Fonction qui sauvegarde l'avancement (point de reprise)
+        self.concurrence = concurrence
+        self.intervalle_point = intervalle_point  # Secondes min entre deux points de reprise
+        self.priorite = priorite
+        self.dernier_point = 0
+        self.hors_ordre = set()  # Positions terminées après un membre encore en cours (rôle en cours)
+
+    def avancement(self, etat):
+        """Ce qui change pendant l'opération: compteurs et position atteinte par rôle (taille fixe)
+
+        Les listes de membres, elles, ne sont enregistrées qu'une fois avec l'état planifié.
+        """
+        return {
+            # Les membres terminés hors ordre seront refaits à la reprise: pas encore comptés
+            'traites': etat['traites'] - len(self.hors_ordre),
+            'echecs': etat['echecs'],
+            'faits': {role_id: tache.get('fait', 0) for role_id, tache in etat['roles'].items()},
+        }
+
+    def _point(self, etat, force=False):
+        maintenant = time.monotonic()
+        if force or maintenant - self.dernier_point >= self.intervalle_point:
+            self.dernier_point = maintenant
+            self.enregistrer(self.avancement(etat))
+            return True
+        return False
+
+    async def _envoyer(self, route, fabrique):
+        await self.planificateur.envoyer(route, fabrique, self.priorite)
+
+    async def _retirer(self, guild, role, tache, etat, progression):
+        route = ('roles', guild.id)
+        membres = tache['membres']
+        tache.setdefault('fait', 0)
+        prochain = tache['fait']
+        self.hors_ordre = set()
+
+        async def ouvrier():
+            nonlocal prochain
+            while prochain < len(membres):
+                position = prochain
+                prochain += 1
+                member_id = membres[position]
+                member = guild.get_member(member_id)
+                try:
+                    if member is not None and role in member.roles:
+                        await self._envoyer(route, lambda: member.remove_roles(role, reason="Nouvelle saison"))
+                except Exception as e:
+                    etat['echecs'] += 1
+                    logger.error(f"Erreur retrait du rôle {role.name} à {member_id}: {e}")
+                # La position enregistrée n'avance que sur un préfixe entièrement terminé
+                if position == tache['fait']:
+                    tache['fait'] += 1
+                    while tache['fait'] in self.hors_ordre:
+                        self.hors_ordre.remove(tache['fait'])
+                        tache['fait'] += 1
+                else:
+                    self.hors_ordre.add(position)
+                etat['traites'] += 1
+                if self._point(etat) and progression:
+                    await progression(etat)
+
+        await asyncio.gather(*(ouvrier() for _ in range(min(self.concurrence, len(membres) - prochain) or 1)))
+
+    async def executer(self, guild, etat, progression=None):
+        """Exécute (ou reprend) l'opération décrite par `etat`; retourne l'état final
+
+        `progression` est une coroutine appelée avec l'état à chaque point de reprise.
+        """
+        for role_id, tache in list(etat['roles'].items()):
+            role = guild.get_role(int(role_id))
+            if role is None:
+                # Déjà supprimé (ex: avant un redémarrage)
+                etat['traites'] += 1 if tache['mode'] == MODE_SUPPRIMER else len(tache['membres']) - tache.get('fait', 0)
+            elif tache['mode'] == MODE_SUPPRIMER:
+                try:
+                    await self._envoyer(('roles', guild.id), lambda: role.delete(reason="Nouvelle saison"))
+                except Exception as e:
+                    etat['echecs'] += 1
+                    logger.error(f"Erreur suppression du rôle {role.name}: {e}")
+                etat['traites'] += 1
+            else:
+                await self._retirer(guild, role, tache, etat, progression)
+            del etat['roles'][role_id]
+            self._point(etat, force=True)
+            if progression:
+                await progression(etat)
+        return etat
@@ -0,0 +1,856 @@
+import json
+import os
+import re
+import sys
+import time
+import asyncio
+import sqlite3
+import threading
+import logging
+import contextvars
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from instantane import InstantaneBinaire, ecrire_instantane, lire_instantane
+
+logger = logging.getLogger(__name__)
+
+# Origine des écritures (ex: commande en cours), pour les compter par type de commande
+source_ecriture = contextvars.ContextVar('source_ecriture', default='arrière-plan')
+
+
+def ecrire_json_atomique(fichier, donnees):
+    """Écrit un JSON dans un fichier temporaire puis remplace l'original"""
+    temporaire = f"{fichier}.tmp"
+    with open(temporaire, 'w', encoding='utf-8') as f:
+        json.dump(donnees, f, indent=2, ensure_ascii=False)
+    os.replace(temporaire, fichier)
+
+
+def lire_json(fichier):
+    """Lit un fichier JSON, retourne un dict vide s'il est absent ou illisible"""
+    if os.path.exists(fichier):
+        try:
+            with open(fichier, 'r', encoding='utf-8') as f:
+                contenu = f.read().strip()
+                if contenu:
+                    return json.loads(contenu)
+        except (json.JSONDecodeError, ValueError):
+            logger.error(f"Erreur lors du chargement de {fichier}, retour dict vide")
+    return {}
+
+
+_BLANCS_JSON = re.compile(r'[ \t\n\r]*')
+
+
+def iterer_objet_json(fichier, taille_bloc=1 << 20):
+    """(clé, valeur, texte JSON de la valeur) pour chaque entrée de l'objet racine d'un fichier
+
+    Le fichier est lu par blocs: seuls le bloc et l'entrée en cours sont en mémoire.
+    """
+    # Clés partagées entre les entrées, comme le ferait json.load sur le fichier entier
+    cles = {}
+    decodeur = json.JSONDecoder(object_pairs_hook=lambda paires: {cles.setdefault(c, c): v for c, v in paires})
+    with open(fichier, 'r', encoding='utf-8') as f:
+        tampon, position, fin_fichier = '', 0, False
+
+        def lire_bloc():
+            nonlocal tampon, position, fin_fichier
+            bloc = f.read(taille_bloc)
+            if not bloc:
+                fin_fichier = True
+                return False
+            tampon = tampon[position:] + bloc
+            position = 0
+            return True
+
+        def prochain_caractere():
+            """Premier caractère non blanc ('' en fin de fichier), sans le consommer"""
+            nonlocal position
+            while True:
+                position = _BLANCS_JSON.match(tampon, position).end()
+                if position < len(tampon) or not lire_bloc():
+                    return tampon[position:position + 1]
+
+        def valeur_suivante():
+            nonlocal position
+            while True:
+                try:
+                    valeur, fin = decodeur.raw_decode(tampon, position)
+                except json.JSONDecodeError:
+                    if fin_fichier:
+                        raise
+                else:
+                    # Une valeur qui touche la fin du bloc (ex: nombre) peut continuer dans le suivant
+                    if fin < len(tampon) or fin_fichier:
+                        break
+                lire_bloc()
+            texte = tampon[position:fin]
+            position = fin
+            return valeur, texte
+
+        def attendre(caractere):
+            nonlocal position
+            if prochain_caractere() != caractere:
+                raise ValueError(f"{fichier}: '{caractere}' attendu")
+            position += 1
+
+        if not prochain_caractere():
+            return
+        attendre('{')
+        if prochain_caractere() == '}':
+            return
+        while True:
+            prochain_caractere()
+            cle, _ = valeur_suivante()
+            attendre(':')
+            prochain_caractere()
+            valeur, texte = valeur_suivante()
+            yield cle, valeur, texte
+            if prochain_caractere() == '}':
+                return
+            attendre(',')
+
+
+def texte_entree_json(cle, valeur):
+    """Entrée `"cle": valeur` mise en forme comme par ecrire_json_atomique (indent=2, niveau 1)"""
+    texte = json.dumps(valeur, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+    return f"  {json.dumps(cle, ensure_ascii=False)}: {texte}"
+
+# ================== BACKENDS DE STOCKAGE ==================
+
+class BackendJSON:
+    """Stockage historique dans joueurs.json et tickets.json"""
+
+    def __init__(self, fichier_joueurs, fichier_tickets, fichier_etat='etat.json'):
+        self.fichier_joueurs = fichier_joueurs
+        self.fichier_tickets = fichier_tickets
+        self.fichier_etat = fichier_etat
+
+    def charger_joueurs(self):
+        return dict(self.iterer_joueurs())
+
+    def iterer_joueurs(self):
+        """(user_id, profil) lus un à un: le texte du fichier n'est jamais chargé en entier"""
+        if not os.path.exists(self.fichier_joueurs):
+            return
+        try:
+            for user_id, profil, _ in iterer_objet_json(self.fichier_joueurs):
+                yield user_id, profil
+        except ValueError as e:
+            logger.error(f"Erreur lors du chargement de {self.fichier_joueurs}, lecture arrêtée: {e}")
+
+    def ecrire_joueurs(self, profils, modifies):
+        """Réécrit le fichier en flux: seuls les profils modifiés sont sérialisés
+
+        Les autres entrées sont recopiées telles quelles depuis le fichier précédent (le
+        dernier snapshot), sans être gardées en mémoire; un id de `modifies` absent de
+        `profils` est supprimé. Le résultat est identique à ecrire_json_atomique.
+        """
+        ecrits = set()
+        premiere = True
+        temporaire = f"{self.fichier_joueurs}.tmp"
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            def ecrire(texte):
+                nonlocal premiere
+                f.write('{\n' if premiere else ',\n')
+                f.write(texte)
+                premiere = False
+
+            if os.path.exists(self.fichier_joueurs):
+                for user_id, _, texte in iterer_objet_json(self.fichier_joueurs):
+                    if user_id not in modifies:
+                        ecrire(f"  {json.dumps(user_id, ensure_ascii=False)}: {texte}")
+                    elif user_id in profils:
+                        ecrire(texte_entree_json(user_id, profils[user_id]))
+                        ecrits.add(user_id)
+            for user_id, profil in profils.items():
+                if user_id not in ecrits:
+                    ecrire(texte_entree_json(user_id, profil))
+            f.write('{}' if premiere else '\n}')
+        os.replace(temporaire, self.fichier_joueurs)
+
+    def charger_tickets(self):
+        return lire_json(self.fichier_tickets)
+
+    def ecrire_tickets(self, tickets):
+        ecrire_json_atomique(self.fichier_tickets, tickets)
+
+    def ecrire_ticket(self, user_id, ticket):
+        tickets = self.charger_tickets()
+        tickets[str(user_id)] = ticket
+        self.ecrire_tickets(tickets)
+
+    def charger_etat(self):
+        return lire_json(self.fichier_etat)
+
+    def ecrire_etat(self, cle, valeur):
+        """Écrit (ou supprime si None) une entrée d'état global"""
+        etat = self.charger_etat()
+        if valeur is None:
+            etat.pop(cle, None)
+        else:
+            etat[cle] = valeur
+        ecrire_json_atomique(self.fichier_etat, etat)
+
+
+class BackendBinaire(BackendJSON):
+    """Profils dans un instantané binaire compact (instantane.py), tickets et état en JSON
+
+    Les profils sont tous décodés au chargement (pas de chargement paresseux): le store
+    parcourt toute la population pour ses index et le classement.
+    """
+    def __init__(self, fichier_binaire, fichier_tickets, fichier_etat='etat.json', compresser=False, compacts=False):
+        super().__init__(fichier_binaire, fichier_tickets, fichier_etat)
+        self.compresser = compresser
+        self.compacts = compacts  # Charger directement en ProfilCompact
+
+    def charger_joueurs(self):
+        return lire_instantane(self.fichier_joueurs, compacts=self.compacts)
+
+    def iterer_joueurs(self):
+        if not os.path.exists(self.fichier_joueurs):
+            return
+        instantane = InstantaneBinaire(self.fichier_joueurs)
+        try:
+            yield from instantane.profils_compacts() if self.compacts else instantane.profils()
+        finally:
+            instantane.fermer()
+
+    def ecrire_joueurs(self, profils, modifies):
+        """Réécrit l'instantané: profils modifiés + profils inchangés relus dans le précédent (un à la fois)"""
+        precedent = InstantaneBinaire(self.fichier_joueurs) if os.path.exists(self.fichier_joueurs) else None
+        try:
+            inchanges = (
+                (user_id, profil) for user_id, profil in precedent.profils() if user_id not in modifies
+            ) if precedent else ()
+            ecrire_instantane(self.fichier_joueurs, chain(inchanges, profils.items()), compresser=self.compresser)
+        finally:
+            if precedent:
+                precedent.fermer()
+
+
+class BackendSQLite:
+    """Stockage SQLite (mode WAL) avec les champs chauds en colonnes indexées"""
+    COLONNES_INDEXEES = ('puissance', 'sable', 'niveau', 'prestige', 'classe')
+    COLONNES = ('username', 'sable', 'puissance', 'niveau', 'prestige', 'classe',
+                'messages_envoyes', 'temps_vocal_minutes')
+
+    def __init__(self, fichier):
+        self.fichier = fichier
+        self.verrou = threading.Lock()
+        self.connexion = sqlite3.connect(fichier, check_same_thread=False)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.execute("PRAGMA synchronous=NORMAL")
+        self._creer_schema()
+
+    def _creer_schema(self):
+        with self.verrou, self.connexion:
+            self.connexion.execute("""
+                CREATE TABLE IF NOT EXISTS joueurs (
+                    id TEXT PRIMARY KEY,
+                    username TEXT,
+                    sable INTEGER NOT NULL DEFAULT 0,
+                    puissance INTEGER NOT NULL DEFAULT 0,
+                    niveau INTEGER NOT NULL DEFAULT 1,
+                    prestige INTEGER NOT NULL DEFAULT 0,
+                    classe TEXT,
+                    messages_envoyes INTEGER NOT NULL DEFAULT 0,
+                    temps_vocal_minutes INTEGER NOT NULL DEFAULT 0,
+                    donnees TEXT NOT NULL
+                )
+            """)
+            for colonne in self.COLONNES_INDEXEES:
+                self.connexion.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_joueurs_{colonne} ON joueurs({colonne})"
+                )
+            self.connexion.execute("""
+                CREATE TABLE IF NOT EXISTS tickets (
+                    user_id TEXT PRIMARY KEY,
+                    donnees TEXT NOT NULL
+                )
+            """)
+            self.connexion.execute("""
+                CREATE TABLE IF NOT EXISTS etat (
+                    cle TEXT PRIMARY KEY,
+                    donnees TEXT NOT NULL
+                )
+            """)
+
+    def _ligne(self, user_id, profil):
+        return (
+            str(user_id),
+            profil.get('username'),
+            profil.get('sable', 0),
+            profil.get('puissance', 0),
+            profil.get('niveau', 1),
+            profil.get('prestige', 0),
+            profil.get('classe'),
+            profil.get('messages_envoyes', 0),
+            profil.get('temps_vocal_minutes', 0),
+            json.dumps(profil, ensure_ascii=False),
+        )
+
+    def charger_joueurs(self):
+        return dict(self.iterer_joueurs())
+
+    def iterer_joueurs(self):
+        # Lignes décodées au fil du curseur: jamais de seconde copie de la table en mémoire
+        with self.verrou:
+            for user_id, donnees in self.connexion.execute("SELECT id, donnees FROM joueurs"):
+                yield user_id, json.loads(donnees)
+
+    def ecrire_joueurs(self, profils, modifies):
+        """UPSERT d'une ligne par profil modifié, en une seule transaction"""
+        lignes = [self._ligne(user_id, profils[user_id]) for user_id in modifies if user_id in profils]
+        supprimes = [(user_id,) for user_id in modifies if user_id not in profils]
+        colonnes = ', '.join(self.COLONNES)
+        valeurs = ', '.join('?' for _ in self.COLONNES)
+        maj = ', '.join(f"{c}=excluded.{c}" for c in self.COLONNES + ('donnees',))
+        with self.verrou, self.connexion:
+            self.connexion.executemany(
+                f"INSERT INTO joueurs (id, {colonnes}, donnees) VALUES (?, {valeurs}, ?) "
+                f"ON CONFLICT(id) DO UPDATE SET {maj}",
+                lignes
+            )
+            if supprimes:
+                self.connexion.executemany("DELETE FROM joueurs WHERE id = ?", supprimes)
+
+    def charger_tickets(self):
+        with self.verrou:
+            lignes = self.connexion.execute("SELECT user_id, donnees FROM tickets").fetchall()
+        return {user_id: json.loads(donnees) for user_id, donnees in lignes}
+
+    def ecrire_tickets(self, tickets):
+        with self.verrou, self.connexion:
+            self.connexion.execute("DELETE FROM tickets")
+            self.connexion.executemany(
+                "INSERT INTO tickets (user_id, donnees) VALUES (?, ?)",
+                [(str(uid), json.dumps(t, ensure_ascii=False)) for uid, t in tickets.items()]
+            )
+
+    def ecrire_ticket(self, user_id, ticket):
+        with self.verrou, self.connexion:
+            self.connexion.execute(
+                "INSERT INTO tickets (user_id, donnees) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET donnees=excluded.donnees",
+                (str(user_id), json.dumps(ticket, ensure_ascii=False))
+            )
+
+    def charger_etat(self):
+        with self.verrou:
+            lignes = self.connexion.execute("SELECT cle, donnees FROM etat").fetchall()
+        return {cle: json.loads(donnees) for cle, donnees in lignes}
+
+    def ecrire_etat(self, cle, valeur):
+        """Écrit (ou supprime si None) une entrée d'état global"""
+        with self.verrou, self.connexion:
+            if valeur is None:
+                self.connexion.execute("DELETE FROM etat WHERE cle = ?", (cle,))
+            else:
+                self.connexion.execute(
+                    "INSERT INTO etat (cle, donnees) VALUES (?, ?) "
+                    "ON CONFLICT(cle) DO UPDATE SET donnees=excluded.donnees",
+                    (cle, json.dumps(valeur, ensure_ascii=False))
+                )
+
+
+def importer_json(backend, fichier_joueurs, fichier_tickets):
+    """Importe une fois les fichiers JSON existants dans un backend (ex: SQLite)"""
+    joueurs = lire_json(fichier_joueurs)
+    tickets = lire_json(fichier_tickets)
+    backend.ecrire_joueurs(joueurs, set(joueurs.keys()))
+    backend.ecrire_tickets(tickets)
+    return len(joueurs), len(tickets)
+
+# ================== JOURNAL DE L'ÉCONOMIE ==================
+
+def appliquer_delta(profil, increments=None, valeurs=None):
+    """Applique des incréments et des valeurs à un profil"""
+    for champ, delta in (increments or {}).items():
+        profil[champ] = profil.get(champ, 0) + delta
+    for champ, valeur in (valeurs or {}).items():
+        profil[champ] = valeur
+
+
+class JournalEconomie:
+    """Journal append-only des mutations de profils, fsync par groupes"""
+    def __init__(self, fichier, taille_groupe=64, seuil_compaction=10000):
+        self.fichier = fichier
+        self.taille_groupe = taille_groupe  # Enregistrements en attente avant fsync
+        self.seuil_compaction = seuil_compaction  # Enregistrements avant compaction
+        self.en_attente = []
+        self.enregistrements = 0
+        self.sequence = 0
+        self.fsyncs = 0
+        self.handle = None
+        # Écritures, fsync et troncature: thread de persistance et vidages synchrones (démarrage/arrêt)
+        self.verrou = threading.Lock()
+
+    def ajouter(self, enregistrement):
+        """Ajoute un enregistrement et retourne son numéro de séquence"""
+        self.sequence += 1
+        enregistrement['seq'] = self.sequence
+        self.en_attente.append(json.dumps(enregistrement, ensure_ascii=False, separators=(',', ':')))
+        self.enregistrements += 1
+        return self.sequence
+
+    def groupe_plein(self):
+        return len(self.en_attente) >= self.taille_groupe
+
+    def prendre_en_attente(self):
+        """Retire et retourne le groupe d'enregistrements en attente"""
+        lignes, self.en_attente = self.en_attente, []
+        return lignes
+
+    def synchroniser(self):
+        """Écrit le groupe en attente et le force sur disque (un seul fsync)"""
+        return self.ecrire(self.prendre_en_attente())
+
+    def ecrire(self, lignes):
+        """Ajoute des lignes au fichier et les force sur disque (thread de persistance)"""
+        with self.verrou:
+            return self._ecrire(lignes)
+
+    def _ecrire(self, lignes):
+        if not lignes:
+            return 0
+        if self.handle is None:
+            self.handle = open(self.fichier, 'a', encoding='utf-8')
+        self.handle.write('\n'.join(lignes) + '\n')
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        self.fsyncs += 1
+        return len(lignes)
+
+    def utilisateurs(self):
+        """Ids des profils présents dans le journal (avant le rejeu)"""
+        utilisateurs = set()
+        if os.path.exists(self.fichier):
+            with open(self.fichier, 'r', encoding='utf-8') as f:
+                for ligne in f:
+                    try:
+                        utilisateurs.add(json.loads(ligne)['u'])
+                    except (ValueError, KeyError):
+                        break
+        return utilisateurs
+
+    def rejouer(self, profils):
+        """Rejoue le journal sur les profils du snapshot, retourne les ids touchés"""
+        touches = set()
+        if not os.path.exists(self.fichier):
+            return touches
+        with open(self.fichier, 'r', encoding='utf-8') as f:
+            for ligne in f:
+                try:
+                    enregistrement = json.loads(ligne)
+                except ValueError:
+                    # Dernière ligne tronquée par un crash: on s'arrête là
+                    logger.warning("Journal tronqué, fin du rejeu")
+                    break
+                self.sequence = max(self.sequence, enregistrement['seq'])
+                self.enregistrements += 1
+                user_id = enregistrement['u']
+                profil = profils.get(user_id)
+                # Déjà inclus dans le snapshot (crash entre snapshot et troncature)
+                if profil is not None and profil.get('journal_seq', 0) >= enregistrement['seq']:
+                    continue
+                if enregistrement['t'] == 'profil':
+                    profils[user_id] = enregistrement['p']
+                elif profil is not None:
+                    appliquer_delta(profil, enregistrement.get('inc'), enregistrement.get('set'))
+                else:
+                    continue
+                profils[user_id]['journal_seq'] = enregistrement['seq']
+                touches.add(user_id)
+        return touches
+
+    def compacter(self, lignes, ecrire_snapshot):
+        """Écrit les dernières lignes, le snapshot puis vide le journal
+
+        Aucun groupe ne peut être écrit entre le snapshot et la troncature (il serait perdu).
+        """
+        with self.verrou:
+            self._ecrire(lignes)
+            ecrire_snapshot()
+            self._tronquer()
+
+    def tronquer(self):
+        """Vide le fichier du journal une fois son contenu intégré au snapshot"""
+        with self.verrou:
+            self._tronquer()
+
+    def _tronquer(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        open(self.fichier, 'w', encoding='utf-8').close()
+
+    def doit_compacter(self):
+        return self.enregistrements >= self.seuil_compaction
+
+# ================== PERSISTANCE ASYNCHRONE ==================
+
+class PersistanceAsync:
+    """Exécute les sérialisations et écritures disque sur un thread dédié"""
+    def __init__(self):
+        # Un seul thread: les écritures sont exécutées dans l'ordre de soumission
+        self.executeur = ThreadPoolExecutor(max_workers=1, thread_name_prefix='persistance')
+
+    async def executer(self, fonction, *args):
+        """Exécute une fonction bloquante sur le thread de persistance et attend son résultat"""
+        return await asyncio.get_running_loop().run_in_executor(self.executeur, fonction, *args)
+
+    def planifier(self, fonction, *args):
+        """Soumet une écriture sans attendre sa fin (fire-and-forget)"""
+        future = self.executeur.submit(fonction, *args)
+        future.add_done_callback(self._terminee)
+        return future
+
+    def _terminee(self, future):
+        if future.exception():
+            logger.error(f"Erreur d'écriture en arrière-plan: {future.exception()}")
+
+    def fermer(self):
+        """Attend la fin des écritures en attente et arrête le thread"""
+        self.executeur.shutdown(wait=True)
+
+
+def forme_json(profil):
+    """Dict JSON d'un profil (un ProfilCompact est converti en lisant directement ses slots)"""
+    return profil if isinstance(profil, dict) else profil.en_dict()
+
+
+def copier_profil(profil):
+    """Copie un profil pour le sérialiser hors de la boucle asyncio"""
+    return {champ: list(valeur) if isinstance(valeur, list) else valeur for champ, valeur in forme_json(profil).items()}
+
+
+class TicketStore:
+    """Tickets en mémoire, écrits en arrière-plan sur le thread de persistance"""
+    def __init__(self, backend, persistance):
+        self.backend = backend
+        self.persistance = persistance
+        self.tickets = None
+        self.ecritures_par_source = Counter()
+
+    def tous(self):
+        if self.tickets is None:
+            self.tickets = self.backend.charger_tickets()
+        return self.tickets
+
+    def obtenir(self, user_id):
+        return self.tous().get(str(user_id))
+
+    def sauvegarder(self, user_id, ticket):
+        self.tous()[str(user_id)] = ticket
+        self.ecritures_par_source[source_ecriture.get()] += 1
+        return self.persistance.planifier(self.backend.ecrire_ticket, str(user_id), dict(ticket))
+
+    def remplacer_tout(self, tickets):
+        self.tickets = tickets
+        self.ecritures_par_source[source_ecriture.get()] += 1
+        return self.persistance.planifier(self.backend.ecrire_tickets, {uid: dict(t) for uid, t in tickets.items()})
+
+
+class EtatStore:
+    """État global du bot (opérations en cours, etc.), écrit en arrière-plan"""
+    def __init__(self, backend, persistance):
+        self.backend = backend
+        self.persistance = persistance
+        self.etat = None
+
+    def tous(self):
+        if self.etat is None:
+            self.etat = self.backend.charger_etat()
+        return self.etat
+
+    def obtenir(self, cle, defaut=None):
+        return self.tous().get(cle, defaut)
+
+    def definir(self, cle, valeur):
+        """Enregistre une valeur (None la supprime); retourne le future d'écriture"""
+        if valeur is None:
+            self.tous().pop(cle, None)
+        else:
+            self.tous()[cle] = valeur
+        copie = json.loads(json.dumps(valeur)) if valeur is not None else None
+        return self.persistance.planifier(self.backend.ecrire_etat, cle, copie)
+
+# ================== CACHE DES PROFILS ==================
+
+class PlayerStore:
+    """Garde les profils en mémoire et les écrit sur disque par lots (write-behind)"""
+    def __init__(self, backend, journal=None, persistance=None, seuil_lot=100, intervalle=30, valeurs_saison=None, migrations=None, compacter=None):
+        self.backend = backend
+        self.journal = journal  # Si présent, chaque mutation y est ajoutée et le vidage devient une compaction
+        self.persistance = persistance or PersistanceAsync()
+        self.seuil_lot = seuil_lot  # Nombre de profils modifiés qui déclenche un vidage
+        self.intervalle = intervalle  # Secondes max entre deux vidages
+        self.profils = {}
+        self.modifies = set()
+        self.charge = False
+        self.dernier_vidage = time.monotonic()
+        self.verrou_vidage = None
+        self.tache_vidage = None
+        self.observateurs = []  # Index tenus à jour à chaque mutation (classements, stats...)
+        self.saison = 0  # Les profils d'une saison antérieure sont réinitialisés à leur prochain accès
+        self.valeurs_saison = valeurs_saison or {}  # Valeurs d'un profil en début de saison
+        self.ecritures_par_source = Counter()  # Mutations journalisées par origine
+        self.migrations = migrations  # MigrationsProfils appliquées une fois au chargement
+        self.migration = None  # (profils migrés, secondes) du dernier chargement
+        self.compacter = compacter  # Convertit les profils chargés en forme compacte (ex: ProfilCompact)
+
+    def abonner(self, observateur):
+        """Abonne un index: mettre_a_jour(user_id, profil) à chaque mutation, reconstruire(profils) au chargement"""
+        self.observateurs.append(observateur)
+        if self.charge:
+            observateur.reconstruire(self.profils_saison())
+
+    def _notifier(self, user_id, profil):
+        for observateur in self.observateurs:
+            try:
+                observateur.mettre_a_jour(user_id, profil)
+            except Exception as e:
+                logger.error(f"Erreur de mise à jour de l'index {type(observateur).__name__}: {e}")
+
+    def _reconstruire_index(self):
+        profils = self.profils_saison()
+        for observateur in self.observateurs:
+            observateur.reconstruire(profils)
+
+    def _de_la_saison(self, profil):
+        return profil.get('saison', 0) >= self.saison
+
+    def profils_saison(self):
+        """Profils de la saison courante (les autres attendent leur réinitialisation)"""
+        self._assurer_charge()
+        return {user_id: p for user_id, p in self.profils.items() if self._de_la_saison(p)}
+
+    def nouvelle_saison(self):
+        """Démarre une nouvelle saison en O(1): aucun profil n'est parcouru"""
+        self._assurer_charge()
+        self.saison += 1
+        for observateur in self.observateurs:
+            observateur.reconstruire({})
+        return self.saison
+
+    def _normaliser(self, user_id, profil):
+        """Réinitialise (et journalise) un profil resté sur une saison précédente"""
+        if profil is not None and not self._de_la_saison(profil):
+            self._enregistrer_delta(user_id, profil, None, dict(self.valeurs_saison, saison=self.saison))
+        return profil
+
+    def charger(self):
+        """Charge tous les profils une seule fois depuis le disque
+
+        Les profils sont lus, migrés et compactés un par un au fil de la lecture: jamais
+        deux copies de la population en mémoire.
+        """
+        self.modifies.clear()
+        # Profils que le journal va modifier: migrés seulement après le rejeu
+        a_rejouer = self.journal.utilisateurs() if self.journal else set()
+        migres = []
+        flux = self.backend.iterer_joueurs()
+        if self.migrations:
+            flux = self.migrations.migrer_flux(flux, migres, exclus=a_rejouer)
+        if self.compacter:
+            flux = ((user_id, self.compacter(profil)) for user_id, profil in flux)
+        self.profils = dict(flux)
+        if self.journal:
+            # Snapshot + queue du journal
+            self.journal.sequence = max((p.get('journal_seq', 0) for p in self.profils.values()), default=0)
+            self.modifies.update(self.journal.rejouer(self.profils))
+        rejoues = len(self.modifies)
+        if self.migrations:
+            secondes = self.migrations.duree_flux
+            if a_rejouer:
+                rejeu, duree = self.migrations.migrer_tous({u: self.profils[u] for u in a_rejouer if u in self.profils})
+                migres += rejeu
+                secondes += duree
+            self.migration = (len(migres), secondes)
+            self.modifies.update(migres)
+        if self.compacter:
+            # Profils réécrits par le journal (dicts)
+            for user_id in a_rejouer & self.profils.keys():
+                self.profils[user_id] = self.compacter(self.profils[user_id])
+        self.charge = True
+        self._reconstruire_index()
+        logger.info(f"{len(self.profils)} profils chargés ({type(self.backend).__name__}, "
+                    f"{rejoues} rejoués depuis le journal, {len(migres)} migrés)")
+        if migres:
+            # Écrits tout de suite: les prochains chargements n'auront plus rien à migrer
+            self.planifier_vidage()
+
+    def _assurer_charge(self):
+        if not self.charge:
+            self.charger()
+
+    def consulter(self, user_id):
+        """Profil en lecture seule (ou None): aucune écriture, même pour un profil d'une ancienne saison
+
+        Le profil retourné ne doit pas être modifié.
+        """
+        self._assurer_charge()
+        profil = self.profils.get(str(user_id))
+        if profil is not None and not self._de_la_saison(profil):
+            return dict(forme_json(profil), **self.valeurs_saison, saison=self.saison)
+        return profil
+
+    def obtenir(self, user_id):
+        """Retourne le profil en mémoire (ou None), remis à la saison courante"""
+        self._assurer_charge()
+        user_id = str(user_id)
+        return self._normaliser(user_id, self.profils.get(user_id))
+
+    def tous(self):
+        """Retourne le dict de tous les profils en mémoire"""
+        self._assurer_charge()
+        return self.profils
+
+    def sauvegarder(self, user_id, profil):
+        """Met à jour le profil en mémoire et le marque comme modifié
+
+        Avec `compacter`, un dict est stocké sous sa forme compacte: relire le profil avec obtenir().
+        """
+        self._assurer_charge()
+        user_id = str(user_id)
+        if self.compacter:
+            profil = self.compacter(profil)
+        self.profils[user_id] = profil
+        profil.setdefault('saison', self.saison)
+        if self.journal:
+            profil['journal_seq'] = self.journal.ajouter({'t': 'profil', 'u': user_id, 'p': dict(forme_json(profil))})
+        self._marquer(user_id)
+
+    def appliquer(self, user_id, increments=None, valeurs=None):
+        """Applique une mutation (delta) à un profil existant et la journalise"""
+        self._assurer_charge()
+        user_id = str(user_id)
+        profil = self._normaliser(user_id, self.profils[user_id])
+        return self._enregistrer_delta(user_id, profil, increments, valeurs)
+
+    def _enregistrer_delta(self, user_id, profil, increments, valeurs):
+        appliquer_delta(profil, increments, valeurs)
+        if self.journal:
+            enregistrement = {'t': 'delta', 'u': user_id}
+            if increments:
+                enregistrement['inc'] = increments
+            if valeurs:
+                enregistrement['set'] = valeurs
+            profil['journal_seq'] = self.journal.ajouter(enregistrement)
+        self._marquer(user_id)
+        return profil
+
+    def _marquer(self, user_id):
+        self.modifies.add(user_id)
+        self.ecritures_par_source[source_ecriture.get()] += 1
+        self._notifier(user_id, self.profils[user_id])
+        if self.journal:
+            if self.journal.groupe_plein():
+                self.planifier_synchronisation()
+        elif len(self.modifies) >= self.seuil_lot:
+            # Sans journal, un trop grand nombre de profils en attente déclenche l'écriture
+            self.planifier_vidage()
+
+    def planifier_synchronisation(self):
+        """Envoie le groupe du journal au thread de persistance (fsync sans attendre)"""
+        if self.journal and self.journal.en_attente:
+            return self.persistance.planifier(self.journal.ecrire, self.journal.prendre_en_attente())
+        return None
+
+    def synchroniser_journal(self):
+        """Force sur disque les enregistrements du journal en attente (bloquant)"""
+        if self.journal:
+            return self.journal.synchroniser()
+        return 0
+
+    def remplacer_tout(self, profils):
+        """Remplace l'ensemble des profils (ex: reset de saison)"""
+        self._assurer_charge()
+        # Les anciens profils absents des nouveaux sont supprimés à l'écriture
+        self.modifies.update(self.profils.keys())
+        if self.compacter:
+            profils = {user_id: self.compacter(p) for user_id, p in profils.items()}
+        self.profils = profils
+        self.modifies.update(profils.keys())
+        self._reconstruire_index()
+        self.planifier_vidage()
+
+    def doit_vider(self):
+        """Indique si des profils attendent d'être écrits (délai ou journal trop long)"""
+        if self.journal and self.journal.doit_compacter():
+            return True
+        return bool(self.modifies) and time.monotonic() - self.dernier_vidage >= self.intervalle
+
+    def _preparer_lot(self):
+        """Prend une copie cohérente des profils à écrire (sur la boucle asyncio)"""
+        self.dernier_vidage = time.monotonic()
+        modifies, self.modifies = self.modifies, set()
+        # Seuls les profils modifiés sont copiés: le backend reprend les autres dans son dernier snapshot
+        copies = {user_id: copier_profil(self.profils[user_id]) for user_id in modifies if user_id in self.profils}
+        lignes = []
+        if self.journal:
+            # Les enregistrements suivants iront dans le journal après la troncature
+            lignes = self.journal.prendre_en_attente()
+            self.journal.enregistrements = 0
+        return copies, modifies, lignes
+
+    def _ecrire_lot(self, copies, modifies, lignes):
+        """Écrit le lot sur disque puis tronque le journal (thread de persistance)"""
+        if self.journal:
+            # Le snapshot contient tout le journal écrit jusqu'ici
+            self.journal.compacter(lignes, lambda: self.backend.ecrire_joueurs(copies, modifies))
+        else:
+            self.backend.ecrire_joueurs(copies, modifies)
+
+    async def vider_async(self):
+        """Écrit les profils modifiés sur le thread de persistance et attend la fin"""
+        if self.verrou_vidage is None:
+            self.verrou_vidage = asyncio.Lock()
+        async with self.verrou_vidage:
+            if not self.modifies:
+                self.dernier_vidage = time.monotonic()
+                return 0
+            copies, modifies, lignes = self._preparer_lot()
+            try:
+                await self.persistance.executer(self._ecrire_lot, copies, modifies, lignes)
+            except Exception as e:
+                logger.error(f"Erreur lors de la sauvegarde: {e}")
+                self.modifies |= modifies
+                return 0
+            return len(modifies)
+
+    def planifier_vidage(self):
+        """Lance une écriture en arrière-plan sans attendre sa fin"""
+        try:
+            boucle = asyncio.get_running_loop()
+        except RuntimeError:
+            return self.vider()
+        if self.tache_vidage is None or self.tache_vidage.done():
+            self.tache_vidage = boucle.create_task(self.vider_async())
+        return self.tache_vidage
+
+    def vider(self):
+        """Écrit les profils modifiés sur disque de façon bloquante (démarrage/arrêt)"""
+        if not self.modifies:
+            self.dernier_vidage = time.monotonic()
+            return 0
+        copies, modifies, lignes = self._preparer_lot()
+        try:
+            self._ecrire_lot(copies, modifies, lignes)
+        except Exception as e:
+            logger.error(f"Erreur lors de la sauvegarde: {e}")
+            self.modifies |= modifies
+            return 0
+        return len(modifies)
+
+
+if __name__ == "__main__":
+    # Import ponctuel: python stockage.py importer [joueurs.json] [tickets.json] [marchand.db]
+    if len(sys.argv) < 2 or sys.argv[1] != 'importer':
+        print("Usage: python stockage.py importer [joueurs.json] [tickets.json] [marchand.db]")
+        sys.exit(1)
+    arguments = sys.argv[2:] + ['joueurs.json', 'tickets.json', 'marchand.db'][len(sys.argv) - 2:]
+    nb_joueurs, nb_tickets = importer_json(BackendSQLite(arguments[2]), arguments[0], arguments[1])
+    print(f"✅ {nb_joueurs} joueurs et {nb_tickets} tickets importés dans {arguments[2]}")
@@ -0,0 +1,80 @@
+import pytest
+
+from stockage import BackendJSON, JournalEconomie, PlayerStore, ecrire_json_atomique, lire_json
+
+
+@pytest.fixture
+def fichiers(tmp_path):
+    joueurs = tmp_path / 'joueurs.json'
+    ecrire_json_atomique(joueurs, {'1': {'sable': 100}, '2': {'sable': 50}})
+    return joueurs, tmp_path / 'tickets.json', tmp_path / 'journal.log'
+
+
+def ouvrir(fichiers):
+    joueurs, tickets, journal = fichiers
+    store = PlayerStore(BackendJSON(joueurs, tickets), journal=JournalEconomie(journal))
+    store.charger()
+    return store
+
+
+def test_rejeu_apres_crash_avant_snapshot(fichiers):
+    store = ouvrir(fichiers)
+    store.appliquer('1', increments={'sable': 10})
+    store.appliquer('1', increments={'sable': 5})
+    store.sauvegarder('3', {'sable': 7})
+    store.synchroniser_journal()
+    # Crash: le snapshot n'a jamais été écrit
+    store.persistance.fermer()
+    assert lire_json(fichiers[0])['1']['sable'] == 100
+
+    relu = ouvrir(fichiers)
+    assert relu.profils['1']['sable'] == 115
+    assert relu.profils['3']['sable'] == 7
+    assert relu.profils['2']['sable'] == 50
+    assert relu.modifies == {'1', '3'}
+    relu.persistance.fermer()
+
+
+def test_rejeu_ignore_ce_que_le_snapshot_contient(fichiers):
+    store = ouvrir(fichiers)
+    store.appliquer('1', increments={'sable': 10})
+    store.synchroniser_journal()
+    # Crash entre l'écriture du snapshot et la troncature du journal
+    copies, modifies, _ = store._preparer_lot()
+    store.backend.ecrire_joueurs(copies, modifies)
+    store.persistance.fermer()
+
+    relu = ouvrir(fichiers)
+    assert relu.profils['1']['sable'] == 110
+    assert not relu.modifies
+    relu.persistance.fermer()
+
+
+def test_rejeu_sans_effet_apres_compaction(fichiers):
+    store = ouvrir(fichiers)
+    store.appliquer('1', increments={'sable': 10})
+    store.appliquer('2', valeurs={'sable': 0})
+    assert store.vider() == 2
+    store.persistance.fermer()
+    assert fichiers[2].read_text(encoding='utf-8') == ''
+
+    relu = ouvrir(fichiers)
+    assert relu.profils['1']['sable'] == 110
+    assert relu.profils['2']['sable'] == 0
+    assert not relu.modifies
+    # La séquence reprend après celle du snapshot
+    assert relu.journal.sequence == 2
+    relu.persistance.fermer()
+
+
+def test_rejeu_arrete_sur_ligne_tronquee(fichiers):
+    store = ouvrir(fichiers)
+    store.appliquer('1', increments={'sable': 10})
+    store.synchroniser_journal()
+    store.persistance.fermer()
+    with open(fichiers[2], 'a', encoding='utf-8') as f:
+        f.write('{"t":"delta","u":"1","inc":{"sab')
+
+    relu = ouvrir(fichiers)
+    assert relu.profils['1']['sable'] == 110
+    relu.persistance.fermer()
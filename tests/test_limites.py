@@ -0,0 +1,86 @@
+import pytest
+
+import limites
+from limites import LimiteurDebit, TableExpirante
+
+
+class Horloge:
+    def __init__(self):
+        self.instant = 1000.0
+
+    def __call__(self):
+        return self.instant
+
+    def avancer(self, secondes):
+        self.instant += secondes
+
+
+@pytest.fixture
+def horloge(monkeypatch):
+    horloge = Horloge()
+    monkeypatch.setattr(limites.time, 'monotonic', horloge)
+    return horloge
+
+
+def test_table_expirante_oublie_les_entrees(horloge):
+    table = TableExpirante()
+    table.ajouter('a', 5, valeur='x')
+    table.ajouter('b', 30)
+    horloge.avancer(4)
+    assert table.valeur('a') == 'x'
+    assert table.restant('a') == pytest.approx(1)
+    horloge.avancer(2)
+    assert not table.actif('a')
+    assert table.valeur('a') is None
+    assert len(table) == 1
+    assert 'a' not in table.valeurs
+
+
+def test_table_expirante_prolongation(horloge):
+    table = TableExpirante()
+    table.ajouter('a', 5)
+    horloge.avancer(3)
+    table.ajouter('a', 5)
+    # L'ancienne case expire sans emporter l'entrée prolongée
+    horloge.avancer(3)
+    assert table.actif('a')
+    horloge.avancer(3)
+    assert not table.actif('a')
+
+
+def test_table_expirante_longue_inactivite(horloge):
+    table = TableExpirante(granularite=0.1)
+    for i in range(100):
+        table.ajouter(i, i + 1)
+    horloge.avancer(10 ** 6)
+    assert len(table) == 0
+    assert not table.cases
+
+
+def test_limiteur_rafale_puis_recharge(horloge):
+    limiteur = LimiteurDebit()
+    demande = [('u1', 3, 1.0, 1)]
+    assert [limiteur.consommer(demande) for _ in range(3)] == [0, 0, 0]
+    assert limiteur.consommer(demande) == pytest.approx(1.0)
+    horloge.avancer(1)
+    assert limiteur.consommer(demande) == 0
+    assert (limiteur.acceptes, limiteur.rejets) == (4, 1)
+
+
+def test_limiteur_tout_ou_rien(horloge):
+    limiteur = LimiteurDebit()
+    assert limiteur.consommer([('global', 1, 0.5, 1)]) == 0
+    # Le seau global est vide: le seau de l'utilisateur n'est pas entamé
+    assert limiteur.consommer([('u1', 1, 1.0, 1), ('global', 1, 0.5, 1)]) == pytest.approx(2.0)
+    assert limiteur.consommer([('u1', 1, 1.0, 1)]) == 0
+
+
+def test_limiteur_oublie_les_seaux_pleins(horloge):
+    limiteur = LimiteurDebit()
+    limiteur.consommer([('u1', 4, 2.0, 1), ('u2', 4, 2.0, 4)])
+    assert len(limiteur) == 2
+    # Un seau est oublié une fois plein, dès que la roue a dépassé sa case (granularité 1 s)
+    horloge.avancer(1.1)
+    assert len(limiteur) == 1
+    horloge.avancer(2)
+    assert len(limiteur) == 0
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from migrations import CHAMP_VERSION, MigrationsProfils
+from stockage import (BackendJSON, BackendSQLite, JournalEconomie, PlayerStore, ecrire_json_atomique,
+                      iterer_objet_json)
+
+
+def migrations_exemple():
+    migrations = MigrationsProfils()
+
+    @migrations.etape(1)
+    def ajouter_prestige(profil):
+        profil.setdefault('prestige', 0)
+
+    @migrations.etape(2)
+    def renommer_arme(profil):
+        if 'arme' in profil:
+            profil['equipement'] = [profil.pop('arme')]
+
+    return migrations
+
+
+ANCIENS = {
+    '1': {'sable': 10, 'arme': 'pelle'},
+    '2': {'sable': 20, 'prestige': 3, CHAMP_VERSION: 1},
+    '3': {'sable': 30, 'prestige': 1, 'equipement': [], CHAMP_VERSION: 2},
+}
+
+
+def test_etapes_hors_sequence_refusees():
+    migrations = MigrationsProfils()
+    with pytest.raises(ValueError):
+        migrations.etape(2)(lambda profil: None)
+
+
+def test_erreur_de_migration_isolee():
+    migrations = migrations_exemple()
+
+    @migrations.etape(3)
+    def echouer(profil):
+        if profil['sable'] == 20:
+            raise KeyError('oups')
+        profil['v3'] = True
+
+    profils = json.loads(json.dumps(ANCIENS))
+    migres, _ = migrations.migrer_tous(profils)
+    assert sorted(migres) == ['1', '3']
+    assert profils['2'][CHAMP_VERSION] == 2
+
+
+@pytest.mark.parametrize('sqlite', [False, True])
+def test_chargement_migre_au_fil_de_la_lecture(tmp_path, sqlite):
+    if sqlite:
+        backend = BackendSQLite(str(tmp_path / 'marchand.db'))
+        backend.ecrire_joueurs(json.loads(json.dumps(ANCIENS)), set(ANCIENS))
+    else:
+        ecrire_json_atomique(tmp_path / 'joueurs.json', ANCIENS)
+        backend = BackendJSON(tmp_path / 'joueurs.json', tmp_path / 'tickets.json')
+    journal = tmp_path / 'journal.log'
+    with open(journal, 'w', encoding='utf-8') as f:
+        # Écrits avant la migration: l'ancien schéma revient par le rejeu
+        f.write(json.dumps({'t': 'delta', 'u': '3', 'set': {'arme': 'seau'}, 'seq': 1}) + '\n')
+        f.write(json.dumps({'t': 'profil', 'u': '4', 'p': {'sable': 0, 'arme': 'rateau'}, 'seq': 2}) + '\n')
+
+    store = PlayerStore(backend, journal=JournalEconomie(journal), migrations=migrations_exemple())
+    store.charger()
+    profils = store.profils
+    assert profils['1'] == {'sable': 10, 'prestige': 0, 'equipement': ['pelle'], CHAMP_VERSION: 2}
+    assert profils['2'] == {'sable': 20, 'prestige': 3, CHAMP_VERSION: 2}
+    assert profils['3']['arme'] == 'seau'
+    # Profil écrit par le journal dans l'ancien schéma: migré après le rejeu
+    assert profils['4'] == {'sable': 0, 'prestige': 0, 'equipement': ['rateau'], CHAMP_VERSION: 2, 'journal_seq': 2}
+    assert store.migration[0] == 3
+    # Les profils migrés sont déjà réécrits: le chargement suivant n'a rien à faire
+    store.persistance.fermer()
+
+    relu = PlayerStore(backend, journal=JournalEconomie(journal), migrations=migrations_exemple())
+    relu.charger()
+    assert relu.migration[0] == 0
+    assert relu.profils == profils
+    relu.persistance.fermer()
+
+
+@pytest.mark.parametrize('taille_bloc', [1, 7, 1 << 20])
+def test_lecture_par_blocs(tmp_path, taille_bloc):
+    donnees = {'1': {'sable': 1.5, 'nom': 'é"\\', 'liste': [1, {'a': None}]}, '2': 12345678901234, '3': 'x'}
+    ecrire_json_atomique(tmp_path / 'f.json', donnees)
+    lus = list(iterer_objet_json(tmp_path / 'f.json', taille_bloc))
+    assert {cle: valeur for cle, valeur, _ in lus} == donnees
+    assert [json.loads(texte) for _, _, texte in lus] == list(donnees.values())
+
+
+def test_lecture_fichier_corrompu(tmp_path):
+    (tmp_path / 'f.json').write_text('{"1": {"sable": 1}, "2": {"sab', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iterer_objet_json(tmp_path / 'f.json', 4))
+    # Le chargement garde les profils lus avant l'erreur
+    backend = BackendJSON(tmp_path / 'f.json', tmp_path / 't.json')
+    assert backend.charger_joueurs() == {'1': {'sable': 1}}
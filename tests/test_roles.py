@@ -0,0 +1,112 @@
+import asyncio
+import copy
+
+import pytest
+
+from roles import MODE_RETIRER, OperationRoles, planifier_roles, reprendre_avancement
+
+
+class Interruption(BaseException):
+    """Arrêt brutal du bot en cours d'opération"""
+
+
+class Role:
+    def __init__(self, role_id, guild):
+        self.id = role_id
+        self.name = f"role-{role_id}"
+        self.guild = guild
+
+    @property
+    def members(self):
+        return [m for m in self.guild.membres.values() if self in m.roles]
+
+
+class Membre:
+    def __init__(self, member_id, roles):
+        self.id = member_id
+        self.roles = list(roles)
+        self.retraits = 0
+
+    async def remove_roles(self, role, reason=None):
+        self.retraits += 1
+        self.roles.remove(role)
+
+
+class Guild:
+    def __init__(self, nb_membres):
+        self.id = 1
+        self.role = Role(10, self)
+        self.membres = {i: Membre(i, [self.role]) for i in range(nb_membres)}
+
+    def get_member(self, member_id):
+        return self.membres.get(member_id)
+
+    def get_role(self, role_id):
+        return self.role if role_id == self.role.id else None
+
+
+class Planificateur:
+    """Exécute chaque appel; s'interrompt après `limite` appels"""
+    def __init__(self, limite=None):
+        self.limite = limite
+        self.appels = 0
+
+    async def envoyer(self, route, fabrique, priorite):
+        if self.limite is not None and self.appels >= self.limite:
+            raise Interruption()
+        self.appels += 1
+        await fabrique()
+
+
+def executer(operation, guild, etat):
+    return asyncio.run(operation.executer(guild, etat))
+
+
+def test_reprise_depuis_la_position_enregistree():
+    guild = Guild(10)
+    etat = planifier_roles(guild, [guild.role], garder_role=True)
+    assert etat['roles']['10']['mode'] == MODE_RETIRER
+    planifie = copy.deepcopy(etat)
+
+    points = []
+    with pytest.raises(Interruption):
+        executer(OperationRoles(Planificateur(limite=4), points.append, concurrence=1, intervalle_point=0), guild, etat)
+    assert points[-1] == {'traites': 4, 'echecs': 0, 'faits': {'10': 4}}
+
+    planificateur = Planificateur()
+    reprise = reprendre_avancement(copy.deepcopy(planifie), points[-1])
+    final = executer(OperationRoles(planificateur, points.append, concurrence=1, intervalle_point=0), guild, reprise)
+
+    # Seuls les membres après la position enregistrée sont retraités
+    assert planificateur.appels == 6
+    assert final['traites'] == planifie['total'] == 10
+    assert all(m.retraits == 1 and not m.roles for m in guild.membres.values())
+    assert points[-1] == {'traites': 10, 'echecs': 0, 'faits': {}}
+
+
+def test_reprise_concurrente_ne_perd_aucun_membre():
+    guild = Guild(25)
+    etat = planifier_roles(guild, [guild.role], garder_role=True)
+    planifie = copy.deepcopy(etat)
+
+    points = []
+    with pytest.raises(Interruption):
+        executer(OperationRoles(Planificateur(limite=12), points.append, concurrence=5, intervalle_point=0), guild, etat)
+    dernier = points[-1]
+    assert dernier['traites'] == dernier['faits']['10'] <= 12
+
+    reprise = reprendre_avancement(copy.deepcopy(planifie), dernier)
+    final = executer(OperationRoles(Planificateur(), points.append, concurrence=5, intervalle_point=0), guild, reprise)
+
+    # Les membres terminés hors ordre sont revus à la reprise, sans second retrait
+    assert final['traites'] == 25
+    assert all(m.retraits == 1 and not m.roles for m in guild.membres.values())
+
+
+def test_role_deja_supprime_compte_le_reste():
+    guild = Guild(6)
+    etat = planifier_roles(guild, [guild.role], garder_role=True)
+    reprise = reprendre_avancement(etat, {'traites': 2, 'echecs': 0, 'faits': {'10': 2}})
+    guild.role = Role(99, guild)
+    final = executer(OperationRoles(Planificateur(), lambda avancement: None, intervalle_point=0), guild, reprise)
+    assert final['traites'] == 6